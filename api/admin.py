@@ -1,5 +1,23 @@
 from django.contrib import admin
-from .models import Resume
+from .models import Resume, AnalysisTask, ScorecardCacheEntry, Skill
 
 # Register your models here.
 admin.site.register(Resume)
+
+
+@admin.register(AnalysisTask)
+class AnalysisTaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'job_description', 'attempts', 'worker_id', 'created_at', 'finished_at')
+    list_filter = ('status',)
+
+
+@admin.register(ScorecardCacheEntry)
+class ScorecardCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('pdf_sha256', 'job_description_sha256', 'pipeline_version', 'hit_count', 'generation_seconds', 'created_at', 'last_used_at')
+    readonly_fields = ('pdf_sha256', 'job_description_sha256', 'pipeline_version', 'created_at')
+
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ('label', 'name')
+    search_fields = ('name', 'label')
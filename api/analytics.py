@@ -0,0 +1,102 @@
+# api/analytics.py
+#
+# Per-job pipeline statistics for the dashboard: score histogram, status
+# funnel, top skills and the most frequent red flags. They are computed with a
+# handful of aggregate queries over the indexed per-job columns (and a scan of
+# the flagged candidates' red flags) and kept in JobAnalytics
+# until one of the job's resumes is created, changed or deleted. The signal
+# handlers in api/signals.py invalidate on save and delete; code that writes
+# with bulk_create()/update() must call invalidate() itself.
+
+import math
+from collections import Counter
+
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .models import JobAnalytics, Resume
+from .skills import skill_facets
+
+# match_score is on a 0-10 scale; the histogram has one bucket per point.
+SCORE_BUCKETS = 10
+TOP_SKILLS = 10
+TOP_RED_FLAGS = 10
+
+
+def invalidate(job_ids):
+    """Drop the cached analytics of the jobs in `job_ids` (a list or a values() queryset)."""
+    JobAnalytics.objects.filter(job_description_id__in=job_ids).update(version=F('version') + 1, data=None)
+
+
+def red_flag_frequencies(resumes, limit=TOP_RED_FLAGS):
+    """Return the red flags raised most often among `resumes` as `{"flag", "count"}` dicts.
+
+    Flags are free text from the model, so they are matched ignoring case
+    and whitespace; `count` is the number of candidates the flag was raised
+    for.
+    """
+    counts = Counter()
+    labels = {}
+    # red_flag_count narrows the scan to candidates with at least one flag.
+    for flags in resumes.filter(red_flag_count__gt=0).values_list('scorecard_data__red_flags', flat=True).iterator():
+        seen = set()
+        for flag in flags if isinstance(flags, list) else []:
+            if not isinstance(flag, str):
+                continue
+            label = ' '.join(flag.split())
+            key = label.casefold()
+            if key and key not in seen:
+                seen.add(key)
+                labels.setdefault(key, label)
+                counts[key] += 1
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [{"flag": labels[key], "count": count} for key, count in ranked]
+
+
+def compute(job):
+    resumes = Resume.objects.filter(job_description=job)
+    summary = resumes.aggregate(
+        candidates=Count('id'),
+        scored=Count('match_score'),
+        average_score=Avg('match_score'),
+        min_score=Min('match_score'),
+        max_score=Max('match_score'),
+        with_red_flags=Count('id', filter=Q(red_flag_count__gt=0)),
+        job_hopping=Count('id', filter=Q(job_hopping_flag=True)),
+    )
+
+    histogram = [0] * SCORE_BUCKETS
+    for score, count in resumes.filter(match_score__isnull=False).values_list('match_score').annotate(count=Count('id')).order_by():
+        # A score of exactly 10 belongs in the top bucket.
+        histogram[min(max(math.floor(score), 0), SCORE_BUCKETS - 1)] += count
+
+    statuses = dict(resumes.values_list('status').annotate(count=Count('id')).order_by())
+
+    return {
+        "job_id": job.pk,
+        **summary,
+        "unscored": summary["candidates"] - summary["scored"],
+        "score_histogram": [
+            {"min": bucket, "max": bucket + 1, "count": count} for bucket, count in enumerate(histogram)
+        ],
+        "status_funnel": [
+            {"status": choice, "count": statuses.get(choice, 0)} for choice, _ in Resume.STATUS_CHOICES
+        ],
+        "top_skills": skill_facets(job, limit=TOP_SKILLS),
+        "red_flags": red_flag_frequencies(resumes),
+    }
+
+
+def job_analytics(job):
+    """Return the analytics of `job`, recomputing them only if a resume changed since the last call."""
+    # If a concurrent first request inserts the row first, get_or_create()
+    # catches the IntegrityError in its savepoint and returns that row.
+    cached, _ = JobAnalytics.objects.get_or_create(job_description=job)
+    if cached.data is not None:
+        return cached.data
+
+    computed_at = timezone.now()
+    data = {**compute(job), "computed_at": computed_at.isoformat()}
+    # Skip storing if a resume changed while computing; the next call recomputes.
+    JobAnalytics.objects.filter(pk=cached.pk, version=cached.version).update(data=data, computed_at=computed_at)
+    return data
@@ -0,0 +1,209 @@
+# api/artifact_cache.py
+#
+# Disk cache of what extraction derives from a PDF: the text of each page and
+# the rendered images of the pages sent as pictures. Entries are keyed by the
+# SHA-256 of the PDF bytes plus everything that changes the output (render and
+# extraction settings), so analyzing a stored CV again, for another job, a new
+# prompt or a re-score, skips fitz entirely. Least recently used entries are
+# removed once the directory grows past ARTIFACT_CACHE_MAX_BYTES.
+#
+# Each entry is a directory holding `manifest.json` and one file per rendered
+# page. Entries are written to a temporary directory and renamed into place,
+# so readers in other processes never see a partial entry.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .gemini import InlineBlob
+
+# Bump when the manifest layout or extraction logic changes.
+ARTIFACT_CACHE_REVISION = 1
+MANIFEST = 'manifest.json'
+# A sweep frees space down to this fraction of the budget, so the next few
+# stores don't each trigger one.
+SWEEP_TARGET = 0.8
+STALE_STAGING_SECONDS = 3600
+
+_size_lock = threading.Lock()
+# Bytes under the cache directory as seen by this process: None until the
+# first store scans the directory.
+_estimated_size = None
+
+
+class CachedExtraction:
+    """The per-page output of extraction, before it is assembled into Gemini parts.
+
+    `pages` are the report's page dicts; text pages keep their `text`.
+    `images` maps page numbers to `(mime_type, InlineBlob, dpi)`.
+    """
+
+    def __init__(self, page_count, pages, images):
+        self.page_count = page_count
+        self.pages = pages
+        self.images = images
+
+
+def cache_dir():
+    return settings.ARTIFACT_CACHE_DIR
+
+
+def is_enabled():
+    return bool(settings.ARTIFACT_CACHE_DIR) and settings.ARTIFACT_CACHE_MAX_BYTES > 0
+
+
+def variant_key(render_settings):
+    """Hash of the settings an extraction depends on besides the PDF itself."""
+    raw = '|'.join(str(value) for value in (
+        ARTIFACT_CACHE_REVISION,
+        render_settings.cache_key(),
+        render_settings.max_pages,
+        settings.EXTRACTION_MIN_PAGE_CHARS,
+        settings.EXTRACTION_MIN_READABLE_RATIO,
+    ))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def entry_path(pdf_hash, render_settings):
+    return os.path.join(cache_dir(), pdf_hash[:2], f'{pdf_hash}-{variant_key(render_settings)}')
+
+
+def load(pdf_hash, render_settings):
+    """Return the cached `CachedExtraction`, or None on a miss."""
+    path = entry_path(pdf_hash, render_settings)
+    manifest_path = os.path.join(path, MANIFEST)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        images = {}
+        for page_number, image in manifest['images'].items():
+            image_path = os.path.join(path, image['file'])
+            if not os.path.isfile(image_path):
+                return None
+            # Read when the request is sent, not now.
+            images[int(page_number)] = (image['mime_type'], InlineBlob(path=image_path), image['dpi'])
+    except (OSError, ValueError, KeyError):
+        # Missing, evicted mid-read, or written by an incompatible revision.
+        return None
+    # The manifest's mtime is the entry's last use, for LRU eviction.
+    try:
+        os.utime(manifest_path)
+    except OSError:
+        pass
+    return CachedExtraction(manifest['page_count'], manifest['pages'], images)
+
+
+def save(pdf_hash, render_settings, extraction):
+    """Store an extraction and return True if it is now cached.
+
+    Failures are ignored, since the cache is only an optimization.
+    """
+    path = entry_path(pdf_hash, render_settings)
+    if os.path.exists(path):
+        return True
+    parent = os.path.dirname(path)
+    try:
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    except OSError:
+        return False
+    try:
+        size = 0
+        images = {}
+        for page_number, (mime_type, image, dpi) in extraction.images.items():
+            name = f'page-{page_number}.{mime_type.split("/")[-1]}'
+            with open(os.path.join(staging, name), 'wb') as f:
+                f.write(image.read())
+            size += image.size
+            images[str(page_number)] = {'file': name, 'mime_type': mime_type, 'dpi': dpi}
+        manifest = json.dumps({'page_count': extraction.page_count, 'pages': extraction.pages, 'images': images})
+        with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as f:
+            f.write(manifest)
+        size += len(manifest)
+        os.rename(staging, path)
+    except OSError:
+        # Most likely another process stored the same entry first.
+        shutil.rmtree(staging, ignore_errors=True)
+        return os.path.exists(path)
+    _record_growth(size)
+    return True
+
+
+def _record_growth(size):
+    global _estimated_size
+    with _size_lock:
+        if _estimated_size is None:
+            _estimated_size = usage()['bytes']
+        else:
+            _estimated_size += size
+        if _estimated_size <= settings.ARTIFACT_CACHE_MAX_BYTES:
+            return
+        _estimated_size = evict(int(settings.ARTIFACT_CACHE_MAX_BYTES * SWEEP_TARGET))
+
+
+def _entries():
+    """Yield `(last_used, size, path)` for every entry on disk."""
+    root = cache_dir()
+    try:
+        shards = os.listdir(root)
+    except OSError:
+        return
+    for shard in shards:
+        shard_path = os.path.join(root, shard)
+        try:
+            names = os.listdir(shard_path)
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(shard_path, name)
+            try:
+                if name.startswith('.tmp-'):
+                    # A staging directory, removed only if its writer died long ago.
+                    if time.time() - os.stat(path).st_mtime > STALE_STAGING_SECONDS:
+                        shutil.rmtree(path, ignore_errors=True)
+                    continue
+                with os.scandir(path) as files:
+                    stats = {entry.name: entry.stat() for entry in files}
+            except OSError:
+                continue
+            if MANIFEST not in stats:
+                continue
+            yield stats[MANIFEST].st_mtime, sum(s.st_size for s in stats.values()), path
+
+
+def evict(max_bytes=None):
+    """Remove least recently used entries until the cache fits in `max_bytes`; returns the bytes left."""
+    if max_bytes is None:
+        max_bytes = settings.ARTIFACT_CACHE_MAX_BYTES
+    entries = sorted(_entries(), reverse=True)
+    total = 0
+    full = False
+    for _, size, path in entries:
+        full = full or total + size > max_bytes
+        if full:
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            total += size
+    return total
+
+
+def usage():
+    entries = list(_entries())
+    return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+
+def clear():
+    global _estimated_size
+    count = 0
+    for _, _, path in list(_entries()):
+        shutil.rmtree(path, ignore_errors=True)
+        count += 1
+    with _size_lock:
+        _estimated_size = None
+    return count
@@ -0,0 +1,111 @@
+# api/authentication.py
+#
+# DRF TokenAuthentication with the token -> user lookup cached, so a polling
+# dashboard doesn't pay a database query per request. Resolved tokens are kept
+# for AUTH_TOKEN_CACHE_TTL seconds: in the Django cache AUTH_TOKEN_CACHE_ALIAS
+# if it is set, so every process sees the same entries, otherwise in a bounded
+# in-process LRU. The signal handlers in api/signals.py drop entries when a
+# token is deleted or its user is saved or deleted. With a shared cache that
+# takes effect everywhere at once; with the per-process LRU, other processes
+# catch up within the TTL. Unknown tokens and inactive users are never cached,
+# so they fail exactly as with TokenAuthentication.
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+_entries = OrderedDict()  # token key -> (expires_at, user, token)
+_lock = threading.Lock()
+
+
+def _shared_cache():
+    alias = settings.AUTH_TOKEN_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _shared_key(key):
+    # Keep raw tokens out of the cache server.
+    return 'auth-token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _copies(user, token):
+    """Copies for one request, so a view changing `request.user` can't touch the cached objects."""
+    user = copy.copy(user)
+    token = copy.copy(token)
+    token.user = user
+    return user, token
+
+
+def _get(key):
+    # A shared cache is the only layer when configured: a local copy would
+    # outlive an invalidation made by another process.
+    shared = _shared_cache()
+    if shared is not None:
+        return shared.get(_shared_key(key))
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                _entries.move_to_end(key)
+                return entry[1:]
+            del _entries[key]
+    return None
+
+
+def _set(key, user, token):
+    ttl = settings.AUTH_TOKEN_CACHE_TTL
+    if ttl <= 0 or settings.AUTH_TOKEN_CACHE_SIZE <= 0:
+        return
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(_shared_key(key), (user, token), ttl)
+        return
+    with _lock:
+        _entries[key] = (time.monotonic() + ttl, user, token)
+        _entries.move_to_end(key)
+        while len(_entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def invalidate_token(key):
+    with _lock:
+        _entries.pop(key, None)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_shared_key(key))
+
+
+def invalidate_user(user_id):
+    """Drop every cached token of the user."""
+    with _lock:
+        keys = [key for key, (_, user, _) in _entries.items() if user.pk == user_id]
+    if _shared_cache() is not None:
+        from rest_framework.authtoken.models import Token
+        keys += Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    for key in set(keys):
+        invalidate_token(key)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """`TokenAuthentication` that serves repeat tokens from the cache above."""
+
+    def authenticate_credentials(self, key):
+        cached = _get(key)
+        if cached is not None:
+            return _copies(*cached)
+        # Raises for unknown tokens and inactive users, which are not cached.
+        user, token = super().authenticate_credentials(key)
+        _set(key, user, token)
+        return _copies(user, token)
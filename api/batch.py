@@ -0,0 +1,162 @@
+# api/batch.py
+#
+# Bulk analysis of many CVs against one job. Files are scored on a bounded
+# thread pool (the Gemini client's token bucket keeps the fan-out inside the
+# quota) and successful results are inserted with one bulk INSERT per chunk.
+
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import connections
+
+from . import analytics, listing_cache, metrics
+from .models import Resume
+from .scorecard import build_resume_from_scorecard
+from .scorecard_cache import get_or_generate_scorecard
+from .search import index_resumes
+from .skills import sync_resume_skills
+
+
+class BatchError(Exception):
+    """The batch as a whole is invalid (as opposed to a single bad file)."""
+
+
+class BatchDocument:
+    """One file of a batch. Spooled uploads have a `path` (and usually a `sha256`); ZIP members are read on demand."""
+
+    def __init__(self, name, size, read, path=None, sha256=None):
+        self.name = name
+        self.size = size
+        self._read = read
+        self.path = path
+        self.sha256 = sha256
+
+    def read(self):
+        return self._read()
+
+    def as_file(self):
+        """A File to save into storage; close it after use."""
+        if self.path is not None:
+            return File(open(self.path, 'rb'), name=self.name)
+        return ContentFile(self.read(), name=self.name)
+
+
+def is_pdf_name(name):
+    return name.lower().endswith('.pdf')
+
+
+def collect_documents(files, archive=None):
+    """Return the `BatchDocument`s in the uploaded files and/or ZIP archive."""
+    documents = [
+        BatchDocument(
+            f.name, f.size, f.read,
+            path=f.temporary_file_path() if hasattr(f, 'temporary_file_path') else None,
+            sha256=getattr(f, 'sha256', None),
+        )
+        for f in files
+    ]
+
+    if archive is not None:
+        try:
+            bundle = zipfile.ZipFile(archive)
+        except zipfile.BadZipFile:
+            raise BatchError("The uploaded archive is not a valid ZIP file.")
+        for info in bundle.infolist():
+            name = os.path.basename(info.filename)
+            # Skip directories and the resource forks macOS adds to archives.
+            if info.is_dir() or not name or info.filename.startswith('__MACOSX/') or name.startswith('._'):
+                continue
+            documents.append(BatchDocument(name, info.file_size, lambda info=info: bundle.read(info)))
+
+    if not documents:
+        raise BatchError("No resume files provided.")
+    if len(documents) > settings.BATCH_ANALYSIS_MAX_FILES:
+        raise BatchError(f"A batch may contain at most {settings.BATCH_ANALYSIS_MAX_FILES} files.")
+    return documents
+
+
+def _analyze_one(document, job_text):
+    """Worker-thread body: score one document and store its file. Never raises."""
+    try:
+        if not is_pdf_name(document.name):
+            return {"error": "Only PDF files are supported."}, None
+        if document.size > settings.BATCH_ANALYSIS_MAX_FILE_BYTES:
+            return {"error": f"File is larger than {settings.BATCH_ANALYSIS_MAX_FILE_BYTES} bytes."}, None
+
+        pdf = document.path or document.read()
+        scorecard = get_or_generate_scorecard(pdf, job_text, pdf_hash=document.sha256)
+        if "error" in scorecard:
+            return scorecard, None
+
+        storage = Resume._meta.get_field('original_cv').storage
+        with (document.as_file() if document.path else ContentFile(pdf)) as original_cv:
+            stored_name = storage.save(f"resumes/{document.name}", original_cv)
+        return scorecard, stored_name
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}, None
+    finally:
+        # Pool threads outlive the request; don't leave their DB connections open.
+        connections.close_all()
+
+
+def _insert(pending, job_description):
+    if not pending:
+        return
+    with metrics.stage('db_insert'):
+        resumes = Resume.objects.bulk_create([
+            build_resume_from_scorecard(scorecard, job_description, stored_name)
+            for _, scorecard, stored_name in pending
+        ])
+    # bulk_create() skips post_save, so index the new rows here.
+    index_resumes(resumes)
+    sync_resume_skills(resumes)
+    analytics.invalidate([job_description.pk])
+    listing_cache.bump(listing_cache.RESUMES)
+    for (document, _, _), resume in zip(pending, resumes):
+        yield {
+            "file": document.name,
+            "status": "succeeded",
+            "resume_id": resume.pk,
+            "name": resume.name,
+            "match_score": resume.match_score,
+            "prescreen_score": resume.prescreen_score,
+        }
+    pending.clear()
+
+
+def analyze_batch(documents, job_description):
+    """Yield a result dict per document as it finishes, then a summary dict."""
+    succeeded = failed = 0
+    pending = []
+    executor = ThreadPoolExecutor(max_workers=settings.BATCH_ANALYSIS_CONCURRENCY, thread_name_prefix='batch-analysis')
+    try:
+        futures = {
+            executor.submit(_analyze_one, document, job_description.description): document
+            for document in documents
+        }
+        for future in as_completed(futures):
+            document = futures[future]
+            scorecard, stored_name = future.result()
+            if "error" in scorecard:
+                failed += 1
+                yield {"file": document.name, "status": "failed", "error": scorecard["error"]}
+                continue
+
+            pending.append((document, scorecard, stored_name))
+            if len(pending) >= settings.BATCH_ANALYSIS_INSERT_BATCH_SIZE:
+                for result in _insert(pending, job_description):
+                    succeeded += 1
+                    yield result
+
+        for result in _insert(pending, job_description):
+            succeeded += 1
+            yield result
+    finally:
+        # If the client goes away mid-stream, don't start the files still queued.
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    yield {"status": "completed", "total": len(documents), "succeeded": succeeded, "failed": failed}
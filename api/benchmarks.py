@@ -0,0 +1,282 @@
+# api/benchmarks.py
+#
+# Building blocks for the benchmark commands (benchmark_analysis and
+# run_benchmarks): a throwaway database, synthetic text and scanned resume
+# PDFs drawn with reportlab, a bulk loader for large candidate tables, the
+# analysis load driver that runs uploads against a StubGeminiServer, and
+# helpers for writing and comparing results. Everything random is seeded so
+# runs on different commits see the same data.
+
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+import fitz
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from . import analytics, listing_cache
+from .gemini_stub import DEFAULT_SCORECARD
+from .models import Resume
+from .scorecard import build_resume_from_scorecard
+from .search import index_resumes
+from .skills import sync_resume_skills
+
+FIRST_NAMES = ["Jane", "Omar", "Priya", "Lukas", "Mei", "Carlos", "Aisha", "Tom", "Sofia", "Kwame", "Elena", "Hiro"]
+LAST_NAMES = ["Doe", "Haddad", "Sharma", "Becker", "Chen", "Ramos", "Bello", "Nguyen", "Rossi", "Mensah", "Ivanova", "Sato"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises", "Vandelay"]
+TITLES = ["Software Engineer", "Senior Software Engineer", "Data Engineer", "Backend Developer", "Tech Lead", "Platform Engineer"]
+SKILLS = [
+    "Python", "Django", "PostgreSQL", "Celery", "Redis", "Docker", "Kubernetes", "AWS", "GCP", "Terraform", "Go",
+    "Java", "Kotlin", "TypeScript", "React", "GraphQL", "Kafka", "Spark", "Airflow", "Pandas", "SQL", "Rust",
+]
+SOFT_SKILLS = ["Communication", "Mentoring", "Ownership", "Collaboration", "Problem solving"]
+RED_FLAGS = ["Unexplained employment gap", "Short tenures", "Inconsistent dates", "Vague achievements"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def latency_summary(seconds):
+    """p50/p99/mean in milliseconds for a list of latencies in seconds."""
+    return {
+        'samples': len(seconds),
+        'p50_ms': round(percentile(seconds, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(seconds, 0.99) * 1000, 2),
+        'mean_ms': round(sum(seconds) / len(seconds) * 1000, 2) if seconds else 0.0,
+    }
+
+
+@contextmanager
+def benchmark_database(workdir):
+    """Run the block against a fresh test database in `workdir`, destroyed afterwards."""
+    if connection.vendor == 'sqlite':
+        # A file rather than the shared in-memory database, with write locks
+        # taken up front, so concurrent writers wait for each other instead
+        # of failing with "database is locked".
+        connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'db.sqlite3')
+        connection.settings_dict['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def analysis_settings(stub, workdir, pool_size):
+    """Settings under which every upload is extracted and sent to `stub`."""
+    return override_settings(
+        GEMINI_API_BASE_URL=stub.base_url,
+        GEMINI_REQUESTS_PER_MINUTE=0,
+        GEMINI_POOL_SIZE=pool_size,
+        # Every request must reach the model and extract its PDF.
+        SCORECARD_CACHE_ENABLED=False,
+        ARTIFACT_CACHE_MAX_BYTES=0,
+        MEDIA_ROOT=os.path.join(workdir, 'media'),
+    )
+
+
+def resume_lines(rng):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    skills = rng.sample(SKILLS, 6)
+    lines = [name, f"{name.lower().replace(' ', '.')}@example.com - +44 20 7946 {rng.randint(1000, 9999)}", ""]
+    lines.append("Experience")
+    year = 2024
+    for _ in range(3):
+        start = year - rng.randint(2, 4)
+        lines.append(f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)} ({start}-{year})")
+        lines.append(f"  Built and ran services in {skills[0]} and {rng.choice(skills[1:])} for {rng.randint(2, 40)} teams.")
+        lines.append(f"  Cut p99 latency by {rng.randint(10, 70)}% and infrastructure cost by {rng.randint(5, 40)}%.")
+        year = start
+    lines += ["", "Education", f"BSc Computer Science ({year - 4}-{year})", "", "Skills", ", ".join(skills)]
+    return lines
+
+
+def make_text_resume_pdf(rng):
+    """A one-page CV with a text layer, as exported from a word processor."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setFont('Helvetica', 11)
+    y = A4[1] - 72
+    for line in resume_lines(rng):
+        pdf.drawString(72, y, line)
+        y -= 16
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def make_scanned_resume_pdf(rng, dpi=150):
+    """A one-page CV that is only an image of the page, as from a scanner."""
+    with fitz.open(stream=make_text_resume_pdf(rng), filetype='pdf') as doc:
+        image = doc[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes('png')
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.drawImage(ImageReader(io.BytesIO(image)), 0, 0, width=A4[0], height=A4[1])
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def synthetic_scorecard(rng):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    return {
+        **DEFAULT_SCORECARD,
+        "match_score": round(rng.uniform(0, 10), 1),
+        "summary": f"{rng.choice(TITLES)} with {rng.randint(1, 15)} years at {rng.choice(COMPANIES)}.",
+        "basic_information": {"name": name, "email": f"{name.lower().replace(' ', '.')}{rng.randint(1, 999)}@example.com", "phone": "", "linkedin": ""},
+        "experience_analysis": {**DEFAULT_SCORECARD["experience_analysis"], "job_hopping_flag": rng.random() < 0.15},
+        "skillset_evaluation": {"hard_skills": rng.sample(SKILLS, 5), "soft_skills": rng.sample(SOFT_SKILLS, 2), "certifications": []},
+        "red_flags": rng.sample(RED_FLAGS, rng.choice([0, 0, 0, 1, 2])),
+    }
+
+
+def bulk_load_resumes(jobs, count, rng, batch_size=5000):
+    """Insert `count` synthetic candidates spread over `jobs`, indexed as batch ingestion does."""
+    statuses = [choice for choice, _ in Resume.STATUS_CHOICES]
+    for start in range(0, count, batch_size):
+        batch = []
+        for _ in range(min(batch_size, count - start)):
+            resume = build_resume_from_scorecard(synthetic_scorecard(rng), rng.choice(jobs), '')
+            resume.status = rng.choice(statuses)
+            batch.append(resume)
+        with transaction.atomic():
+            resumes = Resume.objects.bulk_create(batch)
+            index_resumes(resumes)
+            sync_resume_skills(resumes)
+    analytics.invalidate([job.pk for job in jobs])
+    listing_cache.bump(listing_cache.RESUMES)
+
+
+def measure_analysis(mode, pdfs, job, requests, concurrency):
+    """Upload `requests` CVs (cycling through `pdfs`) for `job` and return the throughput and latencies.
+
+    'wsgi' posts to the synchronous view from `concurrency` threads, as a
+    threaded WSGI server would; 'asgi' and 'asgi-sync' keep `concurrency`
+    requests in flight through Django's async handler, against the async and
+    the synchronous view respectively.
+    """
+    def form(index):
+        upload = SimpleUploadedFile('resume.pdf', pdfs[index % len(pdfs)], content_type='application/pdf')
+        return {'file': upload, 'job_description_id': job.pk}
+
+    started = time.perf_counter()
+    if mode == 'wsgi':
+        timings = _run_threaded(reverse('analyze-resume'), form, requests, concurrency)
+    else:
+        path = reverse('analyze-resume-async' if mode == 'asgi' else 'analyze-resume')
+        timings = asyncio.run(_run_async(path, form, requests, concurrency))
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds for seconds, ok in timings if ok]
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'requests': len(timings),
+        'errors': len(timings) - len(latencies),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(latencies) / elapsed, 2),
+        **latency_summary(latencies),
+    }
+
+
+def _run_threaded(path, form, requests, threads):
+    local = threading.local()
+
+    def one(index):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+        started = time.perf_counter()
+        response = client.post(path, form(index))
+        return time.perf_counter() - started, response.status_code == 200
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(one, range(requests)))
+
+
+async def _run_async(path, form, requests, concurrency):
+    # AsyncClient runs requests through Django's async handler, as an ASGI server would.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await AsyncClient().post(path, form(index))
+            return time.perf_counter() - started, response.status_code == 200
+
+    return await asyncio.gather(*(one(index) for index in range(requests)))
+
+
+def environment():
+    """Where and on what the benchmarks ran, for the results file."""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        revision, dirty = None, None
+    return {
+        'revision': revision,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'database': connection.vendor,
+    }
+
+
+def flatten(results, prefix=''):
+    """`{'a': {'b': 1}}` -> `{'a.b': 1}`, keeping only numbers."""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Yield `(metric, before, after, change)` for numbers in both results; change is a fraction or None."""
+    before = flatten(baseline.get('results', {}))
+    after = flatten(current.get('results', {}))
+    for metric in sorted(before.keys() & after.keys()):
+        old, new = before[metric], after[metric]
+        yield metric, old, new, (new - old) / old if old else None
+
+
+def write_results(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
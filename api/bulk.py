@@ -0,0 +1,141 @@
+# api/bulk.py
+#
+# Pipeline operations on many resumes at once, selected by id or by a filter
+# on job, score range and status. A status change is a single UPDATE. Deletes
+# run in batches, and the deleted resumes' CV files are removed from storage
+# on a background thread once each batch has committed.
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from . import analytics, listing_cache
+from .models import Resume
+
+logger = logging.getLogger(__name__)
+
+FILTER_FIELDS = {'job_id', 'min_score', 'max_score', 'status'}
+VALID_STATUSES = {choice for choice, _ in Resume.STATUS_CHOICES}
+
+_cleanup_executor = None
+_cleanup_lock = threading.Lock()
+
+
+class BulkError(Exception):
+    """The selection or operation is invalid."""
+
+
+def _statuses(value):
+    statuses = value if isinstance(value, list) else [value]
+    if not statuses or not all(isinstance(s, str) and s in VALID_STATUSES for s in statuses):
+        raise BulkError("Invalid status provided.")
+    return statuses
+
+
+def select_resumes(data):
+    """Return the resumes named by `data["ids"]` or matched by `data["filter"]`.
+
+    The filter takes `job_id`, `min_score`, `max_score` (on match_score) and
+    `status` (one status or a list). Exactly one of `ids` and `filter` must be
+    given, and neither may be empty, so a request can never select every row
+    by accident.
+    """
+    ids = data.get('ids')
+    criteria = data.get('filter')
+    if (ids is None) == (criteria is None):
+        raise BulkError("Provide either a list of 'ids' or a 'filter'.")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise BulkError("A list of 'ids' is required.")
+        if len(ids) > settings.BULK_MAX_IDS:
+            raise BulkError(f"At most {settings.BULK_MAX_IDS} ids can be given; use a 'filter' for larger selections.")
+        try:
+            return Resume.objects.filter(pk__in=[int(pk) for pk in ids])
+        except (TypeError, ValueError):
+            raise BulkError("'ids' must be a list of resume ids.")
+
+    if not isinstance(criteria, dict) or not criteria:
+        raise BulkError("'filter' must be an object with at least one of: " + ", ".join(sorted(FILTER_FIELDS)) + ".")
+    unknown = set(criteria) - FILTER_FIELDS
+    if unknown:
+        raise BulkError(f"Unknown filter field(s): {', '.join(sorted(unknown))}.")
+    queryset = Resume.objects.all()
+    try:
+        if 'job_id' in criteria:
+            queryset = queryset.filter(job_description_id=int(criteria['job_id']))
+        if 'min_score' in criteria:
+            queryset = queryset.filter(match_score__gte=float(criteria['min_score']))
+        if 'max_score' in criteria:
+            queryset = queryset.filter(match_score__lte=float(criteria['max_score']))
+    except (TypeError, ValueError):
+        raise BulkError("'job_id', 'min_score' and 'max_score' must be numbers.")
+    if 'status' in criteria:
+        queryset = queryset.filter(status__in=_statuses(criteria['status']))
+    return queryset
+
+
+def set_status(queryset, status):
+    """Move every selected resume to `status` with one UPDATE; returns the number of rows changed."""
+    if not isinstance(status, str) or status not in VALID_STATUSES:
+        raise BulkError("Invalid status provided.")
+    # update() skips the save() signals; status is in no index they keep
+    # apart from the job analytics and the listings, which are dropped here.
+    with transaction.atomic():
+        analytics.invalidate(queryset.order_by().values('job_description_id'))
+        listing_cache.bump(listing_cache.RESUMES)
+        return queryset.update(status=status)
+
+
+def delete_resumes(queryset, batch_size=None):
+    """Delete the selected resumes, BULK_DELETE_BATCH_SIZE per transaction; returns the number deleted.
+
+    Each batch's CV files are handed to the background cleanup thread when
+    the batch commits.
+    """
+    batch_size = batch_size or settings.BULK_DELETE_BATCH_SIZE
+    ids = list(queryset.order_by().values_list('pk', flat=True))
+    deleted = 0
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            batch = Resume.objects.filter(pk__in=ids[start:start + batch_size])
+            names = [name for name in batch.values_list('original_cv', flat=True) if name]
+            # The post_delete handlers only need these fields.
+            _, counts = batch.only('pk', 'job_description_id').delete()
+            deleted += counts.get(Resume._meta.label, 0)
+            if names:
+                transaction.on_commit(lambda names=names: remove_orphaned_files(names))
+    return deleted
+
+
+def cleanup_executor():
+    global _cleanup_executor
+    with _cleanup_lock:
+        if _cleanup_executor is None:
+            _cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cv-cleanup')
+        return _cleanup_executor
+
+
+def remove_orphaned_files(names):
+    """Schedule removal of the stored CV files in `names` that no resume refers to any more.
+
+    Returns the Future of the background job.
+    """
+    in_use = set(Resume.objects.filter(original_cv__in=names).values_list('original_cv', flat=True))
+    orphans = [name for name in names if name not in in_use]
+    return cleanup_executor().submit(_delete_files, orphans)
+
+
+def _delete_files(names):
+    storage = Resume._meta.get_field('original_cv').storage
+    removed = 0
+    for name in names:
+        try:
+            storage.delete(name)
+            removed += 1
+        except Exception:
+            logger.warning("Could not delete CV file %s.", name, exc_info=True)
+    return removed
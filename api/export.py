@@ -0,0 +1,145 @@
+# api/export.py
+#
+# Streams every candidate of a job as CSV or NDJSON for shortlist exports.
+# Rows come from a chunked values() iterator and are written out in blocks of
+# about EXPORT_BUFFER_BYTES, so memory stays flat and the first bytes go out
+# as soon as the first chunk is read, however many candidates the job has.
+# scorecard_data is only loaded when a requested column comes from it.
+
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .models import Resume
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Column name -> (model field, path inside it).
+COLUMNS = {
+    'id': ('id', ()),
+    'name': ('name', ()),
+    'email': ('email', ()),
+    'status': ('status', ()),
+    'match_score': ('match_score', ()),
+    'prescreen_score': ('prescreen_score', ()),
+    'red_flag_count': ('red_flag_count', ()),
+    'job_hopping_flag': ('job_hopping_flag', ()),
+    'uploaded_on': ('uploaded_on', ()),
+    'phone': ('scorecard_data', ('basic_information', 'phone')),
+    'linkedin': ('scorecard_data', ('basic_information', 'linkedin')),
+    'summary': ('scorecard_data', ('summary',)),
+    'skill_gaps': ('scorecard_data', ('skill_gap_analysis',)),
+    'seniority_progression': ('scorecard_data', ('experience_analysis', 'seniority_progression')),
+    'tenure_summary': ('scorecard_data', ('experience_analysis', 'tenure_summary')),
+    'relevant_domains': ('scorecard_data', ('experience_analysis', 'relevant_domains')),
+    'hard_skills': ('scorecard_data', ('skillset_evaluation', 'hard_skills')),
+    'soft_skills': ('scorecard_data', ('skillset_evaluation', 'soft_skills')),
+    'certifications': ('scorecard_data', ('skillset_evaluation', 'certifications')),
+    'positive_indicators': ('scorecard_data', ('positive_indicators',)),
+    'red_flags': ('scorecard_data', ('red_flags',)),
+    'cultural_fit_summary': ('scorecard_data', ('cultural_fit_summary',)),
+    'personality_signals': ('scorecard_data', ('personality_signals',)),
+}
+DEFAULT_COLUMNS = ['id', 'name', 'email', 'status', 'match_score', 'red_flag_count', 'hard_skills', 'summary', 'uploaded_on']
+
+# Spreadsheet apps run cells starting with these as formulas; CV text is untrusted.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportError(Exception):
+    """The requested format or columns are invalid."""
+
+
+def parse_columns(value):
+    """Return the column specs named in a comma-separated `value` (DEFAULT_COLUMNS if empty).
+
+    Besides the names in COLUMNS, `scorecard.<key>.<key>` picks any value out of
+    scorecard_data.
+    """
+    names = [name.strip() for name in (value or '').split(',') if name.strip()] or DEFAULT_COLUMNS
+    columns = []
+    for name in dict.fromkeys(names):
+        if name in COLUMNS:
+            columns.append((name, *COLUMNS[name]))
+        elif name.startswith('scorecard.') and len(name) > len('scorecard.'):
+            columns.append((name, 'scorecard_data', tuple(name[len('scorecard.'):].split('.'))))
+        else:
+            raise ExportError(f"Unknown column '{name}'. Use any of: {', '.join(COLUMNS)}, or scorecard.<path>.")
+    return columns
+
+
+def _pick(value, path):
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def export_rows(job, columns):
+    """Yield one `{column: value}` dict per candidate of `job`, best match first."""
+    fields = list(dict.fromkeys(field for _, field, _ in columns))
+    rows = (
+        Resume.objects.filter(job_description=job)
+        # Unscored candidates last on every backend, as in the ranked listing.
+        .order_by(F('match_score').desc(nulls_last=True), '-uploaded_on', '-id')
+        .values(*fields)
+        .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    )
+    for row in rows:
+        yield {name: _pick(row[field], path) for name, field, path in columns}
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        value = '; '.join(str(item) for item in value)
+    elif isinstance(value, dict):
+        value = json.dumps(value, cls=DjangoJSONEncoder)
+    elif not isinstance(value, str):
+        return value
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+def iter_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in columns])
+    for row in rows:
+        writer.writerow([_csv_cell(value) for value in row.values()])
+        if buffer.tell() >= settings.EXPORT_BUFFER_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= settings.EXPORT_BUFFER_BYTES:
+            yield ''.join(buffer)
+            buffer.clear()
+            size = 0
+    yield ''.join(buffer)
+
+
+def export_candidates(job, output, columns):
+    """Return `(chunks, content_type)` for streaming the job's candidates as `output` ('csv' or 'ndjson')."""
+    if output not in FORMATS:
+        raise ExportError(f"Unknown export format '{output}'. Use one of: {', '.join(FORMATS)}.")
+    rows = export_rows(job, columns)
+    chunks = iter_csv(rows, columns) if output == 'csv' else iter_ndjson(rows)
+    return chunks, FORMATS[output]
@@ -0,0 +1,168 @@
+# api/extraction.py
+#
+# Turns a PDF into Gemini request parts. Pages with a usable text layer are
+# sent as text; only scanned or image-only pages are rasterized, through the
+# renderer in api/rendering.py. The per-page results are kept in the disk
+# cache in api/artifact_cache.py.
+
+from django.conf import settings
+
+from . import artifact_cache, metrics
+from .gemini import InlineBlob
+from .rendering import RenderSettings, open_pdf, render_pages
+from .uploads import pdf_sha256
+
+# The pipeline used to send every page as a 200 DPI PNG; the bytes saved by the
+# text path are estimated against that baseline, since those pages are never
+# rendered. The per-pixel size is typical for a text page.
+BASELINE_DPI = 200
+ESTIMATED_PNG_BYTES_PER_PIXEL = 0.12
+
+
+def page_has_usable_text(text):
+    """True if the extracted text looks like real content rather than noise."""
+    stripped = "".join(text.split())
+    if len(stripped) < settings.EXTRACTION_MIN_PAGE_CHARS:
+        return False
+    # Broken font encodings come out as replacement characters or private-use
+    # glyphs; such a text layer is worse than the image.
+    readable = sum(1 for ch in stripped if ch.isprintable() and ch != "\ufffd" and not ("\ue000" <= ch <= "\uf8ff"))
+    return readable / len(stripped) >= settings.EXTRACTION_MIN_READABLE_RATIO
+
+
+def _estimated_png_bytes(page, dpi=BASELINE_DPI):
+    scale = dpi / 72.0
+    pixels = page.rect.width * scale * page.rect.height * scale
+    return int(pixels * ESTIMATED_PNG_BYTES_PER_PIXEL * 4 / 3)
+
+
+def _extract_pages(pdf, render_settings):
+    """Run fitz over the PDF: text for pages with a usable text layer, renders for the rest."""
+    pages = []
+    with metrics.stage('pdf_open'):
+        doc = open_pdf(pdf)
+    with doc, metrics.stage('text_extract'):
+        page_count = doc.page_count
+        for page in doc:
+            page_number = page.number + 1
+            if render_settings.max_pages and page_number > render_settings.max_pages:
+                break
+            text = page.get_text("text").strip()
+            estimated_png_bytes = _estimated_png_bytes(page)
+            if page_has_usable_text(text):
+                pages.append({"page": page_number, "method": "text", "chars": len(text), "text": text,
+                              "estimated_png_bytes": estimated_png_bytes})
+            else:
+                pages.append({"page": page_number, "method": "image", "chars": len(text),
+                              "estimated_png_bytes": estimated_png_bytes})
+
+    image_page_numbers = [p["page"] for p in pages if p["method"] == "image"]
+    for page in pages:
+        metrics.EXTRACTED_PAGES.inc(method=page["method"])
+    images = {}
+    if image_page_numbers:
+        with metrics.stage('render'):
+            images = {
+                r.page_number: (r.mime_type, InlineBlob(data=r.data), r.dpi)
+                for r in render_pages(pdf, image_page_numbers, render_settings)
+            }
+    return artifact_cache.CachedExtraction(page_count, pages, images)
+
+
+def extract_document_parts(pdf, render_settings=None, pdf_hash=None):
+    """Return `(parts, report)` for a PDF given as bytes or as a file path.
+
+    `parts` is a list of Gemini content parts in page order, with consecutive
+    text pages merged into one text part. Page images are `InlineBlob`s,
+    encoded only when the request is sent. Pages past `max_pages` are dropped.
+    `report` records which path each page took and the payload bytes involved.
+    Page text and renders come from the artifact cache when this PDF has been
+    extracted before with the same settings; pass `pdf_hash` if it is known.
+    """
+    render_settings = render_settings or RenderSettings.from_settings()
+    extraction = None
+    cache_status = "disabled"
+    if artifact_cache.is_enabled():
+        pdf_hash = pdf_hash or pdf_sha256(pdf)
+        extraction = artifact_cache.load(pdf_hash, render_settings)
+        cache_status = "hit" if extraction is not None else "miss"
+        metrics.CACHE_LOOKUPS.inc(cache="artifact", result=cache_status)
+    if extraction is None:
+        extraction = _extract_pages(pdf, render_settings)
+        if cache_status == "miss" and artifact_cache.save(pdf_hash, render_settings, extraction):
+            # Send the images from the cache files rather than keeping the renders in memory.
+            extraction = artifact_cache.load(pdf_hash, render_settings) or extraction
+
+    pages = []
+    bytes_saved = 0
+    parts = []
+    pending_text = []
+
+    def flush_text():
+        if pending_text:
+            parts.append({"text": "\n\n".join(pending_text)})
+            pending_text.clear()
+
+    for cached_page in extraction.pages:
+        page = {"page": cached_page["page"], "method": cached_page["method"], "chars": cached_page["chars"]}
+        pages.append(page)
+        if page["method"] == "text":
+            text = cached_page["text"]
+            page["bytes"] = len(text.encode("utf-8"))
+            bytes_saved += max(cached_page["estimated_png_bytes"] - page["bytes"], 0)
+            pending_text.append(f"--- Resume page {page['page']} ---\n{text}")
+            continue
+        flush_text()
+        mime_type, image, dpi = extraction.images[page["page"]]
+        parts.append({"inline_data": {"mime_type": mime_type, "data": image}})
+        page["bytes"] = image.base64_length
+        page["dpi"] = dpi
+        bytes_saved += cached_page["estimated_png_bytes"] - image.base64_length
+    flush_text()
+
+    report = {
+        "pages": pages,
+        "page_count": extraction.page_count,
+        "text_pages": [p["page"] for p in pages if p["method"] == "text"],
+        "image_pages": [p["page"] for p in pages if p["method"] == "image"],
+        "skipped_pages": list(range(len(pages) + 1, extraction.page_count + 1)),
+        "payload_bytes": sum(p["bytes"] for p in pages),
+        "bytes_saved_estimate": max(bytes_saved, 0),
+        "artifact_cache": cache_status,
+    }
+    return parts, report
+
+
+def extract_text(pdf, max_pages=None):
+    """Return the text layer of a PDF (bytes or path), or None if any page (up to `max_pages`) has no usable text."""
+    texts = []
+    with open_pdf(pdf) as doc:
+        for page in doc:
+            if max_pages and page.number >= max_pages:
+                break
+            text = page.get_text("text").strip()
+            if not page_has_usable_text(text):
+                return None
+            texts.append(text)
+    return "\n\n".join(texts)
+
+
+def init_extraction_worker():
+    """Initializer for process pools that call `extract_pdf_file`."""
+    import django
+    django.setup()
+    # Each worker process already handles one document at a time.
+    settings.RENDER_WORKERS = 1
+
+
+def extract_pdf_file(path):
+    """Process-pool entry point: return `(path, sha256, parts, report)` for a PDF on disk.
+
+    Errors are reported as `report["error"]` with `parts` set to None.
+    """
+    pdf_hash = pdf_sha256(path)
+    try:
+        parts, report = extract_document_parts(path, pdf_hash=pdf_hash)
+    except Exception as e:
+        return path, pdf_hash, None, {"error": f"Could not read PDF: {e}"}
+    return path, pdf_hash, parts, report
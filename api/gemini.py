@@ -0,0 +1,677 @@
+# api/gemini.py
+#
+# A small HTTP client for the Gemini `generateContent` endpoint. Connections
+# are pooled and kept alive between analyses, every call has connect and read
+# timeouts, 429/5xx responses are retried with exponential backoff (honouring
+# Retry-After), and a circuit breaker fails fast while the upstream is down.
+# Request bodies are encoded as they are sent, with chunked transfer encoding,
+# so page images are never held as one large base64 string.
+#
+# AsyncGeminiClient is the same client for asyncio (the async analysis view):
+# it speaks HTTP/1.1 over asyncio streams, so a request in flight holds no
+# thread.
+
+import asyncio
+import base64
+import email.utils
+import http.client
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+import weakref
+
+from django.conf import settings
+
+from . import metrics
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    """Base class for errors raised by the Gemini client."""
+
+
+class GeminiHTTPError(GeminiError):
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+        super().__init__(f"Gemini API HTTP Error {status}: {body}")
+
+
+class GeminiConnectionError(GeminiError):
+    pass
+
+
+class GeminiTimeoutError(GeminiConnectionError):
+    pass
+
+
+class CircuitOpenError(GeminiError):
+    def __init__(self, retry_in):
+        self.retry_in = retry_in
+        super().__init__(f"Gemini API is unavailable; not retrying for another {retry_in:.0f}s.")
+
+
+class InlineBlob:
+    """The data of an `inline_data` part, base64-encoded only while the request is sent.
+
+    Holds either the bytes themselves or the path of a file containing them.
+    """
+
+    def __init__(self, data=None, path=None):
+        if (data is None) == (path is None):
+            raise ValueError("Pass exactly one of data or path.")
+        self.data = data
+        self.path = path
+
+    @property
+    def size(self):
+        return len(self.data) if self.data is not None else os.path.getsize(self.path)
+
+    @property
+    def base64_length(self):
+        return 4 * ((self.size + 2) // 3)
+
+    def read(self):
+        if self.data is not None:
+            return self.data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def iter_base64(self, chunk_size):
+        """Yield the base64 encoding in pieces of at most `chunk_size` characters."""
+        # Encoding whole 3-byte groups keeps the pieces free of padding.
+        raw_size = max(3, chunk_size // 4 * 3)
+        if self.data is not None:
+            view = memoryview(self.data)
+            for start in range(0, len(view), raw_size):
+                yield base64.b64encode(view[start:start + raw_size])
+            return
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(raw_size), b''):
+                yield base64.b64encode(chunk)
+
+    def __eq__(self, other):
+        return isinstance(other, InlineBlob) and self.read() == other.read()
+
+
+def iter_json(value, chunk_size):
+    """Yield `value` encoded as JSON, piece by piece; InlineBlobs become base64 strings."""
+    if isinstance(value, dict):
+        yield b'{'
+        for index, (key, item) in enumerate(value.items()):
+            yield (', ' if index else '').encode() + json.dumps(key).encode('utf-8') + b': '
+            yield from iter_json(item, chunk_size)
+        yield b'}'
+    elif isinstance(value, (list, tuple)):
+        yield b'['
+        for index, item in enumerate(value):
+            if index:
+                yield b', '
+            yield from iter_json(item, chunk_size)
+        yield b']'
+    elif isinstance(value, InlineBlob):
+        yield b'"'
+        yield from value.iter_base64(chunk_size)
+        yield b'"'
+    else:
+        yield json.dumps(value).encode('utf-8')
+
+
+class JSONBody:
+    """A request body that encodes `payload` as JSON in chunks of about `chunk_size` bytes.
+
+    http.client sends an iterable body with chunked transfer encoding. Each
+    iteration starts over, so a retried request re-encodes the payload. The
+    time spent encoding, not sending, is recorded as the 'encode' stage.
+    """
+
+    def __init__(self, payload, chunk_size=64 * 1024):
+        self.payload = payload
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        buffer = bytearray()
+        size = 0
+        encoding = 0.0
+        started = time.perf_counter()
+        for piece in iter_json(self.payload, self.chunk_size):
+            buffer += piece
+            if len(buffer) >= self.chunk_size:
+                encoding += time.perf_counter() - started
+                size += len(buffer)
+                yield bytes(buffer)
+                buffer.clear()
+                started = time.perf_counter()
+        encoding += time.perf_counter() - started
+        size += len(buffer)
+        if buffer:
+            yield bytes(buffer)
+        metrics.observe_stage('encode', encoding)
+        metrics.GEMINI_REQUEST_BYTES.observe(size)
+
+
+def is_retryable(error):
+    """Whether the same request may succeed later: connection trouble, an open circuit, or a 429/5xx."""
+    if isinstance(error, GeminiHTTPError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, GeminiError)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets a single
+    trial call through once `reset_timeout` seconds have passed."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        # Token of the half-open trial call in flight, if any.
+        self._trial = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        """Raise `CircuitOpenError` if the call may not go ahead.
+
+        Returns a token when the call is the half-open trial (None otherwise),
+        for `release_trial()` should it end without a success or failure.
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.OPEN or (state == self.HALF_OPEN and self._trial is not None):
+                raise CircuitOpenError(max(self.reset_timeout - (self._clock() - self._opened_at), 0))
+            if state == self.HALF_OPEN:
+                self._trial = object()
+                return self._trial
+            return None
+
+    def release_trial(self, trial):
+        """Let another call be the trial after `trial` ended without a verdict (e.g. it was cancelled)."""
+        with self._lock:
+            if trial is not None and self._trial is trial:
+                self._trial = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial = None
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Gemini circuit breaker opened after %d consecutive failures.", self._failures)
+                self._opened_at = self._clock()
+
+
+class ConnectionPool:
+    """A bounded LIFO pool of keep-alive connections to a single host."""
+
+    def __init__(self, scheme, host, port, connect_timeout, max_size=10):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._ssl_context = ssl.create_default_context() if scheme == 'https' else None
+
+    def _new_connection(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.connect_timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+
+    def acquire(self):
+        """Return `(connection, reused)`."""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class AsyncConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @property
+    def closed(self):
+        return self.reader.at_eof() or self.writer.is_closing()
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConnectionPool:
+    """`ConnectionPool` for asyncio streams. Connections belong to the event loop that opened them."""
+
+    def __init__(self, scheme, host, port, connect_timeout, max_size=10):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.max_size = max_size
+        self._idle = []
+        self._ssl_context = ssl.create_default_context() if scheme == 'https' else None
+
+    @property
+    def host_header(self):
+        default_port = 443 if self.scheme == 'https' else 80
+        return self.host if self.port == default_port else f"{self.host}:{self.port}"
+
+    async def _new_connection(self):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self._ssl_context,
+                                    server_hostname=self.host if self._ssl_context else None),
+            self.connect_timeout,
+        )
+        return AsyncConnection(reader, writer)
+
+    async def acquire(self):
+        """Return `(connection, reused)`."""
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.closed:
+                return conn, True
+            conn.close()
+        return await self._new_connection(), False
+
+    def release(self, conn):
+        if len(self._idle) < self.max_size and not conn.closed:
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+async def _write_request(writer, host, path, body, headers):
+    head = [f"POST {path} HTTP/1.1", f"Host: {host}", *(f"{name}: {value}" for name, value in headers.items())]
+    if isinstance(body, (bytes, bytearray)):
+        head.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+    else:
+        head.append("Transfer-Encoding: chunked")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1'))
+        for chunk in body:
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            # Waits while the socket buffer is full, so the body is never queued whole.
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def _read_response(reader):
+    """Return `(status, headers, data)`; header names are lower-cased."""
+    status_line = await reader.readline()
+    if not status_line:
+        # A kept-alive connection the server had already closed.
+        raise ConnectionResetError("connection closed before a response was received")
+    version, status = status_line.decode('latin-1').split(None, 2)[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if version == 'HTTP/1.0':
+        headers.setdefault('connection', 'close')
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip(), 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        data = b"".join(chunks)
+    elif 'content-length' in headers:
+        data = await reader.readexactly(int(headers['content-length']))
+    else:
+        data = await reader.read()
+        headers['connection'] = 'close'
+    return int(status), headers, data
+
+
+def parse_retry_after(value, now=None):
+    """Return the delay in seconds requested by a Retry-After header, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = now if now is not None else time.time()
+    return max(retry_at.timestamp() - now, 0.0)
+
+
+class GeminiClient:
+    pool_class = ConnectionPool
+
+    def __init__(self, api_key, base_url, model, connect_timeout=5.0, read_timeout=120.0,
+                 max_retries=3, backoff_base=1.0, backoff_max=30.0, pool_size=10,
+                 circuit_breaker=None, rate_limiter=None, request_chunk_bytes=64 * 1024, sleep=time.sleep):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.api_key = api_key
+        self.model = model
+        self.base_path = parsed.path.rstrip('/')
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter
+        self.request_chunk_bytes = request_chunk_bytes
+        self._sleep = sleep
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        self.pool = self.pool_class(parsed.scheme, parsed.hostname, port, connect_timeout, max_size=pool_size)
+
+    @classmethod
+    def from_settings(cls, api_key, circuit_breaker=None):
+        return cls(
+            api_key=api_key,
+            base_url=settings.GEMINI_API_BASE_URL,
+            model=settings.GEMINI_MODEL,
+            connect_timeout=settings.GEMINI_CONNECT_TIMEOUT,
+            read_timeout=settings.GEMINI_READ_TIMEOUT,
+            max_retries=settings.GEMINI_MAX_RETRIES,
+            backoff_base=settings.GEMINI_BACKOFF_BASE,
+            backoff_max=settings.GEMINI_BACKOFF_MAX,
+            pool_size=settings.GEMINI_POOL_SIZE,
+            circuit_breaker=circuit_breaker or CircuitBreaker(
+                failure_threshold=settings.GEMINI_CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.GEMINI_CIRCUIT_RESET_TIMEOUT,
+            ),
+            rate_limiter=get_rate_limiter(),
+            request_chunk_bytes=settings.GEMINI_REQUEST_CHUNK_BYTES,
+        )
+
+    def _path(self, method):
+        return f"{self.base_path}/models/{self.model}:{method}"
+
+    def _send_once(self, path, body, headers):
+        """Send one request, transparently retrying once if a pooled connection had gone stale."""
+        for _ in range(2):
+            conn, reused = self.pool.acquire()
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                conn.sock.settimeout(self.read_timeout)
+                conn.request('POST', path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if reused:
+                    continue
+                raise GeminiConnectionError(f"Gemini API connection error: {e}") from e
+            except socket.timeout as e:
+                conn.close()
+                raise GeminiTimeoutError(f"Gemini API timed out: {e}") from e
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise GeminiConnectionError(f"Gemini API connection error: {e}") from e
+
+            if response.will_close:
+                conn.close()
+            else:
+                self.pool.release(conn)
+            return response.status, response.getheader('Retry-After'), data
+        raise GeminiConnectionError("Gemini API connection error: pooled connections kept failing")
+
+    def _backoff(self, attempt, retry_after):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _headers(self):
+        return {
+            'Content-Type': 'application/json',
+            'x-goog-api-key': self.api_key,
+            'Connection': 'keep-alive',
+        }
+
+    def _connection_error_delay(self, attempt, error):
+        """Return the delay before retrying after a connection error, or raise `error` if out of retries."""
+        metrics.GEMINI_REQUESTS.inc(outcome='timeout' if isinstance(error, GeminiTimeoutError) else 'connection_error')
+        if attempt >= self.max_retries:
+            self.circuit_breaker.record_failure()
+            raise error
+        return self._backoff(attempt, None)
+
+    def _handle_response(self, attempt, status, retry_after, data):
+        """Return `(result, retry_delay)` for a response; exactly one is None. Raises on a final failure."""
+        metrics.GEMINI_REQUESTS.inc(outcome=status)
+        metrics.GEMINI_RESPONSE_BYTES.observe(len(data))
+        if status == 200:
+            self.circuit_breaker.record_success()
+            result = json.loads(data.decode('utf-8'))
+            metrics.record_token_usage(result)
+            return result, None
+
+        if status in RETRYABLE_STATUSES and attempt < self.max_retries:
+            delay = self._backoff(attempt, parse_retry_after(retry_after))
+            logger.info("Gemini API returned %s; retrying in %.1fs (attempt %d).", status, delay, attempt + 1)
+            return None, delay
+
+        if status in RETRYABLE_STATUSES:
+            self.circuit_breaker.record_failure()
+        else:
+            # A 4xx other than 429 means our request was bad, not that the
+            # upstream is unhealthy.
+            self.circuit_breaker.record_success()
+        raise GeminiHTTPError(status, data.decode('utf-8', errors='replace'))
+
+    def post(self, method, body):
+        """POST a JSON body (bytes or a `JSONBody`) to `models/<model>:<method>` and return the decoded response."""
+        trial = self.circuit_breaker.before_call()
+        try:
+            headers = self._headers()
+            path = self._path(method)
+
+            attempt = 0
+            while True:
+                # Retries count against the quota too, so every attempt takes a token.
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                try:
+                    with metrics.stage('gemini'):
+                        status, retry_after, data = self._send_once(path, body, headers)
+                except GeminiConnectionError as e:
+                    delay = self._connection_error_delay(attempt, e)
+                else:
+                    result, delay = self._handle_response(attempt, status, retry_after, data)
+                    if delay is None:
+                        return result
+                self._sleep(delay)
+                attempt += 1
+        except BaseException:
+            # Ended by something other than a Gemini verdict, e.g. a failure
+            # to encode the body: don't leave the breaker waiting on a trial.
+            self.circuit_breaker.release_trial(trial)
+            raise
+
+    def generate_content(self, payload):
+        return self.post('generateContent', JSONBody(payload, self.request_chunk_bytes))
+
+
+class AsyncGeminiClient(GeminiClient):
+    """`GeminiClient` with coroutine methods: the same settings, retries, breaker and rate limit.
+
+    Connections are tied to the event loop that opened them; `get_async_client`
+    keeps one client per loop.
+    """
+
+    pool_class = AsyncConnectionPool
+
+    def __init__(self, *args, sleep=asyncio.sleep, **kwargs):
+        super().__init__(*args, sleep=sleep, **kwargs)
+
+    async def _exchange(self, conn, path, body, headers):
+        await _write_request(conn.writer, self.pool.host_header, path, body, headers)
+        return await _read_response(conn.reader)
+
+    async def _send_once(self, path, body, headers):
+        """Send one request, transparently retrying once if a pooled connection had gone stale."""
+        for _ in range(2):
+            try:
+                conn, reused = await self.pool.acquire()
+            except asyncio.TimeoutError as e:
+                raise GeminiTimeoutError("Gemini API timed out while connecting") from e
+            except OSError as e:
+                raise GeminiConnectionError(f"Gemini API connection error: {e}") from e
+            try:
+                # One deadline for the whole exchange, so a peer that stops
+                # reading can't stall drain() on a large body either.
+                status, response_headers, data = await asyncio.wait_for(
+                    self._exchange(conn, path, body, headers), self.read_timeout,
+                )
+            except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError) as e:
+                conn.close()
+                if reused:
+                    continue
+                raise GeminiConnectionError(f"Gemini API connection error: {e}") from e
+            except asyncio.TimeoutError as e:
+                conn.close()
+                raise GeminiTimeoutError("Gemini API timed out") from e
+            except (OSError, ValueError) as e:
+                conn.close()
+                raise GeminiConnectionError(f"Gemini API connection error: {e}") from e
+
+            if response_headers.get('connection', '').lower() == 'close':
+                conn.close()
+            else:
+                self.pool.release(conn)
+            return status, response_headers.get('retry-after'), data
+        raise GeminiConnectionError("Gemini API connection error: pooled connections kept failing")
+
+    async def post(self, method, body):
+        """POST a JSON body (bytes or a `JSONBody`) to `models/<model>:<method>` and return the decoded response."""
+        trial = self.circuit_breaker.before_call()
+        try:
+            headers = self._headers()
+            path = self._path(method)
+
+            attempt = 0
+            while True:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire_async()
+                try:
+                    with metrics.stage('gemini'):
+                        status, retry_after, data = await self._send_once(path, body, headers)
+                except GeminiConnectionError as e:
+                    delay = self._connection_error_delay(attempt, e)
+                else:
+                    result, delay = self._handle_response(attempt, status, retry_after, data)
+                    if delay is None:
+                        return result
+                await self._sleep(delay)
+                attempt += 1
+        except BaseException:
+            # Includes CancelledError when the request task is cancelled or times out.
+            self.circuit_breaker.release_trial(trial)
+            raise
+
+    async def generate_content(self, payload):
+        return await self.post('generateContent', JSONBody(payload, self.request_chunk_bytes))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+# Event loop -> {api_key: AsyncGeminiClient}
+_async_clients = weakref.WeakKeyDictionary()
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide token bucket sized to GEMINI_REQUESTS_PER_MINUTE, or None if unlimited.
+
+    The bucket is per process; when running several worker processes, divide
+    the quota between them.
+    """
+    global _rate_limiter
+    per_minute = settings.GEMINI_REQUESTS_PER_MINUTE
+    if not per_minute:
+        return None
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucket(rate=per_minute / 60.0, capacity=settings.GEMINI_RATE_LIMIT_BURST)
+        return _rate_limiter
+
+
+def get_client(api_key):
+    """Return the process-wide client for `api_key`, so connections and breaker state are shared."""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = GeminiClient.from_settings(api_key)
+        return client
+
+
+def get_async_client(api_key):
+    """Return the client for `api_key` on the running event loop.
+
+    It shares the circuit breaker and rate limit of `get_client(api_key)`.
+    """
+    loop = asyncio.get_running_loop()
+    breaker = get_client(api_key).circuit_breaker
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            client = clients[api_key] = AsyncGeminiClient.from_settings(api_key, circuit_breaker=breaker)
+        return client
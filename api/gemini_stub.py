@@ -0,0 +1,144 @@
+# api/gemini_stub.py
+#
+# A local stand-in for the Gemini `generateContent` endpoint, for tests and
+# benchmarks. Point GEMINI_API_BASE_URL at `StubGeminiServer.base_url`.
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SCORECARD = {
+    "match_score": 7.5,
+    "summary": "Solid backend engineer with relevant Python experience.",
+    "skill_gap_analysis": ["Kubernetes"],
+    "basic_information": {"name": "Jane Doe", "email": "jane.doe@example.com", "phone": "", "linkedin": ""},
+    "experience_analysis": {
+        "seniority_progression": ["Engineer", "Senior Engineer"],
+        "tenure_summary": "Five years across two companies.",
+        "job_hopping_flag": False,
+        "relevant_domains": ["SaaS"],
+    },
+    "skillset_evaluation": {"hard_skills": ["Python", "Django", "PostgreSQL"], "soft_skills": ["Communication"], "certifications": []},
+    "positive_indicators": ["Steady progression"],
+    "red_flags": [],
+    "cultural_fit_summary": "Collaborative.",
+    "personality_signals": ["Curious"],
+}
+
+# The request body is JSON, so the quotes around the id are escaped.
+MULTI_JOB_ID_RE = re.compile(r'job_id: \\"(\w+)\\"')
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server.stub
+        body = self._read_body()
+        with server.lock:
+            server.requests.append({'path': self.path, 'headers': dict(self.headers), 'body': body})
+            server.connections.add(self.client_address)
+            scripted = server.responses.pop(0) if server.responses else None
+            if scripted is None and server.error_rate and server.random.random() < server.error_rate:
+                scripted = server.error_response()
+
+        if server.latency:
+            time.sleep(server.latency)
+        if scripted is None:
+            scripted = (200, {}, server.make_response(body))
+        status, headers, payload = scripted
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open hundreds of connections at once.
+    request_queue_size = 1024
+
+
+class StubGeminiServer:
+    """Serves canned `generateContent` responses on 127.0.0.1.
+
+    `responses` is a queue of `(status, headers, payload)` tuples consumed one
+    per request; once it is empty, every request gets a successful scorecard,
+    except that a fraction `error_rate` of them (drawn from a generator seeded
+    with `seed`) fail with `error_status`, as an overloaded model does. Every
+    response is delayed by `latency` seconds, like a real model call.
+    """
+
+    def __init__(self, scorecard=None, latency=0.0, error_rate=0.0, error_status=503, seed=0):
+        self.scorecard = scorecard or DEFAULT_SCORECARD
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.responses = []
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        self._server = _StubHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    def make_response(self, request_body):
+        answer = self.scorecard
+        # Multi-job prompts label each job description with a job_id and expect one scorecard per job.
+        job_ids = MULTI_JOB_ID_RE.findall(request_body.decode('utf-8', errors='replace'))
+        if job_ids:
+            answer = {"scorecards": [{**self.scorecard, "job_id": job_id} for job_id in job_ids]}
+        text = json.dumps(answer)
+        # Roughly four characters per token, like the real tokenizer.
+        usage = {"promptTokenCount": len(request_body) // 4, "candidatesTokenCount": len(text) // 4}
+        usage["totalTokenCount"] = usage["promptTokenCount"] + usage["candidatesTokenCount"]
+        return {"candidates": [{"content": {"parts": [{"text": text}]}}], "usageMetadata": usage}
+
+    def error_response(self):
+        message = "The model is overloaded. Please try again later."
+        payload = {"error": {"code": self.error_status, "message": message, "status": "UNAVAILABLE"}}
+        return self.error_status, {'Retry-After': '0'}, payload
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
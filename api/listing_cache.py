@@ -0,0 +1,105 @@
+# api/listing_cache.py
+#
+# Conditional GET and a server-side response cache for the job and candidate
+# listings. Each listing depends on change counters (ListingVersion rows) for
+# jobs and/or resumes. The signal handlers in api/signals.py bump them, and
+# code that writes with bulk_create()/update() must call bump() itself.
+#
+# A response's ETag is a hash of the request URL, its query parameters and
+# those counters. A revalidation therefore costs one small query and returns
+# 304, and the same hash keys the response data in the Django cache
+# LISTING_CACHE_ALIAS. Entries never go stale; a change just moves requests
+# to a new key.
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .models import ListingVersion
+
+JOBS = 'jobs'
+RESUMES = 'resumes'
+
+
+def bump(*names):
+    """Record that the listings depending on `names` have changed."""
+    now = timezone.now()
+    updated = ListingVersion.objects.filter(name__in=names).update(version=F('version') + 1, changed_at=now)
+    if updated < len(names):
+        ListingVersion.objects.bulk_create(
+            [ListingVersion(name=name, version=1, changed_at=now) for name in names], ignore_conflicts=True,
+        )
+
+
+def current_versions(names):
+    """Return `({name: version}, last_modified)`; counters never bumped are version '0'.
+
+    A version includes the time of the change, so counters restarted by a
+    database reset never match keys cached before it.
+    """
+    rows = {row.name: row for row in ListingVersion.objects.filter(name__in=names)}
+    versions = {
+        name: f'{rows[name].version}@{rows[name].changed_at.timestamp()}' if name in rows else '0' for name in names
+    }
+    changed = [row.changed_at for row in rows.values()]
+    return versions, max(changed) if changed else None
+
+
+def response_etag(request, versions):
+    # The host is part of the key: file URLs in the responses are absolute.
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    key = '|'.join([
+        request.build_absolute_uri(request.path), query, request.accepted_renderer.format,
+        *(f'{name}={version}' for name, version in sorted(versions.items())),
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+class CachedListingMixin:
+    """Conditional GET and response caching for a viewset's list() and retrieve().
+
+    `listing_dependencies` names the counters the responses depend on. The
+    cache is consulted after authentication and permission checks.
+    """
+
+    listing_dependencies = ()
+    listing_cache_control = 'no-cache'
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_listing(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_listing(request, super().retrieve, *args, **kwargs)
+
+    def cached_listing(self, request, view, *args, **kwargs):
+        versions, last_modified = current_versions(self.listing_dependencies)
+        etag = quote_etag(response_etag(request, versions))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if response is None:
+            cache = caches[settings.LISTING_CACHE_ALIAS]
+            cache_key = f'listing:{self.basename}:{etag}'
+            data = cache.get(cache_key) if settings.LISTING_CACHE_TIMEOUT else None
+            if data is not None:
+                response = Response(data)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if settings.LISTING_CACHE_TIMEOUT:
+                    cache.set(cache_key, response.data, settings.LISTING_CACHE_TIMEOUT)
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Browsers must revalidate rather than reuse a copy heuristically.
+        response['Cache-Control'] = self.listing_cache_control
+        return response
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import artifact_cache
+
+
+class Command(BaseCommand):
+    help = "Show the size of the extracted-page cache, or evict/clear it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evict', action='store_true', help="Apply ARTIFACT_CACHE_MAX_BYTES now.")
+        parser.add_argument('--clear', action='store_true', help="Delete every cached extraction.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write(f"Cleared {artifact_cache.clear()} cached extraction(s).")
+        elif options['evict']:
+            artifact_cache.evict()
+
+        usage = artifact_cache.usage()
+        self.stdout.write(f"Directory: {settings.ARTIFACT_CACHE_DIR or '(disabled)'}")
+        self.stdout.write(f"Entries:   {usage['entries']}")
+        self.stdout.write(f"Size:      {usage['bytes'] / 1024 / 1024:.1f} MiB of {settings.ARTIFACT_CACHE_MAX_BYTES / 1024 / 1024:.0f} MiB")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api import listing_cache, skills
+from api.models import Skill
+
+
+class Command(BaseCommand):
+    help = "Rebuild the normalized skill index from every resume's scorecard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Resumes processed per transaction.")
+        parser.add_argument('--prune', action='store_true', help="Delete skills no resume lists any more.")
+
+    def handle(self, *args, **options):
+        count = skills.backfill(chunk_size=options['chunk_size'])
+        # The candidate list filters on the skill index.
+        listing_cache.bump(listing_cache.RESUMES)
+        self.stdout.write(f"Indexed skills for {count} resume(s).")
+        if options['prune']:
+            deleted, _ = Skill.objects.filter(resume_links__isnull=True).delete()
+            self.stdout.write(f"Pruned {deleted} unused skill(s).")
+        self.stdout.write(f"{Skill.objects.count()} distinct skill(s).")
@@ -0,0 +1,67 @@
+import os
+import random
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import (
+    analysis_settings, benchmark_database, make_scanned_resume_pdf, make_text_resume_pdf, measure_analysis,
+    write_results,
+)
+from api.gemini_stub import StubGeminiServer
+from api.models import JobDescription
+
+# 'asgi-sync' is the synchronous view served through the async handler.
+MODES = ('wsgi', 'asgi-sync', 'asgi')
+PDF_KINDS = {'text': make_text_resume_pdf, 'scanned': make_scanned_resume_pdf}
+
+
+class Command(BaseCommand):
+    help = ("Compare analysis throughput of the synchronous (WSGI) and async (ASGI) analysis views against a "
+            "local Gemini stub, in a throwaway database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Analyses per mode.")
+        parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads, as in a threaded WSGI server.")
+        parser.add_argument('--concurrency', type=int, default=100, help="ASGI requests in flight at once.")
+        parser.add_argument('--latency', type=float, default=0.5, help="Seconds the stub takes per Gemini call.")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of Gemini calls the stub fails with 503.")
+        parser.add_argument('--pdf', choices=sorted(PDF_KINDS), default='text', help="Upload CVs with a text layer or scanned ones.")
+        parser.add_argument('--modes', default='wsgi,asgi', help=f"Comma-separated subset of {', '.join(MODES)}.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=None, help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode in MODES]
+        rng = random.Random(options['seed'])
+        pdfs = [PDF_KINDS[options['pdf']](rng) for _ in range(8)]
+        workdir = tempfile.mkdtemp(prefix='benchmark-')
+        os.environ['GEMINI_API_KEY'] = 'benchmark'
+        try:
+            stub = StubGeminiServer(latency=options['latency'], error_rate=options['error_rate'], seed=options['seed'])
+            with benchmark_database(workdir), stub, analysis_settings(
+                stub, workdir, max(options['threads'], options['concurrency']),
+            ):
+                user = User.objects.create(username='benchmark')
+                job = JobDescription.objects.create(
+                    title="Backend engineer", description="Python, Django and PostgreSQL.", created_by=user,
+                )
+                results = []
+                for mode in modes:
+                    concurrency = options['threads'] if mode == 'wsgi' else options['concurrency']
+                    result = measure_analysis(mode, pdfs, job, options['requests'], concurrency)
+                    self.stdout.write(
+                        f"{mode:<10} concurrency {concurrency:>4}: {result['throughput']:>8.2f} req/s, "
+                        f"p50 {result['p50_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms, {result['errors']} error(s)"
+                    )
+                    results.append(result)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['output']:
+            write_results(options['output'], {
+                'latency': options['latency'], 'error_rate': options['error_rate'], 'pdf': options['pdf'],
+                'requests': options['requests'], 'results': results,
+            })
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Resume
+
+UPLOAD_DIR = 'resumes'
+
+
+class Command(BaseCommand):
+    help = "Delete stored CV files that no resume refers to, e.g. left behind by deletes before bulk cleanup existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age-hours', type=float, default=24.0,
+                            help="Only delete files at least this old, so uploads still being analyzed are kept.")
+        parser.add_argument('--dry-run', action='store_true', help="List the orphaned files without deleting them.")
+
+    def handle(self, *args, **options):
+        storage = Resume._meta.get_field('original_cv').storage
+        in_use = set(Resume.objects.exclude(original_cv='').values_list('original_cv', flat=True).iterator())
+        cutoff = timezone.now() - timedelta(hours=options['min_age_hours'])
+
+        orphans = [
+            name for name in self.stored_files(storage, UPLOAD_DIR)
+            if name not in in_use and storage.get_modified_time(name) < cutoff
+        ]
+        for name in orphans:
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(f"{verb} {len(orphans)} orphaned CV file(s); {len(in_use)} file(s) in use.")
+
+    def stored_files(self, storage, directory):
+        try:
+            directories, files = storage.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in files:
+            yield f"{directory}/{name}"
+        for subdirectory in directories:
+            yield from self.stored_files(storage, f"{directory}/{subdirectory}")
@@ -0,0 +1,166 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.extraction import extract_pdf_file, init_extraction_worker
+from api.models import JobDescription
+from api.scorecard import create_resume_from_scorecard, score_document_parts
+from api.scorecard_cache import cached_scorecard
+
+
+def _score(pdf_hash, parts, job_text):
+    """Thread-pool body: the rate-limited LLM half of the pipeline."""
+    cache_report = {}
+    try:
+        scorecard = cached_scorecard(pdf_hash, job_text, lambda: score_document_parts(parts, job_text), report=cache_report)
+        return scorecard, cache_report.get("cache") == "hit"
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Analyze every PDF under a directory against a job, resuming from a checkpoint file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--job', type=int, required=True, help="JobDescription id to score against.")
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Worker processes for PDF extraction and rendering.")
+        parser.add_argument('--concurrency', type=int, default=settings.BATCH_ANALYSIS_CONCURRENCY, help="LLM calls in flight at once.")
+        parser.add_argument('--rpm', type=int, default=None, help="LLM requests per minute (default: GEMINI_REQUESTS_PER_MINUTE).")
+        parser.add_argument('--checkpoint', default=None, help="Checkpoint file (default: <directory>/.ingest-job-<id>.jsonl).")
+        parser.add_argument('--retry-failed', action='store_true', help="Retry files that failed in a previous run.")
+        parser.add_argument('--report-every', type=float, default=5.0, help="Seconds between progress lines.")
+
+    def handle(self, *args, **options):
+        directory = os.path.abspath(options['directory'])
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} is not a directory.")
+        try:
+            job = JobDescription.objects.get(pk=options['job'])
+        except JobDescription.DoesNotExist:
+            raise CommandError(f"JobDescription {options['job']} does not exist.")
+        if options['rpm'] is not None:
+            settings.GEMINI_REQUESTS_PER_MINUTE = options['rpm']
+
+        checkpoint_path = options['checkpoint'] or os.path.join(directory, f".ingest-job-{job.pk}.jsonl")
+        done = self.load_checkpoint(checkpoint_path, options['retry_failed'])
+
+        paths = []
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.lower().endswith('.pdf') and os.path.relpath(path, directory) not in done:
+                    paths.append(path)
+        paths.sort()
+        self.stdout.write(f"{len(paths)} file(s) to ingest, {len(done)} already done according to {checkpoint_path}.")
+        if not paths:
+            return
+
+        self.stats = {'files': 0, 'failed': 0, 'pages': 0, 'bytes': 0, 'cache_hits': 0}
+        self.started = self.last_report = time.monotonic()
+        self.report_every = options['report_every']
+
+        with open(checkpoint_path, 'a') as checkpoint:
+            if self.torn_checkpoint:
+                checkpoint.write("\n")
+            self.run_pipeline(paths, directory, job, checkpoint, options)
+        self.report(final=True)
+
+    def load_checkpoint(self, path, retry_failed):
+        done = set()
+        self.torn_checkpoint = False
+        if not os.path.exists(path):
+            return done
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted run; end it so the
+                    # next entry starts on a line of its own.
+                    self.torn_checkpoint = not line.endswith("\n")
+                    continue
+                if entry.get('status') == 'succeeded' or not retry_failed:
+                    done.add(entry['file'])
+        return done
+
+    def run_pipeline(self, paths, directory, job, checkpoint, options):
+        pending_paths = iter(paths)
+        # Keep a bounded number of extracted documents in memory.
+        max_prepared = options['processes'] * 2
+        preparing, scoring = set(), {}
+
+        process_pool = ProcessPoolExecutor(
+            max_workers=options['processes'],
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_extraction_worker,
+        )
+        thread_pool = ThreadPoolExecutor(max_workers=options['concurrency'])
+        try:
+            while True:
+                while len(preparing) + len(scoring) < max_prepared + options['concurrency']:
+                    path = next(pending_paths, None)
+                    if path is None:
+                        break
+                    preparing.add(process_pool.submit(extract_pdf_file, path))
+                if not preparing and not scoring:
+                    break
+
+                finished, _ = wait(preparing | set(scoring), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in preparing:
+                        preparing.discard(future)
+                        path, pdf_hash, parts, report = future.result()
+                        if "error" in report:
+                            self.record(checkpoint, directory, path, {"error": report["error"]}, job)
+                            continue
+                        self.stats['pages'] += len(report['pages'])
+                        scoring[thread_pool.submit(_score, pdf_hash, parts, job.description)] = (path, report)
+                    else:
+                        path, report = scoring.pop(future)
+                        scorecard, cache_hit = future.result()
+                        if cache_hit:
+                            self.stats['cache_hits'] += 1
+                        elif "error" not in scorecard:
+                            self.stats['bytes'] += report['payload_bytes']
+                        self.record(checkpoint, directory, path, scorecard, job)
+                self.report()
+        finally:
+            thread_pool.shutdown(wait=True, cancel_futures=True)
+            process_pool.shutdown(wait=True, cancel_futures=True)
+
+    def record(self, checkpoint, directory, path, scorecard, job):
+        relative = os.path.relpath(path, directory)
+        if "error" in scorecard:
+            self.stats['failed'] += 1
+            entry = {"file": relative, "status": "failed", "error": scorecard["error"]}
+            self.stderr.write(f"{relative}: {scorecard['error']}")
+        else:
+            with open(path, 'rb') as f:
+                resume = create_resume_from_scorecard(scorecard, job, File(f, name=os.path.basename(path)))
+            entry = {"file": relative, "status": "succeeded", "resume_id": resume.pk}
+        self.stats['files'] += 1
+        checkpoint.write(json.dumps(entry) + "\n")
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+
+    def report(self, final=False):
+        now = time.monotonic()
+        if not final and now - self.last_report < self.report_every:
+            return
+        self.last_report = now
+        elapsed = max(now - self.started, 1e-9)
+        stats = self.stats
+        self.stdout.write(
+            f"{'Done' if final else 'Progress'}: {stats['files']} file(s) ({stats['failed']} failed) in {elapsed:.1f}s | "
+            f"{stats['files'] / elapsed:.2f} files/s, {stats['pages'] / elapsed:.2f} pages/s, "
+            f"{stats['bytes'] / 1024 / 1024:.1f} MiB sent ({stats['bytes'] / elapsed / 1024:.1f} KiB/s), "
+            f"{stats['cache_hits']} cache hit(s)"
+        )
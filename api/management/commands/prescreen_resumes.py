@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import listing_cache
+from api.extraction import extract_text
+from api.models import JobDescription, Resume
+from api.prescreen import PrescreenModel
+from api.uploads import stored_pdf
+
+
+class Command(BaseCommand):
+    help = "Compute prescreen scores for stored resumes against every job in batched matrix passes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, default=None, help="Only rescore resumes attached to this job.")
+        parser.add_argument('--batch-size', type=int, default=settings.PRESCREEN_BATCH_SIZE)
+        parser.add_argument('--suggest', type=float, default=None, metavar='MARGIN',
+                            help="List resumes that score at least MARGIN higher against another job.")
+
+    def handle(self, *args, **options):
+        jobs = list(JobDescription.objects.values_list('id', 'title', 'description'))
+        model = PrescreenModel([job_id for job_id, _, _ in jobs], [text for _, _, text in jobs])
+        titles = {job_id: title for job_id, title, _ in jobs}
+
+        resumes = Resume.objects.filter(job_description__isnull=False).exclude(original_cv='')
+        if options['job'] is not None:
+            resumes = resumes.filter(job_description_id=options['job'])
+        resumes = resumes.only('id', 'name', 'original_cv', 'scorecard_data', 'job_description_id').order_by('pk')
+
+        self.scored = self.skipped = self.below = 0
+        batch = []
+        for resume in resumes.iterator(chunk_size=options['batch_size']):
+            batch.append(resume)
+            if len(batch) >= options['batch_size']:
+                self.score_batch(model, batch, titles, options['suggest'])
+                batch = []
+        self.score_batch(model, batch, titles, options['suggest'])
+
+        self.stdout.write(
+            f"Scored {self.scored} resume(s) against {len(jobs)} job(s); {self.skipped} skipped "
+            f"(missing file or no text layer); {self.below} below PRESCREEN_MIN_SCORE={settings.PRESCREEN_MIN_SCORE}."
+        )
+
+    def score_batch(self, model, batch, titles, suggest_margin):
+        texts, scored = [], []
+        for resume in batch:
+            try:
+                text = extract_text(stored_pdf(resume.original_cv), max_pages=settings.RENDER_MAX_PAGES)
+            except Exception:
+                text = None
+            if text is None:
+                self.skipped += 1
+                continue
+            texts.append(text)
+            scored.append(resume)
+        if not scored:
+            return
+
+        # One (resumes x jobs) matrix for the whole batch.
+        scores = model.similarity(texts)
+        for row, resume in enumerate(scored):
+            own = float(scores[row, model.job_index[resume.job_description_id]])
+            scorecard = resume.scorecard_data if isinstance(resume.scorecard_data, dict) else {}
+            previous = scorecard.get('prescreen') or {}
+            scorecard['prescreen'] = {
+                "score": own,
+                "threshold": settings.PRESCREEN_MIN_SCORE,
+                "passed": previous.get('passed', True),
+            }
+            resume.scorecard_data = scorecard
+            resume.apply_scorecard_fields()
+            if own < settings.PRESCREEN_MIN_SCORE:
+                self.below += 1
+
+            if suggest_margin is not None:
+                best = int(scores[row].argmax())
+                if scores[row, best] - own >= suggest_margin:
+                    best_job = model.job_ids[best]
+                    self.stdout.write(
+                        f"Resume {resume.pk} ({resume.name or 'unnamed'}): {own:.3f} for "
+                        f"'{titles[resume.job_description_id]}', {scores[row, best]:.3f} for '{titles[best_job]}' (job {best_job})"
+                    )
+        Resume.objects.bulk_update(scored, ['scorecard_data', 'prescreen_score'])
+        listing_cache.bump(listing_cache.RESUMES)
+        self.scored += len(scored)
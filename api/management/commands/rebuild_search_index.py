@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from the job and resume tables."
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        count = backend.rebuild()
+        self.stdout.write(f"Indexed {count} document(s) with {type(backend).__name__}.")
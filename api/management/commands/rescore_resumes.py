@@ -0,0 +1,48 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import JobDescription
+from api.rescore import enqueue_rescore, rescore_job, resumes_to_rescore
+from api.scorecard import get_gemini_api_key
+
+
+class Command(BaseCommand):
+    help = "Re-score resumes whose scorecards were made against an older version of their job description."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, action='append', default=None,
+                            help="Only rescore this job's resumes (repeatable). Default: every job.")
+        parser.add_argument('--all', action='store_true', help="Rescore every resume, not only stale ones.")
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Parallel LLM calls (default: BATCH_ANALYSIS_CONCURRENCY).")
+        parser.add_argument('--async', action='store_true', dest='queue',
+                            help="Queue the resumes for run_analysis_workers instead of scoring them here.")
+
+    def handle(self, *args, **options):
+        if not options['queue'] and not get_gemini_api_key():
+            raise CommandError("Gemini API key is not configured.")
+
+        jobs = JobDescription.objects.order_by('pk')
+        if options['job']:
+            jobs = jobs.filter(pk__in=options['job'])
+
+        succeeded = failed = 0
+        for job in jobs:
+            resumes = resumes_to_rescore(job, include_current=options['all'])
+            if options['queue']:
+                batch_id = uuid.uuid4()
+                queued = enqueue_rescore(job, resumes, batch_id)
+                if queued:
+                    self.stdout.write(f"Job {job.pk}: queued {queued} resume(s) as batch {batch_id}.")
+                continue
+            for result in rescore_job(job, resumes, concurrency=options['concurrency']):
+                if result['status'] == 'failed':
+                    self.stderr.write(f"Resume {result['resume_id']}: {result['error']}")
+                elif result['status'] == 'completed' and result['total']:
+                    succeeded += result['succeeded']
+                    failed += result['failed']
+                    self.stdout.write(f"Job {job.pk}: {result['succeeded']} rescored, {result['failed']} failed.")
+
+        if not options['queue']:
+            self.stdout.write(f"Rescored {succeeded} resume(s); {failed} failed.")
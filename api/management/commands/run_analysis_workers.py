@@ -0,0 +1,39 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import metrics
+from api.tasks import AnalysisWorkerPool
+
+
+class Command(BaseCommand):
+    help = "Run a pool of workers that process queued resume analyses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None, help="Number of analyses to run at once (default: ANALYSIS_WORKER_CONCURRENCY).")
+        parser.add_argument('--poll-interval', type=float, default=None, help="Seconds between queue polls (default: ANALYSIS_WORKER_POLL_INTERVAL).")
+        parser.add_argument('--drain', action='store_true', help="Exit once the queue is empty instead of polling forever.")
+        parser.add_argument('--metrics-port', type=int, default=None,
+                            help="Serve this pool's metrics in the Prometheus text format on this port.")
+        parser.add_argument('--metrics-host', default='127.0.0.1',
+                            help="Address the metrics exporter binds to; other than loopback, METRICS_TOKEN must be set.")
+
+    def handle(self, *args, **options):
+        if options['metrics_port']:
+            try:
+                metrics.serve(options['metrics_port'], host=options['metrics_host'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        pool = AnalysisWorkerPool(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            stdout=self.stdout,
+        )
+
+        def shutdown(signum, frame):
+            self.stdout.write("Shutting down after in-flight analyses finish...")
+            pool.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        pool.run(drain=options['drain'])
@@ -0,0 +1,212 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api import metrics
+from api.benchmarks import (
+    analysis_settings, benchmark_database, bulk_load_resumes, compare, environment, latency_summary, load_results,
+    make_scanned_resume_pdf, make_text_resume_pdf, measure_analysis, write_results,
+)
+from api.gemini_stub import StubGeminiServer
+from api.models import JobDescription, Resume
+from api.pagination import StandardResultsSetPagination
+
+SUITES = ('listing', 'analysis', 'memory')
+PDF_KINDS = {'text': make_text_resume_pdf, 'scanned': make_scanned_resume_pdf}
+
+
+class Command(BaseCommand):
+    help = ("Run the benchmark suites (candidate listings over a bulk-loaded table, analysis throughput against "
+            "a local Gemini stub, peak memory) in a throwaway database and write the results as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suites', default=','.join(SUITES), help=f"Comma-separated subset of {', '.join(SUITES)}.")
+        parser.add_argument('--resumes', type=int, default=100_000, help="Synthetic candidates to bulk-load.")
+        parser.add_argument('--jobs', type=int, default=20, help="Jobs the candidates are spread over.")
+        parser.add_argument('--samples', type=int, default=30, help="Timed requests per listing endpoint.")
+        parser.add_argument('--requests', type=int, default=100, help="Analyses per mode and PDF kind.")
+        parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads.")
+        parser.add_argument('--concurrency', type=int, default=50, help="ASGI requests in flight at once.")
+        parser.add_argument('--latency', type=float, default=0.5, help="Seconds the stub takes per Gemini call.")
+        parser.add_argument('--error-rate', type=float, default=0.05, help="Fraction of Gemini calls the stub fails with 503.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for the synthetic data and the stub's errors.")
+        parser.add_argument('--output', default=None, help="Write the results as JSON to this file.")
+        parser.add_argument('--compare', default=None, metavar='BASELINE', help="Print the change from an earlier results file.")
+
+    def handle(self, *args, **options):
+        suites = [suite.strip() for suite in options['suites'].split(',') if suite.strip()]
+        unknown = set(suites) - set(SUITES)
+        if unknown:
+            raise CommandError(f"Unknown suite(s): {', '.join(sorted(unknown))}. Use any of: {', '.join(SUITES)}.")
+        baseline = load_results(options['compare']) if options['compare'] else None
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        workdir = tempfile.mkdtemp(prefix='benchmark-')
+        os.environ['GEMINI_API_KEY'] = 'benchmark'
+        results = {}
+        try:
+            stub = StubGeminiServer(latency=options['latency'], error_rate=options['error_rate'], seed=options['seed'])
+            with benchmark_database(workdir), stub, analysis_settings(
+                stub, workdir, max(options['threads'], options['concurrency']),
+            ):
+                meta = environment()
+                user = User.objects.create(username='benchmark')
+                self.client = Client(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+                self.jobs = [
+                    JobDescription.objects.create(
+                        title=f"Backend engineer {index}", description="Python, Django and PostgreSQL.", created_by=user,
+                    )
+                    for index in range(max(1, options['jobs']))
+                ]
+                # The listing and memory suites read the same bulk-loaded table.
+                if {'listing', 'memory'} & set(suites) and options['resumes'] > 0:
+                    results['bulk_load'] = self.load_resumes()
+                for suite in SUITES:
+                    if suite in suites:
+                        self.stdout.write(self.style.MIGRATE_HEADING(f"{suite}:"))
+                        results[suite] = getattr(self, f'run_{suite}')()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = {'meta': {**meta, 'options': {key: options[key] for key in (
+            'suites', 'resumes', 'jobs', 'samples', 'requests', 'threads', 'concurrency', 'latency', 'error_rate', 'seed',
+        )}}, 'results': results}
+        if options['output']:
+            write_results(options['output'], report)
+            self.stdout.write(f"Results written to {options['output']}.")
+        if baseline is not None:
+            self.print_comparison(baseline, report)
+
+    def load_resumes(self):
+        count = self.options['resumes']
+        started = time.perf_counter()
+        bulk_load_resumes(self.jobs, count, self.rng)
+        seconds = time.perf_counter() - started
+        self.stdout.write(f"Loaded {count} synthetic candidates in {seconds:.1f} s.")
+        return {'rows': count, 'seconds': round(seconds, 3), 'rows_per_second': round(count / seconds, 1) if seconds else 0.0}
+
+    def run_listing(self):
+        results = {}
+        job = self.jobs[0]
+        # Page 500 at full scale; the last page when fewer candidates were loaded.
+        pages = -(-Resume.objects.count() // StandardResultsSetPagination.page_size)
+        deep_page = max(1, min(500, pages))
+        endpoints = {
+            'list': reverse('resume-list'),
+            'list_job': f"{reverse('resume-list')}?job_id={job.pk}",
+            'sort_name': f"{reverse('resume-list')}?sort_by=name",
+            'sort_uploaded': f"{reverse('resume-list')}?sort_by=-uploaded_on",
+            'deep_page': f"{reverse('resume-list')}?page={deep_page}",
+            'cursor': f"{reverse('resume-list')}?pagination=cursor&sort_by=name",
+            'skills': f"{reverse('resume-list')}?skills=python,django",
+            'search': f"{reverse('search')}?q=python&type=resumes",
+            'jobs': reverse('job-list'),
+        }
+        for name, url in endpoints.items():
+            with override_settings(LISTING_CACHE_TIMEOUT=0):
+                timings = {'uncached': self.time_get(url)}
+            # Listings with an ETag are also served from the response cache and revalidated.
+            etag = self.client.get(url).get('ETag')
+            if etag:
+                timings['cached'] = self.time_get(url)
+                timings['not_modified'] = self.time_get(url, 304, HTTP_IF_NONE_MATCH=etag)
+            results[name] = timings
+            self.stdout.write('  ' + f"{name:<14}" + ', '.join(
+                f"{kind} p50 {summary['p50_ms']:.1f} ms p99 {summary['p99_ms']:.1f} ms" for kind, summary in timings.items()
+            ))
+
+        started = time.perf_counter()
+        size = sum(len(chunk) for chunk in self.client.get(reverse('job-export', args=[job.pk])).streaming_content)
+        seconds = time.perf_counter() - started
+        results['export_csv'] = {'rows': Resume.objects.filter(job_description=job).count(), 'bytes': size, 'seconds': round(seconds, 3)}
+        self.stdout.write(f"  export_csv    {results['export_csv']['rows']} rows in {seconds * 1000:.0f} ms")
+        return results
+
+    def time_get(self, url, expected_status=200, **headers):
+        seconds = []
+        self.client.get(url, **headers)  # warm up
+        for _ in range(self.options['samples']):
+            started = time.perf_counter()
+            response = self.client.get(url, **headers)
+            seconds.append(time.perf_counter() - started)
+            if response.status_code != expected_status:
+                raise CommandError(f"GET {url} returned {response.status_code}, expected {expected_status}.")
+        return latency_summary(seconds)
+
+    def run_analysis(self):
+        results = {}
+        job = self.jobs[0]
+        for kind, make_pdf in PDF_KINDS.items():
+            pdfs = [make_pdf(self.rng) for _ in range(8)]
+            results[kind] = {}
+            for mode in ('wsgi', 'asgi'):
+                concurrency = self.options['threads'] if mode == 'wsgi' else self.options['concurrency']
+                metrics.reset()
+                result = measure_analysis(mode, pdfs, job, self.options['requests'], concurrency)
+                attempts = {labels['outcome']: metrics.GEMINI_REQUESTS.value(**labels) for labels in metrics.GEMINI_REQUESTS.label_values()}
+                result['gemini_attempts'] = sum(attempts.values())
+                result['gemini_failed_attempts'] = sum(count for outcome, count in attempts.items() if outcome != '200')
+                result['stage_mean_ms'] = {
+                    labels['stage']: round(metrics.STAGE_SECONDS.sum(**labels) / metrics.STAGE_SECONDS.count(**labels) * 1000, 2)
+                    for labels in metrics.STAGE_SECONDS.label_values()
+                }
+                results[kind][mode] = result
+                self.stdout.write(
+                    f"  {kind:<8}{mode:<5} concurrency {concurrency:>3}: {result['throughput']:>7.2f} req/s, "
+                    f"p50 {result['p50_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms, {result['errors']} error(s), "
+                    f"{result['gemini_failed_attempts']} retried Gemini call(s)"
+                )
+        return results
+
+    def run_memory(self):
+        job = self.jobs[0]
+        export_url = reverse('job-export', args=[job.pk])
+
+        def analyze(make_pdf):
+            upload = SimpleUploadedFile('resume.pdf', make_pdf(self.rng), content_type='application/pdf')
+            return lambda: self.client.post(reverse('analyze-resume'), {'file': upload, 'job_description_id': job.pk})
+
+        scenarios = {f'analysis_{kind}': analyze(make_pdf) for kind, make_pdf in PDF_KINDS.items()}
+        scenarios['list_page_100'] = lambda: self.client.get(f"{reverse('resume-list')}?page_size=100")
+        # Consumed chunk by chunk, as a client downloading the file would.
+        scenarios['export_csv'] = lambda: sum(len(chunk) for chunk in self.client.get(export_url).streaming_content)
+
+        results = {}
+        with override_settings(LISTING_CACHE_TIMEOUT=0):
+            for name, run in scenarios.items():
+                tracemalloc.start()
+                try:
+                    run()
+                    results[name] = {'peak_kib': round(tracemalloc.get_traced_memory()[1] / 1024, 1)}
+                finally:
+                    tracemalloc.stop()
+                self.stdout.write(f"  {name:<14} peak {results[name]['peak_kib'] / 1024:.1f} MiB")
+        try:
+            import resource
+        except ImportError:  # Windows
+            pass
+        else:
+            # ru_maxrss is in KiB on Linux; bytes on macOS.
+            results['max_rss_kib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return results
+
+    def print_comparison(self, baseline, report):
+        revision = (baseline.get('meta') or {}).get('revision') or 'baseline'
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Change from {revision[:12]}:"))
+        for metric, before, after, change in compare(baseline, report):
+            if metric.endswith(('.samples', '.requests', '.concurrency', '.rows')):
+                continue
+            change = f"{change:+.1%}" if change is not None else 'n/a'
+            self.stdout.write(f"  {metric:<60} {before:>12} -> {after:<12} {change}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api import scorecard_cache
+
+
+class Command(BaseCommand):
+    help = "Show scorecard cache statistics, or evict/clear cached scorecards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evict', action='store_true', help="Apply the age and size limits now.")
+        parser.add_argument('--clear', action='store_true', help="Delete every cached scorecard.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write(f"Cleared {scorecard_cache.clear()} cached scorecard(s).")
+        elif options['evict']:
+            self.stdout.write(f"Evicted {scorecard_cache.evict()} cached scorecard(s).")
+
+        stats = scorecard_cache.stats()
+        self.stdout.write(f"Entries:           {stats['entries']}")
+        self.stdout.write(f"Hits / misses:     {stats['hits']} / {stats['misses']} ({stats['hit_rate']:.1%} hit rate)")
+        self.stdout.write(f"Evictions:         {stats['evictions']}")
+        self.stdout.write(f"LLM seconds saved: {stats['llm_seconds_saved']:.1f}")
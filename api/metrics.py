@@ -0,0 +1,305 @@
+# api/metrics.py
+#
+# In-process metrics for the analysis pipeline: how long each stage of an
+# analysis takes, request and upload sizes, Gemini token usage and cache hit
+# rates. `render()` writes them in the Prometheus text exposition format, for
+# the /api/metrics/ endpoint and the worker exporter (`serve()`). Values are
+# per process, so scrape every web and worker process.
+#
+# `stage()` times a block into the stage histogram and, while a request is
+# being served by ServerTimingMiddleware, into that request's Server-Timing
+# header.
+
+import contextvars
+import hmac
+import ipaddress
+import math
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(1024 * 4 ** power for power in range(9))  # 1 KiB .. 64 MiB
+
+_registry = []
+_registry_lock = threading.Lock()
+# [(stage, seconds)] of the request being served, when Server-Timing is on.
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+    suffix = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labelnames) or 'none'}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def label_values(self):
+        """The label sets observed so far, as dicts."""
+        with self._lock:
+            return [dict(zip(self.labelnames, key)) for key in self._values]
+
+    def expose(self):
+        name = self.name + self.suffix
+        lines = [f'# HELP {name} {self.documentation}', f'# TYPE {name} {self.kind}']
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.extend(self._sample_lines(list(zip(self.labelnames, key)), value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    suffix = '_total'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _sample_lines(self, labels, value):
+        return [f'{self.name}_total{_format_labels(labels)} {_format_value(value)}']
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket, then the sum.
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-1] += value
+
+    def count(self, **labels):
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return sum(counts[:-1]) if counts else 0
+
+    def sum(self, **labels):
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return counts[-1] if counts else 0.0
+
+    def _sample_lines(self, labels, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", _format_value(float(bound)))])} {cumulative}')
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(counts[-1])}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'resume_analysis_stage_seconds',
+    "Time spent in each stage of a resume analysis.",
+    ['stage'],
+)
+UPLOAD_BYTES = Histogram('resume_upload_bytes', "Size of uploaded CV files.", buckets=BYTES_BUCKETS)
+GEMINI_REQUEST_BYTES = Histogram('gemini_request_bytes', "Size of Gemini request bodies as sent.", buckets=BYTES_BUCKETS)
+GEMINI_RESPONSE_BYTES = Histogram('gemini_response_bytes', "Size of Gemini response bodies.", buckets=BYTES_BUCKETS)
+GEMINI_REQUESTS = Counter(
+    'gemini_requests',
+    "Gemini HTTP attempts by outcome: the response status, 'timeout' or 'connection_error'.",
+    ['outcome'],
+)
+GEMINI_TOKENS = Counter('gemini_tokens', "Tokens reported in Gemini usageMetadata, by kind.", ['kind'])
+JSON_RECOVERY = Counter(
+    'scorecard_json_parse',
+    "How scorecards were recovered from model output: 'raw_decode', 'markdown' or 'failed'.",
+    ['method'],
+)
+CACHE_LOOKUPS = Counter('cache_lookups', "Scorecard and extraction cache lookups, by result.", ['cache', 'result'])
+EXTRACTED_PAGES = Counter('resume_extracted_pages', "PDF pages extracted, by the path they took.", ['method'])
+
+
+def observe_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """Time the block as stage `name` (also when it raises)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def record_token_usage(response):
+    """Count the token usage of a decoded `generateContent` response."""
+    usage = response.get('usageMetadata') if isinstance(response, dict) else None
+    for key, value in (usage or {}).items():
+        if key.endswith('TokenCount') and isinstance(value, int):
+            GEMINI_TOKENS.inc(value, kind=key[:-len('TokenCount')])
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return '\n'.join(line for metric in metrics for line in metric.expose()) + '\n'
+
+
+def reset():
+    """Zero every metric; for tests and benchmarks."""
+    with _registry_lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        metric.clear()
+
+
+def server_timing_header(timings, total):
+    """Format `[(stage, seconds)]` as a Server-Timing value; repeated stages are summed."""
+    durations = {}
+    counts = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0.0) + seconds
+        counts[name] = counts.get(name, 0) + 1
+    entries = [
+        f'{name};dur={seconds * 1000:.1f}' + (f';desc="{counts[name]}x"' if counts[name] > 1 else '')
+        for name, seconds in durations.items()
+    ]
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+class ServerTimingMiddleware:
+    """Adds a `Server-Timing` header listing the stages of the request when SERVER_TIMING_ENABLED is set.
+
+    Works under WSGI and ASGI. Stages run on threads the request started
+    itself (e.g. multi-job scoring) are left out of the header but still
+    recorded in the histograms.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.SERVER_TIMING_ENABLED:
+            return self.get_response(request)
+        timings = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        response['Server-Timing'] = server_timing_header(timings, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.SERVER_TIMING_ENABLED:
+            return await self.get_response(request)
+        timings = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        response['Server-Timing'] = server_timing_header(timings, time.perf_counter() - started)
+        return response
+
+
+def has_scrape_token(authorization):
+    """Whether an Authorization header carries METRICS_TOKEN as a bearer token; False when none is configured."""
+    token = settings.METRICS_TOKEN
+    return bool(token) and hmac.compare_digest(authorization or '', f'Bearer {token}')
+
+
+class _ExporterHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if settings.METRICS_TOKEN and not has_scrape_token(self.headers.get('Authorization')):
+            self.send_error(401, "A valid metrics token is required.")
+            return
+        data = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve `render()` over HTTP on a daemon thread, for processes without the web app (e.g. workers).
+
+    Without METRICS_TOKEN the exporter can't authenticate scrapers, so it
+    only binds to a loopback address.
+    """
+    if not settings.METRICS_TOKEN and not ipaddress.ip_address(socket.gethostbyname(host)).is_loopback:
+        raise ValueError(f"Set METRICS_TOKEN to serve metrics on {host}; without it only loopback addresses are allowed.")
+    server = ThreadingHTTPServer((host, port), _ExporterHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+    return server
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_analysistask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScorecardCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hits', models.PositiveBigIntegerField(default=0)),
+                ('misses', models.PositiveBigIntegerField(default=0)),
+                ('evictions', models.PositiveBigIntegerField(default=0)),
+                ('seconds_saved', models.FloatField(default=0.0, help_text='LLM time avoided by serving hits from the cache')),
+            ],
+            options={
+                'verbose_name_plural': 'scorecard cache stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='ScorecardCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pdf_sha256', models.CharField(max_length=64)),
+                ('job_description_sha256', models.CharField(max_length=64)),
+                ('pipeline_version', models.CharField(help_text='Prompt/model/pipeline version the scorecard was generated with', max_length=64)),
+                ('scorecard_data', models.JSONField()),
+                ('generation_seconds', models.FloatField(default=0.0, help_text='How long the original LLM analysis took')),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='scorecardcache_lru_idx'), models.Index(fields=['created_at'], name='scorecardcache_age_idx')],
+                'constraints': [models.UniqueConstraint(fields=('pdf_sha256', 'job_description_sha256', 'pipeline_version'), name='unique_scorecard_cache_key')],
+            },
+        ),
+    ]
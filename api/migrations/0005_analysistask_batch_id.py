@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_scorecard_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysistask',
+            name='batch_id',
+            field=models.UUIDField(blank=True, db_index=True, help_text='Set when the task was queued as part of a batch upload', null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_analysistask_batch_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='job_hopping_flag',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='match_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='red_flag_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='resume',
+            index=models.Index(fields=['job_description', '-match_score', '-uploaded_on'], name='resume_job_score_idx'),
+        ),
+    ]
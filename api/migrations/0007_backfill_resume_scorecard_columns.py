@@ -0,0 +1,37 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_scorecard_columns(apps, schema_editor):
+    # Historical models don't have Resume.apply_scorecard_fields(), so the
+    # extraction is repeated here as it stood when the columns were added.
+    Resume = apps.get_model('api', 'Resume')
+    batch = []
+    for resume in Resume.objects.only('id', 'scorecard_data').iterator(chunk_size=BATCH_SIZE):
+        scorecard = resume.scorecard_data if isinstance(resume.scorecard_data, dict) else {}
+        try:
+            resume.match_score = float(scorecard.get('match_score'))
+        except (TypeError, ValueError):
+            resume.match_score = None
+        hopping = (scorecard.get('experience_analysis') or {}).get('job_hopping_flag')
+        resume.job_hopping_flag = hopping if isinstance(hopping, bool) else None
+        red_flags = scorecard.get('red_flags')
+        resume.red_flag_count = len(red_flags) if isinstance(red_flags, list) else None
+        batch.append(resume)
+        if len(batch) >= BATCH_SIZE:
+            Resume.objects.bulk_update(batch, ['match_score', 'job_hopping_flag', 'red_flag_count'])
+            batch = []
+    if batch:
+        Resume.objects.bulk_update(batch, ['match_score', 'job_hopping_flag', 'red_flag_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_resume_scorecard_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_scorecard_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_backfill_resume_scorecard_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='resume',
+            name='resume_job_score_idx',
+        ),
+        migrations.AddIndex(
+            model_name='jobdescription',
+            index=models.Index(fields=['-created_at', '-id'], name='job_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resume',
+            index=models.Index(fields=['job_description', '-match_score', '-uploaded_on', '-id'], name='resume_job_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resume',
+            index=models.Index(fields=['job_description', 'name', 'id'], name='resume_job_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resume',
+            index=models.Index(fields=['job_description', '-uploaded_on', '-id'], name='resume_job_uploaded_idx'),
+        ),
+    ]
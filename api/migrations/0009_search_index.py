@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# Mirrors api.search.SQLiteFTSBackend as it stood when the index was added.
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE api_search_index USING fts5(
+    kind, job, title, body,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+POPULATE_JOBS = """
+INSERT INTO api_search_index (rowid, kind, job, title, body)
+SELECT id * 2, 'job', 'j' || id, title, description FROM api_jobdescription
+"""
+
+# JSON arrays are inserted as their JSON text; the tokenizer drops the brackets,
+# quotes and commas, leaving the same terms as api.search.resume_document().
+POPULATE_RESUMES = """
+INSERT INTO api_search_index (rowid, kind, job, title, body)
+SELECT id * 2 + 1, 'resume',
+       CASE WHEN job_description_id IS NULL THEN '' ELSE 'j' || job_description_id END,
+       COALESCE(name, ''),
+       CASE WHEN json_valid(scorecard_data) THEN
+           COALESCE(json_extract(scorecard_data, '$.summary'), '') || ' ' ||
+           COALESCE(json_extract(scorecard_data, '$.skillset_evaluation.hard_skills'), '') || ' ' ||
+           COALESCE(json_extract(scorecard_data, '$.skillset_evaluation.soft_skills'), '') || ' ' ||
+           COALESCE(json_extract(scorecard_data, '$.skillset_evaluation.certifications'), '') || ' ' ||
+           COALESCE(json_extract(scorecard_data, '$.experience_analysis.relevant_domains'), '')
+       ELSE '' END
+FROM api_resume
+"""
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases use api.search.DatabaseSearchBackend, which needs no table.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX)
+    schema_editor.execute(POPULATE_JOBS)
+    schema_editor.execute(POPULATE_RESUMES)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS api_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
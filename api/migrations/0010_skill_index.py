@@ -0,0 +1,49 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Canonical, lower-case name used for matching', max_length=100, unique=True)),
+                ('label', models.CharField(help_text='Display spelling, as first seen in a scorecard', max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumeSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('hard', 'Hard skill'), ('soft', 'Soft skill'), ('certification', 'Certification')], help_text='Where the skill was first listed in the scorecard', max_length=20)),
+                ('job_description', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.jobdescription')),
+                ('resume', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='api.resume')),
+                ('skill', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='resume_links', to='api.skill')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='skills',
+            field=models.ManyToManyField(blank=True, related_name='resumes', through='api.ResumeSkill', to='api.skill'),
+        ),
+        migrations.AddIndex(
+            model_name='resumeskill',
+            index=models.Index(fields=['skill', 'resume'], name='resumeskill_skill_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumeskill',
+            index=models.Index(fields=['job_description', 'skill', 'category'], name='resumeskill_job_facet_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumeskill',
+            constraint=models.UniqueConstraint(fields=('resume', 'skill'), name='unique_resume_skill'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_skill_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='prescreen_score',
+            field=models.FloatField(blank=True, editable=False, help_text='Local TF-IDF relevance score (api/prescreen.py)', null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:55
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_versions(apps, schema_editor):
+    # There is no record of which job text existing scorecards were made
+    # against, so they are taken to match the current one; only edits from
+    # here on mark resumes stale.
+    JobDescription = apps.get_model('api', 'JobDescription')
+    Resume = apps.get_model('api', 'Resume')
+    for job in JobDescription.objects.only('id', 'description').iterator():
+        content_hash = hashlib.sha256((job.description or '').encode('utf-8')).hexdigest()
+        JobDescription.objects.filter(pk=job.pk).update(content_hash=content_hash)
+        Resume.objects.filter(job_description_id=job.pk).update(scored_against=content_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_resume_prescreen_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysistask',
+            name='kind',
+            field=models.CharField(choices=[('analyze', 'Analyze an upload'), ('rescore', 'Re-score an existing resume')], default='analyze', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='jobdescription',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='scored_against',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 06:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_scorecard_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobAnalytics',
+            fields=[
+                ('job_description', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analytics', serialize=False, to='api.jobdescription')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'job analytics',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='resume',
+            index=models.Index(fields=['job_description', 'status'], name='resume_job_status_idx'),
+        ),
+    ]
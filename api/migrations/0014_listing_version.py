@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 06:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_job_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingVersion',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def clear_analytics(apps, schema_editor):
+    # Stored analytics predate per-flag red-flag frequencies; recompute on next read.
+    JobAnalytics = apps.get_model('api', 'JobAnalytics')
+    JobAnalytics.objects.update(data=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_listing_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_analytics, migrations.RunPython.noop),
+    ]
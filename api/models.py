@@ -1,15 +1,46 @@
+import hashlib
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class JobDescription(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # sha256 of the description: the version of the job text scorecards are made against.
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='job_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @staticmethod
+    def hash_content(description):
+        return hashlib.sha256((description or '').encode('utf-8')).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.hash_content(self.description)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'description' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'content_hash'}
+        super().save(*args, **kwargs)
+
+class Skill(models.Model):
+    """A skill under its canonical name (see api/skills.py), shared by every resume that lists it."""
+    name = models.CharField(max_length=100, unique=True, help_text="Canonical, lower-case name used for matching")
+    label = models.CharField(max_length=100, help_text="Display spelling, as first seen in a scorecard")
+
+    def __str__(self):
+        return self.label
+
+
 class Resume(models.Model):
     # --- NEW: Status Field ---
     STATUS_CHOICES = [
@@ -36,7 +67,215 @@ class Resume(models.Model):
     original_cv = models.FileField(upload_to='resumes/', null=True, blank=True, help_text="Upload the original CV file")
     uploaded_on = models.DateTimeField(auto_now_add=True)
 
+    # Copies of hot scalar values from scorecard_data, kept as real columns so
+    # ranking and filtering don't have to extract them from JSON on every row.
+    # Filled by apply_scorecard_fields() on save; bulk writers must call it.
+    match_score = models.FloatField(null=True, blank=True, editable=False)
+    job_hopping_flag = models.BooleanField(null=True, blank=True, editable=False)
+    red_flag_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # JobDescription.content_hash of the job text the scorecard was produced
+    # against; a resume is stale once the job's hash moves on.
+    scored_against = models.CharField(max_length=64, blank=True, default='', editable=False)
+    prescreen_score = models.FloatField(null=True, blank=True, editable=False, help_text="Local TF-IDF relevance score (api/prescreen.py)")
+
+    # Normalized copy of scorecard_data['skillset_evaluation'], kept in sync by
+    # api.skills.sync_resume_skills(); bulk writers must call it.
+    skills = models.ManyToManyField(Skill, through='ResumeSkill', related_name='resumes', blank=True)
+
+    class Meta:
+        indexes = [
+            # Ranked candidate lists per job, one index per supported ordering,
+            # each ending in the id tiebreaker used by keyset pagination.
+            # Rankings order by match_score DESC NULLS LAST; this plain
+            # descending index matches that only because SQLite sorts NULLs
+            # first in ascending order (so last in descending). PostgreSQL puts
+            # them first in DESC, so there the index needs
+            # F('match_score').desc(nulls_last=True) instead.
+            models.Index(fields=['job_description', '-match_score', '-uploaded_on', '-id'], name='resume_job_score_idx'),
+            models.Index(fields=['job_description', 'name', 'id'], name='resume_job_name_idx'),
+            models.Index(fields=['job_description', '-uploaded_on', '-id'], name='resume_job_uploaded_idx'),
+            # Status funnel counts per job (api/analytics.py).
+            models.Index(fields=['job_description', 'status'], name='resume_job_status_idx'),
+        ]
+
     def __str__(self):
         if self.scorecard_data and 'basic_information' in self.scorecard_data:
             return self.scorecard_data['basic_information'].get('name', f"Resume {self.id}")
         return self.name or f"Resume {self.id}"
+
+    def apply_scorecard_fields(self):
+        scorecard = self.scorecard_data if isinstance(self.scorecard_data, dict) else {}
+
+        try:
+            self.match_score = float(scorecard.get('match_score'))
+        except (TypeError, ValueError):
+            self.match_score = None
+
+        hopping = (scorecard.get('experience_analysis') or {}).get('job_hopping_flag')
+        self.job_hopping_flag = hopping if isinstance(hopping, bool) else None
+
+        red_flags = scorecard.get('red_flags')
+        self.red_flag_count = len(red_flags) if isinstance(red_flags, list) else None
+
+        prescreen = scorecard.get('prescreen')
+        score = prescreen.get('score') if isinstance(prescreen, dict) else None
+        self.prescreen_score = float(score) if isinstance(score, (int, float)) else None
+
+    def save(self, *args, **kwargs):
+        self.apply_scorecard_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'scorecard_data' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'match_score', 'job_hopping_flag', 'red_flag_count', 'prescreen_score'}
+        super().save(*args, **kwargs)
+
+
+class JobAnalytics(models.Model):
+    """Cached pipeline statistics of one job (api/analytics.py).
+
+    `data` is cleared and `version` bumped whenever one of the job's resumes
+    changes; a computation only stores its result if `version` hasn't moved
+    in the meantime.
+    """
+    job_description = models.OneToOneField(JobDescription, on_delete=models.CASCADE, primary_key=True, related_name='analytics')
+    version = models.PositiveBigIntegerField(default=0)
+    data = models.JSONField(null=True, blank=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'job analytics'
+
+    def __str__(self):
+        return f"Analytics for job {self.job_description_id}"
+
+
+class ListingVersion(models.Model):
+    """Change counter behind the conditional GET and response cache of a listing (api/listing_cache.py)."""
+    name = models.CharField(max_length=32, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class ResumeSkill(models.Model):
+    CATEGORY_HARD = 'hard'
+    CATEGORY_SOFT = 'soft'
+    CATEGORY_CERTIFICATION = 'certification'
+    CATEGORY_CHOICES = [
+        (CATEGORY_HARD, 'Hard skill'),
+        (CATEGORY_SOFT, 'Soft skill'),
+        (CATEGORY_CERTIFICATION, 'Certification'),
+    ]
+
+    # The composite indexes below lead with each of these, so no single-column ones.
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='skill_links', db_index=False)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='resume_links', db_index=False)
+    # Copy of resume.job_description (SET_NULL follows it when the job is
+    # deleted) so per-job facets read this table alone.
+    job_description = models.ForeignKey(JobDescription, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', db_index=False)
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, help_text="Where the skill was first listed in the scorecard")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resume', 'skill'], name='unique_resume_skill'),
+        ]
+        indexes = [
+            # Skill -> resumes lookups for filtering; the unique constraint covers resume -> skills.
+            models.Index(fields=['skill', 'resume'], name='resumeskill_skill_idx'),
+            # Covering index for skill frequency facets per job.
+            models.Index(fields=['job_description', 'skill', 'category'], name='resumeskill_job_facet_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resume_id}: {self.skill_id} ({self.category})"
+
+
+class AnalysisTask(models.Model):
+    """A queued resume analysis, claimed and run by the `run_analysis_workers` pool."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    KIND_ANALYZE = 'analyze'
+    KIND_RESCORE = 'rescore'
+    KIND_CHOICES = [
+        (KIND_ANALYZE, 'Analyze an upload'),
+        (KIND_RESCORE, 'Re-score an existing resume'),
+    ]
+    # Rescore tasks point `resume` at the resume to update and `upload` at its
+    # stored CV, which is left in place when the task finishes.
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_ANALYZE)
+
+    job_description = models.ForeignKey(JobDescription, on_delete=models.CASCADE, related_name='analysis_tasks')
+    upload = models.FileField(upload_to='analysis_tasks/', help_text="The uploaded CV, kept until the task finishes")
+    resume = models.ForeignKey(Resume, on_delete=models.SET_NULL, null=True, blank=True, related_name='analysis_tasks')
+    batch_id = models.UUIDField(null=True, blank=True, db_index=True, help_text="Set when the task was queued as part of a batch upload")
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    error = models.TextField(blank=True, default='')
+
+    worker_id = models.CharField(max_length=255, blank=True, default='')
+    available_at = models.DateTimeField(default=timezone.now, help_text="Earliest time a worker may claim this task")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='analysistask_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"AnalysisTask {self.id} ({self.status})"
+
+
+class ScorecardCacheEntry(models.Model):
+    """A stored scorecard keyed by the exact inputs that produced it."""
+    pdf_sha256 = models.CharField(max_length=64)
+    job_description_sha256 = models.CharField(max_length=64)
+    pipeline_version = models.CharField(max_length=64, help_text="Prompt/model/pipeline version the scorecard was generated with")
+    scorecard_data = models.JSONField()
+
+    generation_seconds = models.FloatField(default=0.0, help_text="How long the original LLM analysis took")
+    size_bytes = models.PositiveIntegerField(default=0)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pdf_sha256', 'job_description_sha256', 'pipeline_version'], name='unique_scorecard_cache_key'),
+        ]
+        indexes = [
+            models.Index(fields=['last_used_at'], name='scorecardcache_lru_idx'),
+            models.Index(fields=['created_at'], name='scorecardcache_age_idx'),
+        ]
+
+    def __str__(self):
+        return f"Scorecard cache {self.pdf_sha256[:12]}/{self.job_description_sha256[:12]}"
+
+
+class ScorecardCacheStats(models.Model):
+    """Single-row counters for the scorecard cache, shared by every process."""
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    evictions = models.PositiveBigIntegerField(default=0)
+    seconds_saved = models.FloatField(default=0.0, help_text="LLM time avoided by serving hits from the cache")
+
+    class Meta:
+        verbose_name_plural = 'scorecard cache stats'
+
+    def __str__(self):
+        return f"{self.hits} hits / {self.misses} misses"
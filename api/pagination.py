@@ -0,0 +1,170 @@
+# api/pagination.py
+
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks past the last row seen instead of using OFFSET.
+
+    The view supplies the ordering as a list of field names (with a leading
+    '-' for descending) via `get_keyset_ordering()`; the last one must be
+    unique. NULLs sort after every value in either direction, matching the
+    `nulls_last` ordering applied here. No COUNT(*) is run, so the response
+    has `next` and `previous` links but no total.
+    """
+    page_size = StandardResultsSetPagination.page_size
+    page_size_query_param = StandardResultsSetPagination.page_size_query_param
+    max_page_size = StandardResultsSetPagination.max_page_size
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if cursor['d'] not in ('n', 'p') or len(cursor['v']) != len(self.keys):
+                raise ValueError
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for (name, _), value in zip(self.keys, cursor['v']):
+            values.append(None if value is None else self.model._meta.get_field(name).to_python(value))
+        return cursor['d'] == 'p', values
+
+    def encode_cursor(self, row, backwards):
+        values = []
+        for name, _ in self.keys:
+            value = getattr(row, self.model._meta.get_field(name).attname)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = json.dumps({'d': 'p' if backwards else 'n', 'v': values}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _ordering(self, backwards):
+        ordering = []
+        for name, descending in self.keys:
+            nullable = self.model._meta.get_field(name).null
+            # Walking backwards reverses the ordering, so NULLs come first.
+            expression = F(name).asc if descending == backwards else F(name).desc
+            if nullable:
+                ordering.append(expression(nulls_first=True) if backwards else expression(nulls_last=True))
+            else:
+                ordering.append(expression())
+        return ordering
+
+    def _seek(self, values, backwards):
+        """Rows strictly after (or before, when walking backwards) the given key values."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self.keys, values):
+            if value is None:
+                # NULLs are last: nothing follows them, and every non-NULL precedes them.
+                beyond = Q(**{f'{name}__isnull': False}) if backwards else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                lookup = 'gt' if descending == backwards else 'lt'
+                beyond = Q(**{f'{name}__{lookup}': value})
+                if not backwards and self.model._meta.get_field(name).null:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in view.get_keyset_ordering()]
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        backwards = bool(cursor and cursor[0])
+        if cursor:
+            queryset = queryset.filter(self._seek(cursor[1], backwards))
+        rows = list(queryset.order_by(*self._ordering(backwards))[:page_size + 1])
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+
+        if backwards:
+            self.has_next, self.has_previous = bool(rows), has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        return self.encode_cursor(self.last_row, backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_row is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.first_row, backwards=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """Lets a viewset switch to `KeysetPagination` with `?pagination=cursor` (or any `cursor`)."""
+
+    def get_keyset_ordering(self):
+        raise NotImplementedError
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or KeysetPagination.cursor_query_param in params:
+                self._paginator = KeysetPagination()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,220 @@
+# api/prescreen.py
+#
+# A cheap local relevance score computed before a resume is sent to Gemini.
+# Job descriptions and resume text become TF-IDF vectors with IDF taken over
+# every job, and a resume's score for a job is the cosine similarity within
+# that job's terms. Scoring many resumes against many jobs is a couple of
+# matrix products per batch. When PRESCREEN_MIN_SCORE is set, resumes below
+# it get a placeholder scorecard instead of an LLM call.
+
+import html
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be been before being below between both but by can
+could did do does doing down during each either etc few for from further had has have having he her here hers him his
+how i if in into is it its itself just may me more most my must no nor not of off on once only or other our ours out
+over own per same she should so some such than that the their theirs them then there these they this those through to
+too under until up upon us very via was we well were what when where which while who whom why will with within without
+would you your yours
+page resume
+""".split())
+
+# Tokens must start with a letter; "c++", "c#" and ".net"-style names are
+# kept whole.
+TOKEN_RE = re.compile(r"[a-z][a-z0-9+#]*(?:[.\-/][a-z0-9+#]+)*")
+# Job descriptions are stored as rich-text HTML.
+TAG_RE = re.compile(r"<[^>]*>")
+
+
+def tokenize(text):
+    text = html.unescape(TAG_RE.sub(' ', text or '')).lower()
+    return [token for token in TOKEN_RE.findall(text) if len(token) > 1 and token not in STOP_WORDS]
+
+
+def document_text(document_parts):
+    """Return the text of extracted Gemini parts, or None if any page was sent as an image.
+
+    A partly scanned resume is never prescreened: its text alone would
+    understate the match.
+    """
+    texts = []
+    for part in document_parts:
+        if 'text' not in part:
+            return None
+        texts.append(part['text'])
+    return '\n'.join(texts)
+
+
+class PrescreenModel:
+    """TF-IDF over the vocabulary of a set of job descriptions.
+
+    Term frequencies are sublinear (1 + log tf) and IDF is smoothed, as in
+    the usual TF-IDF formulation. A resume is compared with a job by cosine
+    similarity within that job's terms, so long resumes are not penalized
+    for content the job doesn't ask about. Terms the model has not seen (a
+    job added since it was built) get the largest IDF.
+    """
+
+    def __init__(self, job_ids, job_texts):
+        self.job_ids = list(job_ids)
+        self.job_index = {job_id: column for column, job_id in enumerate(self.job_ids)}
+        job_texts = list(job_texts)
+        self.job_ids_by_text = {}
+        for job_id, text in zip(self.job_ids, job_texts):
+            self.job_ids_by_text.setdefault(text, job_id)
+        job_tokens = [tokenize(text) for text in job_texts]
+
+        self.vocabulary = {}
+        for tokens in job_tokens:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        document_frequency = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for tokens in job_tokens:
+            document_frequency[[self.vocabulary[token] for token in set(tokens)]] += 1
+        self.idf = np.log((1 + len(job_tokens)) / (1 + document_frequency)) + 1
+        self.unseen_idf = float(np.log(1 + len(job_tokens)) + 1)
+
+        job_weights = self._weight_matrix(job_tokens)
+        self.job_terms = (job_weights > 0).astype(np.float32)
+        norms = np.linalg.norm(job_weights, axis=1, keepdims=True)
+        self.job_matrix = np.divide(job_weights, norms, out=np.zeros_like(job_weights), where=norms > 0)
+
+    def _weight_matrix(self, token_lists):
+        matrix = np.zeros((len(token_lists), len(self.vocabulary)), dtype=np.float32)
+        for row, tokens in enumerate(token_lists):
+            columns = [self.vocabulary[token] for token in tokens if token in self.vocabulary]
+            if columns:
+                ids, counts = np.unique(columns, return_counts=True)
+                matrix[row, ids] = 1 + np.log(counts)
+        return matrix * self.idf
+
+    def similarity(self, resume_texts, batch_size=None, job_ids=None):
+        """Return the `(len(resume_texts), len(job_ids))` matrix of scores against `job_ids` (default: every job)."""
+        batch_size = batch_size or settings.PRESCREEN_BATCH_SIZE
+        job_matrix, job_terms = self.job_matrix, self.job_terms
+        if job_ids is not None:
+            columns = [self.job_index[job_id] for job_id in job_ids]
+            job_matrix, job_terms = job_matrix[columns], job_terms[columns]
+        scores = np.zeros((len(resume_texts), len(job_matrix)), dtype=np.float32)
+        # Batches bound the dense resume matrix to batch_size x vocabulary.
+        for start in range(0, len(resume_texts), batch_size):
+            weights = self._weight_matrix([tokenize(text) for text in resume_texts[start:start + batch_size]])
+            dot = weights @ job_matrix.T
+            # Norm of each resume restricted to each job's terms.
+            norms = np.sqrt((weights * weights) @ job_terms.T)
+            np.divide(dot, norms, out=scores[start:start + len(weights)], where=norms > 0)
+        return scores
+
+    def _idf(self, token):
+        column = self.vocabulary.get(token)
+        return self.unseen_idf if column is None else float(self.idf[column])
+
+    def score(self, resume_text, job_text):
+        """Score one resume against one job text, which need not be one of the model's jobs."""
+        job_counts = Counter(tokenize(job_text))
+        resume_counts = Counter(token for token in tokenize(resume_text) if token in job_counts)
+        job_weights = {token: (1 + math.log(count)) * self._idf(token) for token, count in job_counts.items()}
+        resume_weights = {token: (1 + math.log(count)) * self._idf(token) for token, count in resume_counts.items()}
+        dot = sum(weight * job_weights[token] for token, weight in resume_weights.items())
+        norms = math.sqrt(sum(w * w for w in job_weights.values())) * math.sqrt(sum(w * w for w in resume_weights.values()))
+        return dot / norms if norms else 0.0
+
+
+_model = None
+_model_built_at = 0.0
+_rebuilding = False
+_model_lock = threading.Lock()
+
+
+def _build_model():
+    from .models import JobDescription
+
+    jobs = list(JobDescription.objects.values_list('id', 'description'))
+    return PrescreenModel([job_id for job_id, _ in jobs], [text for _, text in jobs])
+
+
+def _rebuild_model():
+    global _model, _model_built_at, _rebuilding
+    try:
+        model = _build_model()
+        with _model_lock:
+            _model, _model_built_at = model, time.monotonic()
+    except Exception:
+        logger.exception("Rebuilding the prescreen model failed; keeping the previous one.")
+    finally:
+        with _model_lock:
+            _rebuilding = False
+        connection.close()
+
+
+def get_model():
+    """Return a model fitted on every job description.
+
+    Only the first call builds it on the calling thread. Once it is older
+    than PRESCREEN_MODEL_TTL seconds it is rebuilt on a background thread,
+    and callers keep getting the current one meanwhile. Jobs added or edited
+    since the build are scored by `PrescreenModel.score()` (see
+    `prescreen()`), so a job change never forces a rebuild.
+    """
+    global _model, _model_built_at, _rebuilding
+    with _model_lock:
+        if _model is None:
+            _model, _model_built_at = _build_model(), time.monotonic()
+        elif not _rebuilding and time.monotonic() - _model_built_at > settings.PRESCREEN_MODEL_TTL:
+            _rebuilding = True
+            threading.Thread(target=_rebuild_model, name='prescreen-model', daemon=True).start()
+        return _model
+
+
+def invalidate_model():
+    """Drop the model so the next `get_model()` builds it afresh; for commands and tests."""
+    global _model
+    with _model_lock:
+        _model = None
+
+
+def prescreen_scorecard(score, threshold):
+    """The placeholder scorecard stored for a resume that was not sent to the LLM."""
+    return {
+        "prescreen": {"score": score, "threshold": threshold, "passed": False},
+        "summary": f"Not sent for full analysis: the prescreen score {score:.3f} is below the {threshold:.3f} threshold.",
+    }
+
+
+def is_prescreen_rejection(scorecard):
+    return (scorecard.get("prescreen") or {}).get("passed") is False
+
+
+def prescreen(document_parts, job_description_text):
+    """Return `(score, passed)` for extracted parts.
+
+    `score` is None when the document can't be prescreened, and everything
+    passes while PRESCREEN_MIN_SCORE is 0.
+    """
+    text = document_text(document_parts)
+    if text is None:
+        return None, True
+    with metrics.stage('prescreen'):
+        model = get_model()
+        job_id = model.job_ids_by_text.get(job_description_text)
+        if job_id is None:
+            # A job added or edited since the model was built.
+            score = model.score(text, job_description_text)
+        else:
+            score = float(model.similarity([text], job_ids=[job_id])[0, 0])
+    return score, score >= settings.PRESCREEN_MIN_SCORE
@@ -0,0 +1,175 @@
+# api/rendering.py
+#
+# Rasterizes the PDF pages that have to be sent to Gemini as images. Pages are
+# rendered in a process pool so long scanned CVs do not serialize on the
+# request thread, and the encoded output is kept under a byte budget by
+# re-rendering at a lower DPI when needed.
+
+import io
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+from django.conf import settings
+
+from . import metrics
+
+MIME_TYPES = {
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+# Each downscale aims slightly below the budget so one extra pass is rarely needed.
+DOWNSCALE_HEADROOM = 0.9
+MAX_DOWNSCALE_PASSES = 3
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class RenderSettings:
+    def __init__(self, dpi, grayscale, image_format, quality, max_payload_bytes, min_dpi, max_pages):
+        if image_format not in MIME_TYPES:
+            raise ValueError(f"Unsupported image format '{image_format}'. Use one of: {', '.join(MIME_TYPES)}.")
+        self.dpi = dpi
+        self.grayscale = grayscale
+        self.image_format = image_format
+        self.quality = quality
+        self.max_payload_bytes = max_payload_bytes
+        self.min_dpi = min_dpi
+        self.max_pages = max_pages
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            dpi=settings.RENDER_DPI,
+            grayscale=settings.RENDER_GRAYSCALE,
+            image_format=settings.RENDER_IMAGE_FORMAT,
+            quality=settings.RENDER_IMAGE_QUALITY,
+            max_payload_bytes=settings.RENDER_MAX_PAYLOAD_BYTES,
+            min_dpi=settings.RENDER_MIN_DPI,
+            max_pages=settings.RENDER_MAX_PAGES,
+        )
+
+    @property
+    def mime_type(self):
+        return MIME_TYPES[self.image_format]
+
+    def cache_key(self):
+        return f"{self.dpi}-{'gray' if self.grayscale else 'rgb'}-{self.image_format}-{self.quality}-{self.max_payload_bytes}-{self.min_dpi}"
+
+
+class RenderedPage:
+    def __init__(self, page_number, mime_type, data, dpi):
+        self.page_number = page_number
+        self.mime_type = mime_type
+        self.data = data
+        self.dpi = dpi
+
+
+def _encode(pix, image_format, quality):
+    if image_format == 'png':
+        return pix.tobytes('png')
+    if image_format == 'jpeg':
+        return pix.tobytes('jpeg', jpg_quality=quality)
+
+    from PIL import Image
+
+    mode = 'L' if pix.n == 1 else 'RGB'
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP', quality=quality)
+    return buffer.getvalue()
+
+
+def open_pdf(pdf):
+    """Open a PDF given as bytes or as a file path; fitz reads files from disk as needed."""
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=pdf, filetype="pdf")
+    return fitz.open(pdf, filetype="pdf")
+
+
+def _render_chunk(pdf, page_numbers, dpi, grayscale, image_format, quality):
+    """Process-pool entry point: render the given 1-based page numbers.
+
+    Returns `(page_number, data, pixmap_seconds, encode_seconds)` per page;
+    the timings are recorded by the calling process.
+    """
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    rendered = []
+    with open_pdf(pdf) as doc:
+        for page_number in page_numbers:
+            started = time.perf_counter()
+            pix = doc[page_number - 1].get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+            rendered_at = time.perf_counter()
+            data = _encode(pix, image_format, quality)
+            rendered.append((page_number, data, rendered_at - started, time.perf_counter() - rendered_at))
+            del pix
+    return rendered
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn' keeps forked children from inheriting the web/worker
+            # threads and open DB connections of the parent.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _render_at(pdf, page_numbers, dpi, render_settings):
+    args = (dpi, render_settings.grayscale, render_settings.image_format, render_settings.quality)
+    workers = settings.RENDER_WORKERS
+    if workers <= 1 or len(page_numbers) <= 1:
+        return _render_chunk(pdf, page_numbers, *args)
+
+    chunk_count = min(workers, len(page_numbers))
+    chunks = [page_numbers[i::chunk_count] for i in range(chunk_count)]
+    # A path is all the worker processes need; bytes would be pickled to each of them.
+    futures = [get_executor().submit(_render_chunk, pdf, chunk, *args) for chunk in chunks]
+    rendered = []
+    for future in futures:
+        rendered.extend(future.result())
+    rendered.sort()
+    return rendered
+
+
+def _timed_render_at(pdf, page_numbers, dpi, render_settings):
+    rendered = []
+    for page_number, data, pixmap_seconds, encode_seconds in _render_at(pdf, page_numbers, dpi, render_settings):
+        metrics.observe_stage('render_page', pixmap_seconds)
+        metrics.observe_stage('image_encode', encode_seconds)
+        rendered.append((page_number, data))
+    return rendered
+
+
+def render_pages(pdf, page_numbers, render_settings=None):
+    """Render the given 1-based page numbers of a PDF (bytes or path) and return a list of `RenderedPage`.
+
+    If the encoded pages exceed `max_payload_bytes`, they are rendered again at
+    a DPI scaled by the square root of the overshoot, never below `min_dpi`.
+    """
+    render_settings = render_settings or RenderSettings.from_settings()
+    page_numbers = list(page_numbers)
+    if not page_numbers:
+        return []
+
+    dpi = render_settings.dpi
+    rendered = _timed_render_at(pdf, page_numbers, dpi, render_settings)
+    for _ in range(MAX_DOWNSCALE_PASSES):
+        total = sum(len(data) for _, data in rendered)
+        budget = render_settings.max_payload_bytes
+        if not budget or total <= budget or dpi <= render_settings.min_dpi:
+            break
+        dpi = max(render_settings.min_dpi, int(dpi * math.sqrt(budget / total) * DOWNSCALE_HEADROOM))
+        rendered = _timed_render_at(pdf, page_numbers, dpi, render_settings)
+
+    return [RenderedPage(page_number, render_settings.mime_type, data, dpi) for page_number, data in rendered]
@@ -0,0 +1,80 @@
+# api/rescore.py
+#
+# Re-running scorecards after a job description is edited. A resume is stale
+# when its `scored_against` differs from its job's `content_hash`; only stale
+# resumes are re-scored, from the CV already in storage, on a bounded thread
+# pool. Repeats go through the scorecard cache, so reverting a job to an
+# earlier text costs no LLM calls.
+
+import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connections
+
+from .scorecard import update_resume_from_scorecard
+from .scorecard_cache import get_or_generate_scorecard
+from .tasks import enqueue_analysis
+from .uploads import stored_pdf
+
+
+def stale_resumes(job_description):
+    return job_description.resumes.exclude(scored_against=job_description.content_hash)
+
+
+def resumes_to_rescore(job_description, include_current=False):
+    resumes = job_description.resumes.all() if include_current else stale_resumes(job_description)
+    return resumes.exclude(original_cv='').order_by('pk')
+
+
+def _score_stored_cv(resume, job_text):
+    """Worker-thread body: run the pipeline on a stored CV. Never raises."""
+    try:
+        return get_or_generate_scorecard(stored_pdf(resume.original_cv), job_text)
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+    finally:
+        connections.close_all()
+
+
+def rescore_job(job_description, resumes, concurrency=None):
+    """Re-score `resumes` against the job's current text.
+
+    Yields a result dict per resume as it finishes, then a summary dict.
+    Resumes are fed to the pool a few batches at a time, so a large job
+    doesn't queue every row up front.
+    """
+    concurrency = concurrency or settings.BATCH_ANALYSIS_CONCURRENCY
+    job_text = job_description.description
+    succeeded = failed = 0
+    iterator = resumes.iterator(chunk_size=concurrency * 4)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='rescore')
+    try:
+        while True:
+            batch = list(itertools.islice(iterator, concurrency * 4))
+            if not batch:
+                break
+            futures = {executor.submit(_score_stored_cv, resume, job_text): resume for resume in batch}
+            for future in as_completed(futures):
+                resume = futures[future]
+                scorecard = future.result()
+                if "error" in scorecard:
+                    failed += 1
+                    yield {"resume_id": resume.pk, "status": "failed", "error": scorecard["error"]}
+                    continue
+                update_resume_from_scorecard(resume, scorecard, job_description)
+                succeeded += 1
+                yield {"resume_id": resume.pk, "status": "succeeded", "match_score": resume.match_score}
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    yield {"status": "completed", "total": succeeded + failed, "succeeded": succeeded, "failed": failed}
+
+
+def enqueue_rescore(job_description, resumes, batch_id):
+    """Queue one rescore task per resume for the worker pool; returns how many were queued."""
+    count = 0
+    for resume in resumes.iterator():
+        enqueue_analysis(resume.original_cv.name, job_description, batch_id=batch_id, resume=resume)
+        count += 1
+    return count
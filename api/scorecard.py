@@ -0,0 +1,326 @@
+# api/scorecard.py
+
+import os
+import json
+import hashlib
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import metrics
+from .extraction import extract_document_parts
+from .gemini import GeminiError, get_async_client, get_client, is_retryable
+from .prescreen import prescreen, prescreen_scorecard
+from .models import Resume
+
+logger = logging.getLogger(__name__)
+
+SCORECARD_STRUCTURE = """{
+      "match_score": "number", "summary": "string", "skill_gap_analysis": ["string"],
+      "basic_information": { "name": "string", "email": "string", "phone": "string", "linkedin": "string" },
+      "experience_analysis": { "seniority_progression": ["string"], "tenure_summary": "string", "job_hopping_flag": "boolean", "relevant_domains": ["string"] },
+      "skillset_evaluation": { "hard_skills": ["string"], "soft_skills": ["string"], "certifications": ["string"] },
+      "positive_indicators": ["string"], "red_flags": ["string"], "cultural_fit_summary": "string", "personality_signals": ["string"]
+    }"""
+
+PROMPT_TEMPLATE = """
+    Analyze the following resume against the provided job description. Your only output must be a single, valid JSON object that strictly follows the requested structure. Do not include any text, explanations, or markdown formatting outside of the JSON object.
+
+    **Job Description:**
+    ---
+    {job_description_text}
+    ---
+
+    **Required JSON Output Structure:**
+    """ + SCORECARD_STRUCTURE.replace("{", "{{").replace("}", "}}") + """
+    """
+
+# One request scoring a resume against several jobs. Jobs are labelled by
+# position, so the prompt (and the cache entries made from it) don't depend
+# on database ids.
+MULTI_JOB_PROMPT_TEMPLATE = """
+    Analyze the following resume against each of the job descriptions below. Your only output must be a single, valid JSON object of the form {{"scorecards": [...]}} with one scorecard per job description, in the order given. Each scorecard must strictly follow the requested structure and add a "job_id" field holding the job description's ID. Do not include any text, explanations, or markdown formatting outside of the JSON object.
+
+{job_descriptions}
+
+    **Required JSON Structure of Each Scorecard:**
+    """ + SCORECARD_STRUCTURE.replace("{", "{{").replace("}", "}}") + """
+    """
+
+MULTI_JOB_DESCRIPTION_TEMPLATE = """    **Job Description (job_id: "{job_id}"):**
+    ---
+    {job_description_text}
+    ---
+"""
+
+# Identifies everything besides the inputs that shapes a scorecard. Bump
+# SCORECARD_PIPELINE_REVISION when changing how pages are sent to the model;
+# prompt and model changes are picked up automatically.
+SCORECARD_PIPELINE_REVISION = 3
+SCORECARD_PIPELINE_VERSION = hashlib.sha256(
+    f"{settings.GEMINI_MODEL}|{SCORECARD_PIPELINE_REVISION}|{PROMPT_TEMPLATE}".encode("utf-8")
+).hexdigest()[:16]
+# Scorecards made by multi-job analysis, which may come from a combined request.
+MULTI_JOB_PIPELINE_VERSION = hashlib.sha256(
+    f"{SCORECARD_PIPELINE_VERSION}|{MULTI_JOB_PROMPT_TEMPLATE}|{MULTI_JOB_DESCRIPTION_TEMPLATE}".encode("utf-8")
+).hexdigest()[:16]
+
+
+def get_gemini_api_key():
+    return os.environ.get("GEMINI_API_KEY")
+
+
+def build_resume_from_scorecard(scorecard, job_description, original_cv):
+    """Return an unsaved Resume for the scorecard, e.g. for `bulk_create`."""
+    resume = Resume(
+        name=scorecard.get('basic_information', {}).get('name'),
+        email=scorecard.get('basic_information', {}).get('email'),
+        scorecard_data=scorecard,
+        job_description=job_description,
+        original_cv=original_cv,
+        scored_against=job_description.content_hash if job_description else '',
+    )
+    resume.apply_scorecard_fields()
+    return resume
+
+
+def create_resume_from_scorecard(scorecard, job_description, original_cv):
+    resume = build_resume_from_scorecard(scorecard, job_description, original_cv)
+    with metrics.stage('db_insert'):
+        resume.save()
+    return resume
+
+
+def update_resume_from_scorecard(resume, scorecard, job_description):
+    """Store a re-run scorecard on an existing resume, keeping its status and any name already known."""
+    basic_information = scorecard.get('basic_information') or {}
+    resume.name = resume.name or basic_information.get('name')
+    resume.email = resume.email or basic_information.get('email')
+    resume.scorecard_data = scorecard
+    resume.scored_against = job_description.content_hash
+    resume.save(update_fields=['name', 'email', 'scorecard_data', 'scored_against'])
+
+
+def parse_scorecard_response(result):
+    """Extract the scorecard dict from a decoded `generateContent` response."""
+    with metrics.stage('parse'):
+        return _parse_scorecard_response(result)
+
+
+def _parse_scorecard_response(result):
+    raw_text = result['candidates'][0]['content']['parts'][0]['text']
+
+    # Robust JSON extraction:
+    # The AI is instructed to return only a JSON object, but sometimes
+    # it might include extra text or wrap the JSON in markdown.
+    try:
+        # Attempt to parse the first valid JSON object from the raw text
+        decoder = json.JSONDecoder()
+        scorecard, end_index = decoder.raw_decode(raw_text.strip())
+
+        # Optional: Log or handle if there's extra data after the first JSON object
+        remaining_text = raw_text.strip()[end_index:].strip()
+        if remaining_text:
+            logger.warning("Gemini API response contained extra data after JSON: '%s'", remaining_text)
+        metrics.JSON_RECOVERY.inc(method='raw_decode')
+
+    except json.JSONDecodeError as e:
+        # If raw_decode fails, it means the text doesn't start with a valid JSON object
+        # or is malformed. Try to find a JSON block wrapped in markdown,
+        # which is a common LLM output format.
+        markdown_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', raw_text, re.DOTALL)
+        if markdown_match:
+            scorecard = json.loads(markdown_match.group(1))
+            metrics.JSON_RECOVERY.inc(method='markdown')
+        else:
+            # If no markdown block found, or markdown parsing failed,
+            # and raw_decode also failed, then the response is genuinely problematic.
+            metrics.JSON_RECOVERY.inc(method='failed')
+            return {"error": f"Failed to decode JSON from AI response: {e}. Raw text was: '{raw_text}'"}
+
+    if 'match_score' in scorecard and isinstance(scorecard['match_score'], (int, float)) and scorecard['match_score'] > 10:
+        scorecard['match_score'] /= 10.0
+
+    return scorecard
+
+
+def build_scorecard_payload(document_parts, job_description_text):
+    prompt = PROMPT_TEMPLATE.format(job_description_text=job_description_text)
+    payload_parts = [{"text": prompt}, *document_parts]
+    return { "contents": [{"parts": payload_parts}], "generationConfig": {"response_mime_type": "application/json"} }
+
+
+def build_multi_job_payload(document_parts, job_description_texts):
+    job_descriptions = "\n".join(
+        MULTI_JOB_DESCRIPTION_TEMPLATE.format(job_id=position, job_description_text=text)
+        for position, text in enumerate(job_description_texts, start=1)
+    )
+    prompt = MULTI_JOB_PROMPT_TEMPLATE.format(job_descriptions=job_descriptions)
+    payload_parts = [{"text": prompt}, *document_parts]
+    return { "contents": [{"parts": payload_parts}], "generationConfig": {"response_mime_type": "application/json"} }
+
+
+def parse_multi_job_response(result, job_count):
+    """Return a list of `job_count` scorecards from a combined response, with None for any job it left out."""
+    response = parse_scorecard_response(result)
+    scorecards = response.get("scorecards") if isinstance(response, dict) else None
+    if not isinstance(scorecards, list):
+        return [None] * job_count
+    by_position = {}
+    for index, scorecard in enumerate(scorecards):
+        if not isinstance(scorecard, dict):
+            continue
+        try:
+            position = int(scorecard.pop("job_id", index + 1))
+        except (TypeError, ValueError):
+            position = index + 1
+        by_position.setdefault(position, scorecard)
+    return [by_position.get(position) for position in range(1, job_count + 1)]
+
+
+def _request_scorecard(document_parts, job_description_text):
+    client = get_client(get_gemini_api_key())
+    try:
+        result = client.generate_content(build_scorecard_payload(document_parts, job_description_text))
+        return parse_scorecard_response(result)
+    except Exception as e:
+        return {"error": str(e), "retryable": is_retryable(e)}
+
+
+async def _arequest_scorecard(document_parts, job_description_text):
+    client = get_async_client(get_gemini_api_key())
+    try:
+        result = await client.generate_content(build_scorecard_payload(document_parts, job_description_text))
+        return parse_scorecard_response(result)
+    except Exception as e:
+        return {"error": str(e), "retryable": is_retryable(e)}
+
+
+def _request_scorecards(document_parts, job_description_texts):
+    """One combined request for several jobs; jobs missing from the answer are requested one by one."""
+    if len(job_description_texts) == 1:
+        return [_request_scorecard(document_parts, job_description_texts[0])]
+    client = get_client(get_gemini_api_key())
+    try:
+        result = client.generate_content(build_multi_job_payload(document_parts, job_description_texts))
+        scorecards = parse_multi_job_response(result, len(job_description_texts))
+    except GeminiError as e:
+        return [{"error": str(e), "retryable": is_retryable(e)} for _ in job_description_texts]
+    except Exception:
+        logger.warning("Could not parse a combined multi-job response; requesting each job separately.", exc_info=True)
+        scorecards = [None] * len(job_description_texts)
+    return [
+        scorecard if scorecard is not None else _request_scorecard(document_parts, text)
+        for scorecard, text in zip(scorecards, job_description_texts)
+    ]
+
+
+def _passed_prescreen(scorecard, prescreen_score):
+    if prescreen_score is not None and "error" not in scorecard:
+        scorecard["prescreen"] = {"score": prescreen_score, "threshold": settings.PRESCREEN_MIN_SCORE, "passed": True}
+    return scorecard
+
+
+def score_document_parts(document_parts, job_description_text):
+    """Prescreen already-extracted document parts, then send them to Gemini and return the scorecard dict.
+
+    Documents below PRESCREEN_MIN_SCORE get the placeholder scorecard from
+    `prescreen_scorecard()` without an LLM call.
+    """
+    prescreen_score, passed = prescreen(document_parts, job_description_text)
+    if not passed:
+        logger.info("Resume prescreen score %.3f is below %.3f; skipping LLM analysis.", prescreen_score, settings.PRESCREEN_MIN_SCORE)
+        return prescreen_scorecard(prescreen_score, settings.PRESCREEN_MIN_SCORE)
+    return _passed_prescreen(_request_scorecard(document_parts, job_description_text), prescreen_score)
+
+
+async def ascore_document_parts(document_parts, job_description_text):
+    """Async `score_document_parts`: the Gemini call is awaited on the event loop."""
+    # The prescreen model is loaded from the database.
+    prescreen_score, passed = await sync_to_async(prescreen)(document_parts, job_description_text)
+    if not passed:
+        logger.info("Resume prescreen score %.3f is below %.3f; skipping LLM analysis.", prescreen_score, settings.PRESCREEN_MIN_SCORE)
+        return prescreen_scorecard(prescreen_score, settings.PRESCREEN_MIN_SCORE)
+    return _passed_prescreen(await _arequest_scorecard(document_parts, job_description_text), prescreen_score)
+
+
+def score_document_parts_for_jobs(document_parts, job_description_texts):
+    """Score one extracted document against several jobs; returns a scorecard per job text, in order.
+
+    Jobs that pass the prescreen are sent MULTI_JOB_COMBINE_MAX at a time in
+    combined requests, which run concurrently.
+    """
+    scorecards = [None] * len(job_description_texts)
+    pending = []
+    for index, text in enumerate(job_description_texts):
+        prescreen_score, passed = prescreen(document_parts, text)
+        if passed:
+            pending.append((index, text, prescreen_score))
+        else:
+            scorecards[index] = prescreen_scorecard(prescreen_score, settings.PRESCREEN_MIN_SCORE)
+
+    size = max(1, settings.MULTI_JOB_COMBINE_MAX)
+    groups = [pending[start:start + size] for start in range(0, len(pending), size)]
+    if groups:
+        with ThreadPoolExecutor(max_workers=min(len(groups), settings.BATCH_ANALYSIS_CONCURRENCY), thread_name_prefix='multi-job') as executor:
+            results = executor.map(lambda group: _request_scorecards(document_parts, [text for _, text, _ in group]), groups)
+            for group, group_scorecards in zip(groups, results):
+                for (index, _, prescreen_score), scorecard in zip(group, group_scorecards):
+                    scorecards[index] = _passed_prescreen(scorecard, prescreen_score)
+    return scorecards
+
+
+def log_extraction_report(extraction_report):
+    logger.info(
+        "Resume extraction: %d text page(s), %d image page(s), %d payload bytes, ~%d bytes saved",
+        len(extraction_report["text_pages"]), len(extraction_report["image_pages"]),
+        extraction_report["payload_bytes"], extraction_report["bytes_saved_estimate"],
+    )
+
+
+def generate_comparative_scorecard(pdf, job_description_text, report=None, pdf_hash=None):
+    """Analyze a resume PDF (bytes or a file path) against a job description and return the scorecard dict.
+
+    Failures are returned as `{"error": ...}` rather than raised, with
+    `"retryable": False` when the same input would fail again (an unreadable
+    PDF, a request Gemini rejects). If `report` is a dict, it is filled with the
+    extraction report for this document.
+    """
+    try:
+        document_parts, extraction_report = extract_document_parts(pdf, pdf_hash=pdf_hash)
+    except Exception as e:
+        return {"error": str(e), "retryable": False}
+
+    if report is not None:
+        report.update(extraction_report)
+    log_extraction_report(extraction_report)
+    return score_document_parts(document_parts, job_description_text)
+
+
+async def agenerate_comparative_scorecard(pdf, job_description_text, report=None, pdf_hash=None):
+    """Async `generate_comparative_scorecard`. Extraction is CPU-bound and runs in a worker thread."""
+    try:
+        document_parts, extraction_report = await sync_to_async(extract_document_parts, thread_sensitive=False)(pdf, pdf_hash=pdf_hash)
+    except Exception as e:
+        return {"error": str(e), "retryable": False}
+
+    if report is not None:
+        report.update(extraction_report)
+    log_extraction_report(extraction_report)
+    return await ascore_document_parts(document_parts, job_description_text)
+
+
+def generate_comparative_scorecards(pdf, job_description_texts, report=None, pdf_hash=None):
+    """Like `generate_comparative_scorecard`, for several job descriptions; the PDF is extracted once."""
+    try:
+        document_parts, extraction_report = extract_document_parts(pdf, pdf_hash=pdf_hash)
+    except Exception as e:
+        return [{"error": str(e), "retryable": False} for _ in job_description_texts]
+
+    if report is not None:
+        report.update(extraction_report)
+    log_extraction_report(extraction_report)
+    return score_document_parts_for_jobs(document_parts, job_description_texts)
@@ -0,0 +1,252 @@
+# api/scorecard_cache.py
+#
+# Persistent, content-addressed cache of generated scorecards. The key is the
+# SHA-256 of the PDF bytes, the SHA-256 of the job description text and the
+# scorecard pipeline version, so re-uploads of the same CV against the same
+# job never reach the LLM twice.
+
+import copy
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import ScorecardCacheEntry, ScorecardCacheStats
+from .prescreen import is_prescreen_rejection
+from .scorecard import (
+    MULTI_JOB_PIPELINE_VERSION, SCORECARD_PIPELINE_VERSION, agenerate_comparative_scorecard, generate_comparative_scorecard,
+    generate_comparative_scorecards,
+)
+from .uploads import pdf_sha256
+
+
+def sha256_hex(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def _bump(**increments):
+    stats, _ = ScorecardCacheStats.objects.get_or_create(pk=1)
+    ScorecardCacheStats.objects.filter(pk=stats.pk).update(
+        **{field: F(field) + amount for field, amount in increments.items()}
+    )
+
+
+def lookup(pdf_hash, job_hash, pipeline_version=SCORECARD_PIPELINE_VERSION):
+    entry = ScorecardCacheEntry.objects.filter(
+        pdf_sha256=pdf_hash,
+        job_description_sha256=job_hash,
+        pipeline_version=pipeline_version,
+    ).first()
+    if entry is None:
+        return None
+
+    max_age = settings.SCORECARD_CACHE_MAX_AGE_DAYS
+    if max_age and entry.created_at < timezone.now() - timedelta(days=max_age):
+        entry.delete()
+        _bump(evictions=1)
+        return None
+
+    ScorecardCacheEntry.objects.filter(pk=entry.pk).update(hit_count=F('hit_count') + 1, last_used_at=timezone.now())
+    return entry
+
+
+def store(pdf_hash, job_hash, scorecard, generation_seconds, pipeline_version=SCORECARD_PIPELINE_VERSION):
+    try:
+        with transaction.atomic():
+            ScorecardCacheEntry.objects.create(
+                pdf_sha256=pdf_hash,
+                job_description_sha256=job_hash,
+                pipeline_version=pipeline_version,
+                scorecard_data=scorecard,
+                generation_seconds=generation_seconds,
+                size_bytes=len(json.dumps(scorecard)),
+            )
+    except IntegrityError:
+        # A concurrent upload of the same CV stored it first.
+        return
+    evict()
+
+
+def evict():
+    """Drop entries past the age limit, then the least recently used ones over the size limits."""
+    evicted = 0
+    max_age = settings.SCORECARD_CACHE_MAX_AGE_DAYS
+    if max_age:
+        evicted += ScorecardCacheEntry.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=max_age)
+        ).delete()[0]
+
+    max_entries = settings.SCORECARD_CACHE_MAX_ENTRIES
+    if max_entries:
+        overflow = ScorecardCacheEntry.objects.count() - max_entries
+        if overflow > 0:
+            stale_ids = list(
+                ScorecardCacheEntry.objects.order_by('last_used_at').values_list('pk', flat=True)[:overflow]
+            )
+            evicted += ScorecardCacheEntry.objects.filter(pk__in=stale_ids).delete()[0]
+
+    max_bytes = settings.SCORECARD_CACHE_MAX_BYTES
+    if max_bytes:
+        total = 0
+        stale_ids = []
+        for pk, size in ScorecardCacheEntry.objects.order_by('-last_used_at').values_list('pk', 'size_bytes').iterator():
+            total += size
+            if total > max_bytes:
+                stale_ids.append(pk)
+        if stale_ids:
+            evicted += ScorecardCacheEntry.objects.filter(pk__in=stale_ids).delete()[0]
+
+    if evicted:
+        _bump(evictions=evicted)
+    return evicted
+
+
+def clear():
+    return ScorecardCacheEntry.objects.all().delete()[0]
+
+
+def stats():
+    counters, _ = ScorecardCacheStats.objects.get_or_create(pk=1)
+    lookups = counters.hits + counters.misses
+    return {
+        'entries': ScorecardCacheEntry.objects.count(),
+        'hits': counters.hits,
+        'misses': counters.misses,
+        'hit_rate': counters.hits / lookups if lookups else 0.0,
+        'evictions': counters.evictions,
+        'llm_seconds_saved': counters.seconds_saved,
+    }
+
+
+def _cached_copy(pdf_hash, job_hash, pipeline_versions=(SCORECARD_PIPELINE_VERSION,)):
+    """Return a copy of the first cached scorecard among `pipeline_versions`, or None; counts the hit or miss."""
+    for version in pipeline_versions:
+        entry = lookup(pdf_hash, job_hash, pipeline_version=version)
+        if entry is not None:
+            _bump(hits=1, seconds_saved=entry.generation_seconds)
+            metrics.CACHE_LOOKUPS.inc(cache="scorecard", result="hit")
+            return copy.deepcopy(entry.scorecard_data)
+    _bump(misses=1)
+    metrics.CACHE_LOOKUPS.inc(cache="scorecard", result="miss")
+    return None
+
+
+def _store_generated(pdf_hash, job_hash, scorecard, generation_seconds, pipeline_version=SCORECARD_PIPELINE_VERSION):
+    # Errors are never cached, so a transient upstream failure is retried on
+    # the next upload. Prescreen rejections are cheap to recompute and depend
+    # on the threshold.
+    if "error" not in scorecard and not is_prescreen_rejection(scorecard):
+        store(pdf_hash, job_hash, scorecard, generation_seconds, pipeline_version=pipeline_version)
+
+
+def cached_scorecard(pdf_hash, job_description_text, generate, report=None):
+    """Return the cached scorecard for `(pdf_hash, job text)`, or call `generate()` and cache its result.
+
+    Error scorecards and prescreen rejections are not cached. `report`, if
+    given, records whether the cache was hit.
+    """
+    if report is None:
+        report = {}
+    if not settings.SCORECARD_CACHE_ENABLED:
+        report["cache"] = "disabled"
+        return generate()
+
+    job_hash = sha256_hex(job_description_text)
+    scorecard = _cached_copy(pdf_hash, job_hash)
+    if scorecard is not None:
+        report["cache"] = "hit"
+        return scorecard
+
+    report["cache"] = "miss"
+    started = time.monotonic()
+    scorecard = generate()
+    _store_generated(pdf_hash, job_hash, scorecard, time.monotonic() - started)
+    return scorecard
+
+
+def get_or_generate_scorecard(pdf, job_description_text, report=None, pdf_hash=None):
+    """Run the scorecard pipeline for a PDF (bytes or a file path), serving repeat inputs from the cache.
+
+    Pass `pdf_hash` if the PDF's SHA-256 is already known.
+    """
+    if report is None:
+        report = {}
+    pdf_hash = pdf_hash or pdf_sha256(pdf)
+    return cached_scorecard(
+        pdf_hash,
+        job_description_text,
+        lambda: generate_comparative_scorecard(pdf, job_description_text, report=report, pdf_hash=pdf_hash),
+        report=report,
+    )
+
+
+async def aget_or_generate_scorecard(pdf, job_description_text, report=None, pdf_hash=None):
+    """Async `get_or_generate_scorecard`, for the async analysis view.
+
+    Only the model call is natively async; the cache bookkeeping is the
+    synchronous code above, run in a thread.
+    """
+    if report is None:
+        report = {}
+    if pdf_hash is None:
+        pdf_hash = await sync_to_async(pdf_sha256, thread_sensitive=False)(pdf)
+    if not settings.SCORECARD_CACHE_ENABLED:
+        report["cache"] = "disabled"
+        return await agenerate_comparative_scorecard(pdf, job_description_text, report=report, pdf_hash=pdf_hash)
+
+    job_hash = sha256_hex(job_description_text)
+    scorecard = await sync_to_async(_cached_copy)(pdf_hash, job_hash)
+    if scorecard is not None:
+        report["cache"] = "hit"
+        return scorecard
+
+    report["cache"] = "miss"
+    started = time.monotonic()
+    scorecard = await agenerate_comparative_scorecard(pdf, job_description_text, report=report, pdf_hash=pdf_hash)
+    await sync_to_async(_store_generated)(pdf_hash, job_hash, scorecard, time.monotonic() - started)
+    return scorecard
+
+
+def get_or_generate_scorecards(pdf, job_description_texts, report=None, pdf_hash=None):
+    """Return a scorecard per job text for one PDF, generating only the ones not cached.
+
+    Scorecards from single-job analysis are reused; the rest come from
+    `generate_comparative_scorecards()` and are cached under the multi-job
+    pipeline version. `report["cache"]` lists "hit" or "miss" per job text.
+    """
+    if report is None:
+        report = {}
+    pdf_hash = pdf_hash or pdf_sha256(pdf)
+    scorecards = {}
+    if settings.SCORECARD_CACHE_ENABLED:
+        for text in dict.fromkeys(job_description_texts):
+            scorecard = _cached_copy(pdf_hash, sha256_hex(text), (SCORECARD_PIPELINE_VERSION, MULTI_JOB_PIPELINE_VERSION))
+            if scorecard is not None:
+                scorecards[text] = scorecard
+
+    missing = [text for text in dict.fromkeys(job_description_texts) if text not in scorecards]
+    if missing:
+        started = time.monotonic()
+        generated = generate_comparative_scorecards(pdf, missing, report=report, pdf_hash=pdf_hash)
+        # The requests run concurrently, so each scorecard is credited with an equal share.
+        seconds = (time.monotonic() - started) / len(missing)
+        for text, scorecard in zip(missing, generated):
+            scorecards[text] = scorecard
+            if settings.SCORECARD_CACHE_ENABLED:
+                _store_generated(pdf_hash, sha256_hex(text), scorecard, seconds, pipeline_version=MULTI_JOB_PIPELINE_VERSION)
+
+    report["cache"] = [
+        "disabled" if not settings.SCORECARD_CACHE_ENABLED else "miss" if text in missing else "hit"
+        for text in job_description_texts
+    ]
+    # Jobs with the same text share one scorecard, but each Resume gets its own copy.
+    return [copy.deepcopy(scorecards[text]) for text in job_description_texts]
@@ -0,0 +1,229 @@
+# api/search.py
+#
+# Full-text search over job descriptions and candidate scorecards. The backend
+# is chosen by SEARCH_BACKEND; by default SQLite databases use an FTS5 index
+# (created in migration 0009) and anything else falls back to icontains
+# filters. The index is kept in sync by the signal handlers in api/signals.py;
+# code that writes with bulk_create()/update() must call index_resumes() or
+# index_jobs() itself.
+
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+JOB = 'job'
+RESUME = 'resume'
+KINDS = (JOB, RESUME)
+
+MAX_QUERY_TERMS = 16
+
+
+def _join_text(*values):
+    parts = []
+    for value in values:
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, list):
+            parts.extend(item for item in value if isinstance(item, str))
+    return ' '.join(parts)
+
+
+def job_document(job):
+    """Return the `(title, body)` indexed for a job."""
+    return job.title or '', job.description or ''
+
+
+def resume_document(resume):
+    """Return the `(title, body)` indexed for a resume: the name, plus summary, skills and domains."""
+    scorecard = resume.scorecard_data if isinstance(resume.scorecard_data, dict) else {}
+    skills = scorecard.get('skillset_evaluation') or {}
+    experience = scorecard.get('experience_analysis') or {}
+    body = _join_text(
+        scorecard.get('summary'),
+        skills.get('hard_skills'),
+        skills.get('soft_skills'),
+        skills.get('certifications'),
+        experience.get('relevant_domains'),
+    )
+    return resume.name or '', body
+
+
+def query_terms(query):
+    return re.findall(r'\w+', query or '')[:MAX_QUERY_TERMS]
+
+
+class DatabaseSearchBackend:
+    """Unindexed fallback: icontains filters, with title matches ranked first."""
+
+    fields = {
+        JOB: ('title', ('title', 'description')),
+        RESUME: ('name', ('name', 'scorecard_data')),
+    }
+
+    def index(self, kind, objects):
+        pass
+
+    def remove(self, kind, ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def _match(self, kind, terms):
+        _, columns = self.fields[kind]
+        condition = Q()
+        for term in terms:
+            any_column = Q()
+            for column in columns:
+                any_column |= Q(**{f'{column}__icontains': term})
+            condition &= any_column
+        return condition
+
+    def filter_queryset(self, queryset, kind, query):
+        terms = query_terms(query)
+        if not terms:
+            return queryset.none()
+        return queryset.filter(self._match(kind, terms))
+
+    def search(self, queryset, kind, query, limit, job_id=None):
+        """Return up to `limit` `(object_id, score)` pairs from `queryset`, best first.
+
+        `job_id` narrows resumes to one job; callers filter `queryset` the same way.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        title, _ = self.fields[kind]
+        title_match = Q()
+        for term in terms:
+            title_match &= Q(**{f'{title}__icontains': term})
+        rows = (
+            queryset.filter(self._match(kind, terms))
+            .annotate(search_score=Case(When(title_match, then=Value(2)), default=Value(1), output_field=IntegerField()))
+            .order_by('-search_score', '-pk')
+            .values_list('pk', 'search_score')[:limit]
+        )
+        return [(pk, float(score)) for pk, score in rows]
+
+
+class SQLiteFTSBackend:
+    """FTS5 index in the `api_search_index` virtual table.
+
+    Jobs and resumes share the table; the rowid is `id * 2` for a job and
+    `id * 2 + 1` for a resume so rows can be replaced and removed by rowid.
+    The `kind` and `job` columns hold tokens ("job"/"resume", "j<id>") so
+    narrowing by either goes through the index instead of filtering matches.
+    Terms are not stemmed, so a half-typed last word still prefix-matches.
+    """
+
+    table = 'api_search_index'
+    # bm25() weights for (kind, job, title, body).
+    weights = (0.0, 0.0, 10.0, 1.0)
+    chunk_size = 1000
+
+    @staticmethod
+    def rowid(kind, object_id):
+        return object_id * 2 + (1 if kind == RESUME else 0)
+
+    def _row(self, kind, obj):
+        if kind == JOB:
+            title, body = job_document(obj)
+            job_id = obj.pk
+        else:
+            title, body = resume_document(obj)
+            job_id = obj.job_description_id
+        return (self.rowid(kind, obj.pk), kind, f'j{job_id}' if job_id else '', title, body)
+
+    def index(self, kind, objects, replace=True):
+        rows = [self._row(kind, obj) for obj in objects]
+        if not rows:
+            return
+        with transaction.atomic(), connection.cursor() as cursor:
+            if replace:
+                cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(f'INSERT INTO {self.table} (rowid, kind, job, title, body) VALUES (%s, %s, %s, %s, %s)', rows)
+
+    def remove(self, kind, ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(self.rowid(kind, pk),) for pk in ids])
+
+    def rebuild(self):
+        from .models import JobDescription, Resume
+
+        count = 0
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {self.table}')
+            for kind, queryset in (
+                (JOB, JobDescription.objects.only('id', 'title', 'description')),
+                (RESUME, Resume.objects.only('id', 'name', 'scorecard_data', 'job_description_id')),
+            ):
+                batch = []
+                for obj in queryset.iterator(chunk_size=self.chunk_size):
+                    batch.append(obj)
+                    if len(batch) >= self.chunk_size:
+                        self.index(kind, batch, replace=False)
+                        count += len(batch)
+                        batch = []
+                self.index(kind, batch, replace=False)
+                count += len(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+        return count
+
+    def match_expression(self, kind, query, job_id=None):
+        """Build an FTS5 query from free text: every term must match, the last as a prefix."""
+        terms = query_terms(query)
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        expression = f'kind:{kind} AND {{title body}}: ({" ".join(quoted)})'
+        if job_id is not None:
+            expression += f' AND job:j{int(job_id)}'
+        return expression
+
+    def filter_queryset(self, queryset, kind, query):
+        expression = self.match_expression(kind, query)
+        if expression is None:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid / 2 FROM {self.table} WHERE {self.table} MATCH %s', (expression,)
+        ))
+
+    def search(self, queryset, kind, query, limit, job_id=None):
+        expression = self.match_expression(kind, query, job_id)
+        if expression is None:
+            return []
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # The caller's visibility filters go into the query, so rows the
+        # caller can't see never take up the `limit`.
+        visible_sql, visible_params = queryset.order_by().values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid / 2, bm25({self.table}, {weights}) AS score FROM {self.table} '
+                f'WHERE {self.table} MATCH %s AND rowid / 2 IN ({visible_sql}) ORDER BY score LIMIT %s',
+                (expression, *visible_params, limit),
+            )
+            # bm25() is lower-is-better; flip it so higher scores rank first.
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+
+def get_backend():
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return DatabaseSearchBackend()
+
+
+def index_jobs(jobs):
+    get_backend().index(JOB, jobs)
+
+
+def index_resumes(resumes):
+    get_backend().index(RESUME, resumes)
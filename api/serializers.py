@@ -1,21 +1,70 @@
 # api/serializers.py
 
 from rest_framework import serializers
-from .models import Resume, JobDescription
+from rest_framework.permissions import SAFE_METHODS
+from django.urls import reverse
+from .models import Resume, JobDescription, AnalysisTask
 
-class JobDescriptionSerializer(serializers.ModelSerializer):
+class SparseFieldsetsMixin:
+    """Drops every field not named in the request's `?fields=a,b,c` parameter.
+
+    Only for reads: a write must still validate every field.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None and request.method in SAFE_METHODS else None
+        if requested:
+            wanted = {name.strip() for name in requested.split(',') if name.strip()}
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class JobDescriptionSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = JobDescription
         fields = ['id', 'title', 'description', 'created_at']
 
 
-class ResumeSerializer(serializers.ModelSerializer):
+class ResumeSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     job_title = serializers.CharField(source='job_description.title', read_only=True)
+    scorecard_stale = serializers.SerializerMethodField()
 
     class Meta:
         model = Resume
         # --- MODIFIED: Added 'status' ---
-        fields = ['id', 'name', 'email', 'status', 'scorecard_data', 'original_cv', 'uploaded_on', 'job_description', 'job_title']
+        fields = ['id', 'name', 'email', 'status', 'match_score', 'prescreen_score', 'scorecard_data', 'original_cv', 'uploaded_on', 'job_description', 'job_title', 'scorecard_stale']
         extra_kwargs = {
             'job_description': {'required': False}
         }
+
+    def get_scorecard_stale(self, obj):
+        """True when the job description has been edited since this scorecard was made."""
+        job = obj.job_description
+        return job is not None and obj.scored_against != job.content_hash
+
+
+class ResumeListSerializer(ResumeSerializer):
+    """The dashboard table row: everything except the scorecard JSON."""
+
+    class Meta(ResumeSerializer.Meta):
+        fields = ['id', 'name', 'email', 'status', 'match_score', 'prescreen_score', 'original_cv', 'uploaded_on', 'job_description', 'job_title', 'scorecard_stale']
+
+    # Model fields loaded for list queries; the ordering columns are included.
+    QUERYSET_FIELDS = ['id', 'name', 'email', 'status', 'match_score', 'prescreen_score', 'original_cv', 'uploaded_on', 'scored_against', 'job_description__title', 'job_description__content_hash']
+
+
+class AnalysisTaskSerializer(serializers.ModelSerializer):
+    task_id = serializers.UUIDField(source='id', read_only=True)
+    status_url = serializers.SerializerMethodField()
+    resume = ResumeSerializer(read_only=True)
+
+    class Meta:
+        model = AnalysisTask
+        fields = ['task_id', 'status', 'status_url', 'attempts', 'max_attempts', 'error', 'job_description', 'resume', 'created_at', 'finished_at']
+
+    def get_status_url(self, obj):
+        url = reverse('analysis-task-status', kwargs={'pk': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,65 @@
+# api/signals.py
+#
+# Keeps the full-text search index (api/search.py), the skill index
+# (api/skills.py), the per-job analytics (api/analytics.py), the listing
+# versions (api/listing_cache.py) and the auth token cache
+# (api/authentication.py) in step with model writes.
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import analytics, authentication, listing_cache, search
+from .skills import sync_resume_skills
+from .models import JobDescription, Resume
+
+RESUME_INDEXED_FIELDS = {'name', 'scorecard_data', 'job_description'}
+
+
+@receiver(post_save, sender=JobDescription)
+def index_job(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        search.index_jobs([instance])
+    listing_cache.bump(listing_cache.JOBS)
+
+
+@receiver(post_delete, sender=JobDescription)
+def unindex_job(sender, instance, **kwargs):
+    search.get_backend().remove(search.JOB, [instance.pk])
+    listing_cache.bump(listing_cache.JOBS)
+
+
+@receiver(post_save, sender=Resume)
+def index_resume(sender, instance, update_fields=None, **kwargs):
+    # Status changes are the common update and don't touch indexed text.
+    if update_fields is None or RESUME_INDEXED_FIELDS & set(update_fields):
+        search.index_resumes([instance])
+    if update_fields is None or 'scorecard_data' in update_fields:
+        sync_resume_skills([instance])
+    if instance.job_description_id is not None:
+        analytics.invalidate([instance.job_description_id])
+    listing_cache.bump(listing_cache.RESUMES)
+
+
+@receiver(post_delete, sender=Resume)
+def unindex_resume(sender, instance, **kwargs):
+    search.get_backend().remove(search.RESUME, [instance.pk])
+    if instance.job_description_id is not None:
+        analytics.invalidate([instance.job_description_id])
+    listing_cache.bump(listing_cache.RESUMES)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def uncache_token(sender, instance, **kwargs):
+    authentication.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def uncache_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # Logging in through the admin only touches last_login.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    authentication.invalidate_user(instance.pk)
@@ -0,0 +1,160 @@
+# api/skills.py
+#
+# The normalized skill index: every hard skill, soft skill and certification in
+# a scorecard becomes a ResumeSkill row pointing at a shared Skill, so "which
+# candidates know X and Y" is an index lookup instead of a JSON scan.
+
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Resume, ResumeSkill, Skill
+
+# scorecard_data['skillset_evaluation'] key for each category.
+CATEGORY_KEYS = {
+    ResumeSkill.CATEGORY_HARD: 'hard_skills',
+    ResumeSkill.CATEGORY_SOFT: 'soft_skills',
+    ResumeSkill.CATEGORY_CERTIFICATION: 'certifications',
+}
+
+# Common spellings folded into one canonical name.
+SKILL_ALIASES = {
+    'js': 'javascript',
+    'ts': 'typescript',
+    'golang': 'go',
+    'k8s': 'kubernetes',
+    'postgres': 'postgresql',
+    'node': 'node.js',
+    'nodejs': 'node.js',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vuejs': 'vue.js',
+    'vue': 'vue.js',
+    'amazon web services': 'aws',
+    'google cloud platform': 'gcp',
+    'google cloud': 'gcp',
+    'ms excel': 'excel',
+    'microsoft excel': 'excel',
+    'ml': 'machine learning',
+    'cicd': 'ci/cd',
+}
+
+MAX_NAME_LENGTH = Skill._meta.get_field('name').max_length
+
+
+def clean_skill_label(name):
+    """Tidy a skill as written: NFKC, single spaces, no trailing "(advanced)"-style qualifier."""
+    if not isinstance(name, str):
+        return ''
+    name = unicodedata.normalize('NFKC', name)
+    name = re.sub(r'\s*\([^)]*\)\s*$', '', name)
+    return re.sub(r'\s+', ' ', name).strip(' .,;:-')
+
+
+def canonical_skill(name):
+    """Return the canonical form of a skill name, or '' if nothing usable is left."""
+    name = clean_skill_label(name).lower()
+    return SKILL_ALIASES.get(name, name)[:MAX_NAME_LENGTH]
+
+
+def scorecard_skills(scorecard):
+    """Yield `(canonical_name, label, category)` for each skill listed in a scorecard.
+
+    A skill listed under several categories is yielded once, for the first.
+    """
+    evaluation = scorecard.get('skillset_evaluation') if isinstance(scorecard, dict) else None
+    if not isinstance(evaluation, dict):
+        return
+    seen = set()
+    for category, key in CATEGORY_KEYS.items():
+        values = evaluation.get(key)
+        if not isinstance(values, list):
+            continue
+        for value in values:
+            name = canonical_skill(value)
+            if not name or name in seen:
+                continue
+            seen.add(name)
+            label = clean_skill_label(value)
+            # Aliases ("JS") are labelled with the name they resolve to.
+            yield name, label if label.lower() == name else name, category
+
+
+def sync_resume_skills(resumes):
+    """Replace the ResumeSkill rows of saved `resumes` with those in their scorecards."""
+    resumes = [resume for resume in resumes if resume.pk is not None]
+    if not resumes:
+        return
+    labels = {}
+    wanted = []
+    for resume in resumes:
+        for name, label, category in scorecard_skills(resume.scorecard_data):
+            labels.setdefault(name, label[:MAX_NAME_LENGTH])
+            wanted.append((resume, name, category))
+
+    with transaction.atomic():
+        if labels:
+            Skill.objects.bulk_create([Skill(name=name, label=label) for name, label in labels.items()], ignore_conflicts=True)
+        skill_ids = dict(Skill.objects.filter(name__in=labels).values_list('name', 'id'))
+        ResumeSkill.objects.filter(resume__in=[resume.pk for resume in resumes]).delete()
+        # ignore_conflicts also skips fetching the new ids back, which we don't need.
+        ResumeSkill.objects.bulk_create(
+            [
+                ResumeSkill(resume_id=resume.pk, skill_id=skill_ids[name], job_description_id=resume.job_description_id, category=category)
+                for resume, name, category in wanted
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+def parse_skill_names(value):
+    """Split a comma-separated query parameter into canonical skill names."""
+    names = []
+    for part in (value or '').split(','):
+        name = canonical_skill(part)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def filter_by_skills(queryset, names, match_all=True):
+    """Narrow a Resume queryset to candidates with all (or any) of the canonical skill `names`."""
+    skill_ids = list(Skill.objects.filter(name__in=names).values_list('id', flat=True))
+    if match_all:
+        if len(skill_ids) < len(names):
+            return queryset.none()
+        for skill_id in skill_ids:
+            queryset = queryset.filter(pk__in=ResumeSkill.objects.filter(skill_id=skill_id).values('resume_id'))
+        return queryset
+    return queryset.filter(pk__in=ResumeSkill.objects.filter(skill_id__in=skill_ids).values('resume_id'))
+
+
+def skill_facets(job, category=None, limit=50):
+    """Return the most common skills among a job's candidates as `{"skill", "label", "count"}` dicts."""
+    links = ResumeSkill.objects.filter(job_description=job)
+    if category:
+        links = links.filter(category=category)
+    # Count per skill id on the covering index, then look up the few names needed.
+    rows = list(links.values('skill_id').annotate(count=Count('id')).order_by('-count', 'skill_id')[:limit])
+    skills = Skill.objects.in_bulk([row['skill_id'] for row in rows])
+    return [
+        {"skill": skills[row['skill_id']].name, "label": skills[row['skill_id']].label, "count": row['count']}
+        for row in rows
+    ]
+
+
+def backfill(chunk_size=500):
+    """Rebuild the skill rows of every resume; returns how many were processed."""
+    count = 0
+    batch = []
+    for resume in Resume.objects.only('id', 'scorecard_data', 'job_description_id').iterator(chunk_size=chunk_size):
+        batch.append(resume)
+        if len(batch) >= chunk_size:
+            sync_resume_skills(batch)
+            count += len(batch)
+            batch = []
+    sync_resume_skills(batch)
+    return count + len(batch)
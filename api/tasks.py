@@ -0,0 +1,215 @@
+# api/tasks.py
+#
+# A small database-backed job queue for resume analysis. The web process only
+# stores the upload and an `AnalysisTask` row; the `run_analysis_workers`
+# management command claims pending rows and runs the scorecard pipeline.
+# No broker is involved: claiming is a conditional UPDATE, so any number of
+# worker processes can share the table safely.
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AnalysisTask, Resume
+from .scorecard import create_resume_from_scorecard, update_resume_from_scorecard
+from .scorecard_cache import get_or_generate_scorecard
+from .uploads import stored_pdf
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_analysis(upload, job_description, batch_id=None, resume=None):
+    """Queue an analysis of `upload`; with `resume`, re-score that resume from its stored CV instead."""
+    return AnalysisTask.objects.create(
+        kind=AnalysisTask.KIND_RESCORE if resume is not None else AnalysisTask.KIND_ANALYZE,
+        job_description=job_description,
+        upload=upload,
+        resume=resume,
+        batch_id=batch_id,
+        max_attempts=settings.ANALYSIS_TASK_MAX_ATTEMPTS,
+    )
+
+
+def claim_next_task(worker_id):
+    """Atomically move the oldest available pending task to running, or return None."""
+    while True:
+        candidate_id = (
+            AnalysisTask.objects
+            .filter(status=AnalysisTask.STATUS_PENDING, available_at__lte=timezone.now())
+            .order_by('available_at', 'created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if candidate_id is None:
+            return None
+
+        now = timezone.now()
+        claimed = AnalysisTask.objects.filter(
+            id=candidate_id, status=AnalysisTask.STATUS_PENDING
+        ).update(status=AnalysisTask.STATUS_RUNNING, worker_id=worker_id, heartbeat_at=now)
+        if claimed:
+            return AnalysisTask.objects.select_related('job_description').get(id=candidate_id)
+        # Another worker won the race for this row; try the next one.
+
+
+def heartbeat(task_ids):
+    if task_ids:
+        AnalysisTask.objects.filter(id__in=task_ids, status=AnalysisTask.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale_tasks():
+    """Recover tasks whose worker stopped heartbeating (crash, kill -9, lost node)."""
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYSIS_TASK_LEASE_SECONDS)
+    stale = AnalysisTask.objects.filter(status=AnalysisTask.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+    recovered = 0
+    for task in stale:
+        recovered += _record_failure(task, "Worker stopped responding while processing this task.", expected_status=AnalysisTask.STATUS_RUNNING)
+    return recovered
+
+
+def _record_failure(task, error, retryable=True, expected_status=AnalysisTask.STATUS_RUNNING):
+    """Put the task back with exponential backoff, or fail it if out of attempts or not `retryable`."""
+    attempts = task.attempts + 1
+    if retryable and attempts < task.max_attempts:
+        backoff = settings.ANALYSIS_TASK_RETRY_BACKOFF_SECONDS * (2 ** (attempts - 1))
+        fields = {
+            'status': AnalysisTask.STATUS_PENDING,
+            'available_at': timezone.now() + timedelta(seconds=backoff),
+        }
+    else:
+        fields = {'status': AnalysisTask.STATUS_FAILED, 'finished_at': timezone.now()}
+    # Only touch the row if it is still in the state we observed, so a late
+    # worker and the stale-task sweeper never both count the same attempt.
+    updated = AnalysisTask.objects.filter(id=task.id, status=expected_status, worker_id=task.worker_id).update(
+        attempts=attempts, error=error, worker_id='', **fields
+    )
+    if updated and fields['status'] == AnalysisTask.STATUS_FAILED:
+        _discard_upload(task)
+    return updated
+
+
+def _discard_upload(task):
+    """Delete a finished analysis's stored upload once the transaction commits."""
+    # A rescore's upload is the resume's own CV, which must stay.
+    if task.kind == AnalysisTask.KIND_ANALYZE:
+        upload_name = task.upload.name
+        transaction.on_commit(lambda: task.upload.storage.delete(upload_name))
+
+
+def run_task(task):
+    job_description = task.job_description
+    try:
+        scorecard = get_or_generate_scorecard(stored_pdf(task.upload), job_description.description)
+    except Exception as e:
+        scorecard = {"error": f"An unexpected error occurred: {str(e)}"}
+
+    if "error" in scorecard:
+        logger.warning("Analysis task %s failed: %s", task.id, scorecard["error"])
+        # Unreadable PDFs and requests Gemini rejects would only fail again.
+        _record_failure(task, scorecard["error"], retryable=scorecard.get("retryable", True))
+        return
+
+    with transaction.atomic():
+        # Re-check ownership inside the transaction; if the lease expired and
+        # the task was handed to someone else, drop this result.
+        owned = AnalysisTask.objects.select_for_update().filter(
+            id=task.id, status=AnalysisTask.STATUS_RUNNING, worker_id=task.worker_id
+        ).exists()
+        if not owned:
+            return
+        if task.kind == AnalysisTask.KIND_RESCORE:
+            resume = Resume.objects.filter(pk=task.resume_id).first()
+            if resume is None:
+                AnalysisTask.objects.filter(id=task.id).update(
+                    status=AnalysisTask.STATUS_FAILED, attempts=task.attempts + 1,
+                    error="The resume was deleted before it could be re-scored.", finished_at=timezone.now(),
+                )
+                return
+            update_resume_from_scorecard(resume, scorecard, job_description)
+        else:
+            original_cv = File(task.upload.open('rb'), name=os.path.basename(task.upload.name))
+            try:
+                resume = create_resume_from_scorecard(scorecard, job_description, original_cv)
+            finally:
+                original_cv.close()
+        AnalysisTask.objects.filter(id=task.id).update(
+            status=AnalysisTask.STATUS_SUCCEEDED,
+            resume=resume,
+            attempts=task.attempts + 1,
+            error='',
+            finished_at=timezone.now(),
+        )
+
+    _discard_upload(task)
+
+
+class AnalysisWorkerPool:
+    """Claims tasks from the queue and runs up to `concurrency` of them at a time."""
+
+    def __init__(self, concurrency=None, poll_interval=None, stdout=None):
+        self.concurrency = concurrency or settings.ANALYSIS_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or settings.ANALYSIS_WORKER_POLL_INTERVAL
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stdout = stdout
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+        logger.info(message)
+
+    def _run_and_release(self, task):
+        try:
+            run_task(task)
+        except Exception:
+            logger.exception("Unhandled error while running analysis task %s", task.id)
+        finally:
+            with self._lock:
+                self._in_flight.pop(task.id, None)
+            close_old_connections()
+
+    def run(self, drain=False):
+        """Poll the queue until stopped. With `drain=True`, exit once the queue is empty."""
+        self._log(f"Analysis worker {self.worker_id} started with concurrency {self.concurrency}.")
+        last_sweep = 0.0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='analysis') as executor:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now - last_sweep >= self.poll_interval:
+                    recovered = requeue_stale_tasks()
+                    if recovered:
+                        self._log(f"Re-queued {recovered} stale task(s).")
+                    with self._lock:
+                        heartbeat(list(self._in_flight))
+                    last_sweep = now
+
+                claimed_any = False
+                while len(self._in_flight) < self.concurrency:
+                    task = claim_next_task(self.worker_id)
+                    if task is None:
+                        break
+                    claimed_any = True
+                    with self._lock:
+                        self._in_flight[task.id] = task
+                    executor.submit(self._run_and_release, task)
+
+                if drain and not claimed_any and not self._in_flight:
+                    break
+                if not claimed_any:
+                    self._stop.wait(self.poll_interval)
+        self._log(f"Analysis worker {self.worker_id} stopped.")
@@ -1,3 +1,1091 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import os
+import random
+import socket
+import tempfile
+import tracemalloc
+import urllib.error
+import urllib.request
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import fitz
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.models.query import QuerySet
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .gemini import AsyncGeminiClient, CircuitBreaker, CircuitOpenError, GeminiClient, GeminiHTTPError, GeminiTimeoutError, InlineBlob, JSONBody, parse_retry_after
+from .gemini_stub import DEFAULT_SCORECARD, StubGeminiServer
+from .models import AnalysisTask, JobAnalytics, JobDescription, Resume, ScorecardCacheEntry
+from . import analytics, artifact_cache, authentication, benchmarks, bulk, gemini, metrics, prescreen, rendering, rescore, scorecard_cache, search, skills
+from .extraction import extract_document_parts
+from .management.commands import ingest_resumes, run_benchmarks
+from .prescreen import PrescreenModel
+from .scorecard import build_scorecard_payload, create_resume_from_scorecard, score_document_parts
+from .tasks import claim_next_task, enqueue_analysis, heartbeat, requeue_stale_tasks, run_task
+from .scorecard import parse_scorecard_response
+from .serializers import ResumeListSerializer
+
+
+class GeminiClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = StubGeminiServer().start()
+        self.addCleanup(self.server.stop)
+        self.sleeps = []
+
+    def make_client(self, **kwargs):
+        options = {'max_retries': 3, 'circuit_breaker': CircuitBreaker(failure_threshold=2, reset_timeout=60)}
+        options.update(kwargs)
+        return GeminiClient('test-key', self.server.base_url, 'stub-model', sleep=self.sleeps.append, **options)
+
+    def test_reuses_keep_alive_connection(self):
+        client = self.make_client()
+        for _ in range(3):
+            result = client.generate_content({"contents": []})
+        self.assertEqual(parse_scorecard_response(result), DEFAULT_SCORECARD)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self.server.requests[0]['path'], '/v1beta/models/stub-model:generateContent')
+        self.assertEqual(self.server.requests[0]['headers']['x-goog-api-key'], 'test-key')
+
+    def test_retries_429_honouring_retry_after(self):
+        self.server.responses = [(429, {'Retry-After': '7'}, {"error": "quota"}), (503, {}, {"error": "busy"})]
+        result = self.make_client().generate_content({"contents": []})
+        self.assertIn('candidates', result)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.sleeps[0], 7)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.responses = [(400, {}, {"error": "bad request"})]
+        with self.assertRaises(GeminiHTTPError) as ctx:
+            self.make_client().generate_content({"contents": []})
+        self.assertEqual(ctx.exception.status, 400)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        self.server.responses = [(500, {}, {"error": "down"})] * 2
+        client = self.make_client(max_retries=0)
+        for _ in range(2):
+            with self.assertRaises(GeminiHTTPError):
+                client.generate_content({"contents": []})
+        with self.assertRaises(CircuitOpenError):
+            client.generate_content({"contents": []})
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_cancelled_half_open_trial_releases_the_circuit(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 61
+        client = AsyncGeminiClient('test-key', self.server.base_url, 'stub-model', max_retries=0, circuit_breaker=breaker)
+        self.server.latency = 1
+
+        async def scenario():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.generate_content({"contents": []}), 0.1)
+            self.server.latency = 0
+            return await client.generate_content({"contents": []})
+
+        self.assertIn('candidates', asyncio.run(scenario()))
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_async_timeout_covers_a_stalled_upload(self):
+        # A peer that accepts the connection but never reads the body.
+        listener = socket.create_server(('127.0.0.1', 0))
+        self.addCleanup(listener.close)
+        client = AsyncGeminiClient(
+            'test-key', f'http://127.0.0.1:{listener.getsockname()[1]}/v1beta', 'stub-model', read_timeout=0.5,
+            max_retries=0, circuit_breaker=CircuitBreaker(),
+        )
+        payload = {"contents": [{"parts": [{"text": "x" * (32 * 1024 * 1024)}]}]}
+
+        async def scenario():
+            with self.assertRaises(GeminiTimeoutError):
+                await asyncio.wait_for(client.generate_content(payload), 10)
+
+        asyncio.run(scenario())
+
+    def test_request_body_is_streamed_in_bounded_memory(self):
+        with tempfile.NamedTemporaryFile(suffix='.png') as image:
+            image.write(os.urandom(8 * 1024 * 1024))
+            image.flush()
+            payload = build_scorecard_payload([{"inline_data": {"mime_type": "image/png", "data": InlineBlob(path=image.name)}}], 'Python')
+
+            tracemalloc.start()
+            try:
+                sent = sum(len(chunk) for chunk in JSONBody(payload, chunk_size=64 * 1024))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertGreater(sent, 10 * 1024 * 1024)
+            self.assertLess(peak, 1024 * 1024)
+
+            self.make_client().generate_content(payload)
+            request = self.server.requests[0]
+            self.assertEqual(request['headers']['Transfer-Encoding'], 'chunked')
+            part = json.loads(request['body'])['contents'][0]['parts'][1]
+            with open(image.name, 'rb') as f:
+                self.assertEqual(base64.b64decode(part['inline_data']['data']), f.read())
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('12'), 12.0)
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:10 GMT', now=1445412480), 10.0)
+        self.assertIsNone(parse_retry_after('soon'))
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('recruiter')
+        self.job = JobDescription.objects.create(title='Backend Engineer', description='Python and Django', created_by=user)
+        self.backend = search.get_backend()
+
+    def resume_ids(self, query, **kwargs):
+        return [pk for pk, _ in self.backend.search(Resume.objects.all(), search.RESUME, query, 10, **kwargs)]
+
+    def test_index_follows_saves_and_deletes(self):
+        resume = Resume.objects.create(name='Ana', job_description=self.job, scorecard_data={
+            'summary': 'Backend developer', 'skillset_evaluation': {'hard_skills': ['Kubernetes']},
+        })
+        self.assertEqual(self.resume_ids('kube'), [resume.pk])
+        self.assertEqual(self.resume_ids('kubernetes', job_id=self.job.pk + 1), [])
+
+        resume.scorecard_data = {'summary': 'Data analyst', 'skillset_evaluation': {'hard_skills': ['Tableau']}}
+        resume.save()
+        self.assertEqual(self.resume_ids('kubernetes'), [])
+        self.assertEqual(self.resume_ids('tableau'), [resume.pk])
+
+        resume.delete()
+        self.assertEqual(self.resume_ids('tableau'), [])
+
+    def test_hidden_matches_do_not_crowd_out_visible_ones(self):
+        stranger = User.objects.create_user('stranger')
+        for index in range(3):
+            JobDescription.objects.create(title=f'Python lead {index}', description='Python', created_by=stranger)
+        own_jobs = JobDescription.objects.filter(created_by=self.job.created_by)
+        self.assertEqual([pk for pk, _ in self.backend.search(own_jobs, search.JOB, 'python', 2)], [self.job.pk])
+
+    def test_job_filter_and_ranking(self):
+        other = JobDescription.objects.create(title='Data Analyst', description='Backend reporting in Python', created_by=self.job.created_by)
+        jobs = JobDescription.objects.all()
+        self.assertEqual(list(self.backend.filter_queryset(jobs, search.JOB, 'engineer').values_list('pk', flat=True)), [self.job.pk])
+        # A title match outranks a description match.
+        self.assertEqual([pk for pk, _ in self.backend.search(jobs, search.JOB, 'backend', 10)], [self.job.pk, other.pk])
+        self.assertEqual([pk for pk, _ in self.backend.search(jobs, search.JOB, 'analyst pyth', 10)], [other.pk])
+
+
+class SkillIndexTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('recruiter')
+        self.job = JobDescription.objects.create(title='Backend Engineer', description='Python', created_by=user)
+
+    def add_resume(self, name, hard_skills, soft_skills=()):
+        return Resume.objects.create(name=name, job_description=self.job, scorecard_data={
+            'skillset_evaluation': {'hard_skills': list(hard_skills), 'soft_skills': list(soft_skills)},
+        })
+
+    def names(self, skill_names, match_all=True):
+        queryset = skills.filter_by_skills(Resume.objects.order_by('name'), skill_names, match_all=match_all)
+        return list(queryset.values_list('name', flat=True))
+
+    def test_canonical_skill(self):
+        self.assertEqual(skills.canonical_skill('  Python (Advanced) '), 'python')
+        self.assertEqual(skills.canonical_skill('K8s'), 'kubernetes')
+        self.assertEqual(skills.parse_skill_names('JS, javascript,,Go'), ['javascript', 'go'])
+
+    def test_filters_and_facets(self):
+        self.add_resume('Ana', ['Python', 'K8s'], ['Mentoring'])
+        self.add_resume('Ben', ['python', 'Go'])
+        self.add_resume('Cy', ['Golang'])
+
+        self.assertEqual(self.names(['python', 'go']), ['Ben'])
+        self.assertEqual(self.names(['kubernetes', 'go'], match_all=False), ['Ana', 'Ben', 'Cy'])
+        self.assertEqual(self.names(['python', 'cobol']), [])
+
+        facets = skills.skill_facets(self.job)
+        self.assertEqual({f['skill']: f['count'] for f in facets}, {'python': 2, 'go': 2, 'kubernetes': 1, 'mentoring': 1})
+        self.assertEqual([f['skill'] for f in skills.skill_facets(self.job, category='soft')], ['mentoring'])
+
+
+class PrescreenTests(TestCase):
+    jobs = [
+        '<p>Senior <strong>Python</strong> engineer: Django, PostgreSQL, AWS</p>',
+        '<p>ICU nurse for patient care</p>',
+    ]
+    resumes = [
+        'Python developer building Django APIs on AWS',
+        'Registered nurse, five years of ICU patient care',
+        'Head chef in an Italian kitchen',
+    ]
+
+    def test_similarity_matrix_matches_pairwise_scores(self):
+        model = PrescreenModel([1, 2], self.jobs)
+        matrix = model.similarity(self.resumes, batch_size=2)
+        self.assertEqual(matrix.shape, (3, 2))
+        for row, resume in enumerate(self.resumes):
+            for column, job in enumerate(self.jobs):
+                self.assertAlmostEqual(float(matrix[row, column]), model.score(resume, job), places=5)
+        self.assertEqual(list(matrix.argmax(axis=1)[:2]), [0, 1])
+        self.assertEqual(float(matrix[2].max()), 0.0)
+
+    def setUp(self):
+        prescreen.invalidate_model()
+        self.addCleanup(prescreen.invalidate_model)
+        user = User.objects.create_user('recruiter')
+        self.job_rows = [JobDescription.objects.create(title='Job', description=text, created_by=user) for text in self.jobs]
+
+    def test_online_scores_use_the_vectorized_path(self):
+        model = prescreen.get_model()
+        parts = [{"text": self.resumes[0]}]
+        with mock.patch.object(PrescreenModel, 'similarity', autospec=True, side_effect=PrescreenModel.similarity) as similarity:
+            score, _ = prescreen.prescreen(parts, self.jobs[0])
+        self.assertEqual(similarity.call_args.kwargs['job_ids'], [self.job_rows[0].pk])
+        self.assertAlmostEqual(score, model.score(self.resumes[0], self.jobs[0]), places=5)
+
+    def test_job_edits_do_not_rebuild_the_model(self):
+        model = prescreen.get_model()
+        self.job_rows[0].description = '<p>Go engineer: Kubernetes</p>'
+        self.job_rows[0].save()
+        with self.assertNumQueries(0):
+            self.assertIs(prescreen.get_model(), model)
+            # The edited text is not in the model, so it is scored directly.
+            score, _ = prescreen.prescreen([{"text": 'Go developer running Kubernetes'}], self.job_rows[0].description)
+        self.assertGreater(score, 0)
+
+    def test_expired_model_is_rebuilt_in_the_background(self):
+        model = prescreen.get_model()
+        JobDescription.objects.create(title='Chef', description='<p>Head chef</p>', created_by=self.job_rows[0].created_by)
+        with override_settings(PRESCREEN_MODEL_TTL=0), mock.patch('api.prescreen.threading.Thread') as thread:
+            self.assertIs(prescreen.get_model(), model)
+            self.assertIs(prescreen.get_model(), model)
+        # One rebuild in flight at a time; run it here rather than on a thread.
+        thread.assert_called_once()
+        with mock.patch('api.prescreen.connection'):
+            thread.call_args.kwargs['target']()
+        self.assertEqual(len(prescreen.get_model().job_ids), 3)
+
+    @override_settings(PRESCREEN_MIN_SCORE=0.2)
+    def test_low_scores_skip_the_llm(self):
+        # No Gemini server is configured, so reaching the client would return an error.
+        scorecard = score_document_parts([{"text": self.resumes[2]}], self.jobs[1])
+        self.assertEqual(scorecard["prescreen"], {"score": 0.0, "threshold": 0.2, "passed": False})
+        resume = Resume.objects.create(scorecard_data=scorecard)
+        self.assertEqual(resume.prescreen_score, 0.0)
+        self.assertIsNone(resume.match_score)
+
+
+class ScorecardColumnBackfillTests(TestCase):
+    def test_backfill_migration_fills_columns_from_scorecard_data(self):
+        loader = MigrationLoader(connection)
+        name = ('api', '0007_backfill_resume_scorecard_columns')
+        backfill = loader.get_migration(*name).operations[0]
+        scored = Resume.objects.create(scorecard_data={
+            'match_score': '82.5', 'red_flags': ['gap', 'short tenures'], 'experience_analysis': {'job_hopping_flag': True},
+        })
+        malformed = Resume.objects.create(scorecard_data={
+            'match_score': 'n/a', 'red_flags': 'none', 'experience_analysis': {'job_hopping_flag': 'yes'},
+        })
+        empty = Resume.objects.create(scorecard_data=None)
+        # Rows written before the columns existed.
+        Resume.objects.update(match_score=None, red_flag_count=None, job_hopping_flag=None)
+
+        # A batch size below the row count exercises the mid-loop flush too.
+        with mock.patch.dict(backfill.code.__globals__, {'BATCH_SIZE': 2}):
+            backfill.code(loader.project_state(name).apps, None)
+
+        rows = Resume.objects.values_list('match_score', 'red_flag_count', 'job_hopping_flag')
+        self.assertEqual(rows.get(pk=scored.pk), (82.5, 2, True))
+        self.assertEqual(rows.get(pk=malformed.pk), (None, None, None))
+        self.assertEqual(rows.get(pk=empty.pk), (None, None, None))
+
+
+@override_settings(SCORECARD_CACHE_ENABLED=True, SCORECARD_CACHE_MAX_ENTRIES=2, SCORECARD_CACHE_MAX_AGE_DAYS=90)
+class ScorecardCacheTests(TestCase):
+    def lookup(self, pdf_hash, job_text):
+        report = {}
+        scorecard = scorecard_cache.cached_scorecard(pdf_hash, job_text, lambda: dict(DEFAULT_SCORECARD), report=report)
+        return scorecard, report['cache']
+
+    def test_hits_misses_and_what_counts_as_the_same_input(self):
+        self.assertEqual(self.lookup('a' * 64, 'Python engineer'), (DEFAULT_SCORECARD, 'miss'))
+        self.assertEqual(self.lookup('a' * 64, 'Python engineer'), (DEFAULT_SCORECARD, 'hit'))
+        self.assertEqual(self.lookup('a' * 64, 'Go engineer')[1], 'miss')
+        # An entry written by an earlier version of the pipeline is not reused.
+        scorecard_cache.store('b' * 64, scorecard_cache.sha256_hex('Python engineer'), DEFAULT_SCORECARD, 1.0, pipeline_version='old')
+        self.assertEqual(self.lookup('b' * 64, 'Python engineer')[1], 'miss')
+        stats = scorecard_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 3, 0.25))
+
+    def test_errors_are_not_cached(self):
+        for _ in range(2):
+            report = {}
+            scorecard_cache.cached_scorecard('a' * 64, 'Python', lambda: {"error": "busy"}, report=report)
+            self.assertEqual(report['cache'], 'miss')
+        self.assertEqual(scorecard_cache.stats()['entries'], 0)
+
+    def test_least_recently_used_and_expired_entries_are_evicted(self):
+        for pdf_hash in ('a' * 64, 'b' * 64):
+            self.lookup(pdf_hash, 'Python')
+        ScorecardCacheEntry.objects.filter(pdf_sha256='a' * 64).update(last_used_at=timezone.now() - timedelta(hours=1))
+        self.lookup('c' * 64, 'Python')
+        self.assertEqual(sorted(ScorecardCacheEntry.objects.values_list('pdf_sha256', flat=True)), ['b' * 64, 'c' * 64])
+
+        ScorecardCacheEntry.objects.filter(pdf_sha256='b' * 64).update(created_at=timezone.now() - timedelta(days=91))
+        self.assertEqual(self.lookup('b' * 64, 'Python')[1], 'miss')
+        self.assertEqual(scorecard_cache.stats()['evictions'], 2)
+
+
+class StubGeminiTestCase(TestCase):
+    """Runs the real pipeline against a local StubGeminiServer, with files in temporary directories."""
+
+    def setUp(self):
+        self.server = StubGeminiServer().start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(gemini._clients.clear)
+        settings_override = override_settings(
+            GEMINI_API_BASE_URL=self.server.base_url, MEDIA_ROOT=tempfile.mkdtemp(), ARTIFACT_CACHE_DIR=tempfile.mkdtemp(),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        env = mock.patch.dict(os.environ, {'GEMINI_API_KEY': 'stub-test-key'})
+        env.start()
+        self.addCleanup(env.stop)
+        self.user = User.objects.create_user('recruiter')
+        self.job = JobDescription.objects.create(title='Dev', description='<p>Python engineer</p>', created_by=self.user)
+
+
+@override_settings(GEMINI_MAX_RETRIES=0, ANALYSIS_TASK_RETRY_BACKOFF_SECONDS=10, SCORECARD_CACHE_ENABLED=False)
+class AnalysisQueueTests(StubGeminiTestCase):
+    def pdf(self):
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), 'Jane Doe, Python developer')
+        return document.tobytes()
+
+    def enqueue(self, content=None):
+        return enqueue_analysis(ContentFile(content or self.pdf(), name='jane.pdf'), self.job)
+
+    def test_each_task_is_claimed_once(self):
+        first, second = self.enqueue(), self.enqueue()
+        claimed = [claim_next_task('worker-a'), claim_next_task('worker-b')]
+        self.assertEqual([task.pk for task in claimed], [first.pk, second.pk])
+        self.assertEqual([task.worker_id for task in claimed], ['worker-a', 'worker-b'])
+        self.assertEqual({task.status for task in AnalysisTask.objects.all()}, {AnalysisTask.STATUS_RUNNING})
+        self.assertIsNone(claim_next_task('worker-c'))
+
+    def test_stale_tasks_are_requeued(self):
+        self.enqueue()
+        live, stale = self.enqueue(), self.enqueue()
+        for worker in ('worker-a', 'worker-a', 'worker-b'):
+            claim_next_task(worker)
+        AnalysisTask.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        heartbeat([live.pk])
+        with override_settings(ANALYSIS_TASK_LEASE_SECONDS=60):
+            self.assertEqual(requeue_stale_tasks(), 2)
+        live.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertEqual(live.status, AnalysisTask.STATUS_RUNNING)
+        self.assertEqual((stale.status, stale.attempts, stale.worker_id), (AnalysisTask.STATUS_PENDING, 1, ''))
+        self.assertIn('stopped responding', stale.error)
+
+    def test_retryable_failures_back_off_until_attempts_run_out(self):
+        task = self.enqueue()
+        task.max_attempts = 2
+        task.save()
+        self.server.error_rate = 1.0
+
+        run_task(claim_next_task('worker-a'))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (AnalysisTask.STATUS_PENDING, 1))
+        self.assertAlmostEqual((task.available_at - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertIsNone(claim_next_task('worker-a'))
+
+        self.assertTrue(task.upload.storage.exists(task.upload.name))
+
+        AnalysisTask.objects.update(available_at=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            run_task(claim_next_task('worker-a'))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (AnalysisTask.STATUS_FAILED, 2))
+        self.assertIsNotNone(task.finished_at)
+        self.assertFalse(task.upload.storage.exists(task.upload.name))
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_non_retryable_failures_fail_at_once(self):
+        self.server.responses = [(400, {}, {"error": "bad request"})]
+        rejected = self.enqueue()
+        corrupt = self.enqueue(b'not a pdf')
+        with self.captureOnCommitCallbacks(execute=True):
+            run_task(claim_next_task('worker-a'))
+            run_task(claim_next_task('worker-a'))
+        for task in (rejected, corrupt):
+            task.refresh_from_db()
+            self.assertEqual((task.status, task.attempts), (AnalysisTask.STATUS_FAILED, 1))
+            self.assertFalse(task.upload.storage.exists(task.upload.name))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_async_upload_returns_a_task_to_poll(self):
+        upload = SimpleUploadedFile('jane.pdf', self.pdf(), content_type='application/pdf')
+        response = self.client.post('/api/analyze-resume/?async=1', {'file': upload, 'job_description_id': self.job.pk})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], AnalysisTask.STATUS_PENDING)
+        status_url = response.json()['status_url']
+        self.assertTrue(status_url.endswith(f"/api/analysis-tasks/{response.json()['task_id']}/"))
+        self.assertEqual(self.server.requests, [])
+
+        run_task(claim_next_task('worker-a'))
+        task = self.client.get(status_url).json()
+        self.assertEqual((task['status'], task['attempts'], task['error']), (AnalysisTask.STATUS_SUCCEEDED, 1, ''))
+        self.assertEqual(task['resume']['job_description'], self.job.pk)
+
+
+class RescoreTests(StubGeminiTestCase):
+    def test_only_stale_resumes_are_rescored(self):
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), 'Jane Doe, Python developer')
+        resume = create_resume_from_scorecard(DEFAULT_SCORECARD, self.job, ContentFile(document.tobytes(), name='jane.pdf'))
+        self.assertFalse(rescore.stale_resumes(self.job).exists())
+
+        self.job.description = '<p>Go engineer</p>'
+        self.job.save()
+        self.assertEqual(list(rescore.stale_resumes(self.job)), [resume])
+
+        rescore.enqueue_rescore(self.job, rescore.resumes_to_rescore(self.job), batch_id=None)
+        run_task(claim_next_task('test'))
+        resume.refresh_from_db()
+        self.assertEqual(resume.scored_against, self.job.content_hash)
+        self.assertTrue(resume.original_cv.storage.exists(resume.original_cv.name))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertFalse(rescore.resumes_to_rescore(self.job).exists())
+
+
+class ArtifactCacheTests(SimpleTestCase):
+    def setUp(self):
+        settings_override = override_settings(ARTIFACT_CACHE_DIR=tempfile.mkdtemp(), RENDER_WORKERS=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(artifact_cache.clear)
+
+    def make_pdf(self, label):
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), label)
+        document.new_page().insert_text((72, 72), 'Python Django engineer building REST APIs.\n' * 10)
+        return document.tobytes()
+
+    def test_repeat_extraction_is_served_from_disk(self):
+        pdf = self.make_pdf('scan')
+        parts, report = extract_document_parts(pdf)
+        self.assertEqual((report['artifact_cache'], report['image_pages'], report['text_pages']), ('miss', [1], [2]))
+        with mock.patch('api.rendering.fitz.open') as fitz_open:
+            cached_parts, cached_report = extract_document_parts(pdf)
+        fitz_open.assert_not_called()
+        self.assertEqual(cached_report['artifact_cache'], 'hit')
+        self.assertEqual(cached_parts, parts)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        first, second = self.make_pdf('first'), self.make_pdf('second')
+        extract_document_parts(first)
+        with override_settings(ARTIFACT_CACHE_MAX_BYTES=int(artifact_cache.usage()['bytes'] * 1.5)):
+            extract_document_parts(second)
+        self.assertEqual(artifact_cache.usage()['entries'], 1)
+        self.assertEqual(extract_document_parts(second)[1]['artifact_cache'], 'hit')
+        self.assertEqual(extract_document_parts(first)[1]['artifact_cache'], 'miss')
+
+
+@override_settings(ARTIFACT_CACHE_MAX_BYTES=0)
+class RenderingTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = random.Random(0)
+        document = fitz.open()
+        for _ in range(4):
+            with fitz.open(stream=benchmarks.make_scanned_resume_pdf(rng), filetype='pdf') as page:
+                document.insert_pdf(page)
+        cls.pdf = document.tobytes()
+
+    def render_settings(self, **overrides):
+        options = {'dpi': 150, 'grayscale': True, 'image_format': 'jpeg', 'quality': 80,
+                   'max_payload_bytes': 0, 'min_dpi': 50, 'max_pages': 10, **overrides}
+        return rendering.RenderSettings(**options)
+
+    def test_process_pool_matches_serial_rendering(self):
+        with override_settings(RENDER_WORKERS=1):
+            serial = rendering.render_pages(self.pdf, [1, 2, 3, 4], self.render_settings())
+        with override_settings(RENDER_WORKERS=2):
+            pooled = rendering.render_pages(self.pdf, [1, 2, 3, 4], self.render_settings())
+        self.addCleanup(self.shut_down_pool)
+        self.assertIsNotNone(rendering._executor)
+        self.assertEqual([page.page_number for page in pooled], [1, 2, 3, 4])
+        self.assertEqual([page.data for page in pooled], [page.data for page in serial])
+
+    def shut_down_pool(self):
+        rendering._executor.shutdown()
+        rendering._executor = None
+
+    @override_settings(RENDER_WORKERS=1)
+    def test_oversized_renders_are_downscaled_to_the_budget(self):
+        full = sum(len(page.data) for page in rendering.render_pages(self.pdf, [1, 2], self.render_settings()))
+        pages = rendering.render_pages(self.pdf, [1, 2], self.render_settings(max_payload_bytes=full // 2))
+        self.assertLess(pages[0].dpi, 150)
+        self.assertGreater(pages[0].dpi, 50)
+        self.assertLessEqual(sum(len(page.data) for page in pages), full // 2)
+
+    @override_settings(RENDER_WORKERS=1)
+    def test_downscaling_stops_at_the_minimum_dpi(self):
+        pages = rendering.render_pages(self.pdf, [1, 2], self.render_settings(max_payload_bytes=1000))
+        self.assertEqual({page.dpi for page in pages}, {50})
+        self.assertGreater(sum(len(page.data) for page in pages), 1000)
+
+    @override_settings(RENDER_WORKERS=1, RENDER_MAX_PAGES=2)
+    def test_pages_past_the_limit_are_skipped(self):
+        parts, report = extract_document_parts(self.pdf)
+        self.assertEqual((report['page_count'], report['image_pages'], report['skipped_pages']), (4, [1, 2], [3, 4]))
+        self.assertEqual(len(parts), 2)
+
+    @override_settings(RENDER_WORKERS=1)
+    def test_defaults_send_every_page_as_a_full_resolution_png(self):
+        parts, report = extract_document_parts(self.pdf)
+        self.assertEqual((report['image_pages'], report['skipped_pages']), ([1, 2, 3, 4], []))
+        self.assertEqual({part['inline_data']['mime_type'] for part in parts}, {'image/png'})
+        self.assertEqual({page['dpi'] for page in report['pages']}, {200})
+
+
+class MultiJobAnalysisTests(StubGeminiTestCase):
+    @override_settings(MULTI_JOB_COMBINE_MAX=2)
+    def test_one_upload_scored_against_several_jobs(self):
+        jobs = [self.job] + [
+            JobDescription.objects.create(title=title, description=f'<p>{title}</p>', created_by=self.user)
+            for title in ('Go engineer', 'Data engineer')
+        ]
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), 'Jane Doe, Python developer')
+        upload = SimpleUploadedFile('jane.pdf', document.tobytes(), content_type='application/pdf')
+
+        response = APIClient().post('/api/analyze-resume/', {
+            'file': upload, 'job_description_ids': ','.join(str(job.pk) for job in jobs),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['resume']['job_description'] for result in results], [job.pk for job in jobs])
+        # Two jobs share the first request, the third gets its own.
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(Resume.objects.filter(name='Jane Doe').count(), 3)
+
+
+@override_settings(SCORECARD_CACHE_ENABLED=False)
+class BatchAnalysisTests(StubGeminiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def pdf(self, text):
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), text)
+        return document.tobytes()
+
+    def upload(self, name, content):
+        return SimpleUploadedFile(name, content, content_type='application/pdf')
+
+    def stream(self, data):
+        response = self.api.post('/api/analyze-resumes/batch/', {'job_description_id': self.job.pk, **data})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        return sorted(lines[:-1], key=lambda row: row['file']), lines[-1]
+
+    def test_results_stream_as_ndjson_with_failures_per_file(self):
+        self.server.responses = [(400, {}, {"error": "bad request"})]
+        rows, summary = self.stream({'files': [
+            self.upload('a.pdf', self.pdf('Jane Doe')), self.upload('b.pdf', self.pdf('John Roe')),
+            self.upload('notes.txt', b'not a resume'),
+        ]})
+        self.assertEqual(summary, {"status": "completed", "total": 3, "succeeded": 1, "failed": 2})
+        self.assertEqual(sorted(row['status'] for row in rows), ['failed', 'failed', 'succeeded'])
+        self.assertEqual(rows[2], {'file': 'notes.txt', 'status': 'failed', 'error': 'Only PDF files are supported.'})
+        succeeded = next(row for row in rows if row['status'] == 'succeeded')
+        self.assertTrue(Resume.objects.filter(pk=succeeded['resume_id'], job_description=self.job).exists())
+        self.assertEqual(Resume.objects.count(), 1)
+
+    def test_zip_members_are_unpacked(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as bundle:
+            bundle.writestr('cvs/', '')
+            bundle.writestr('cvs/jane.pdf', self.pdf('Jane Doe'))
+            bundle.writestr('__MACOSX/cvs/._jane.pdf', b'resource fork')
+            bundle.writestr('cvs/readme.md', b'# CVs')
+        rows, summary = self.stream({'archive': SimpleUploadedFile('cvs.zip', archive.getvalue(), content_type='application/zip')})
+        self.assertEqual([(row['file'], row['status']) for row in rows], [('jane.pdf', 'succeeded'), ('readme.md', 'failed')])
+        self.assertEqual(summary['total'], 2)
+
+    @override_settings(BATCH_ANALYSIS_INSERT_BATCH_SIZE=1)
+    def test_caches_are_invalidated_once_per_insert(self):
+        with mock.patch('api.batch.listing_cache.bump') as bump, mock.patch('api.batch.analytics.invalidate') as invalidate:
+            self.stream({'files': [self.upload('a.pdf', self.pdf('Jane Doe'))]})
+        self.assertEqual(bump.call_count, 1)
+        self.assertEqual(invalidate.call_count, 1)
+
+    def test_async_batch_is_queued_for_polling(self):
+        response = self.api.post('/api/analyze-resumes/batch/?async=1', {'job_description_id': self.job.pk, 'files': [
+            self.upload('a.pdf', self.pdf('Jane Doe')), self.upload('notes.txt', b'not a resume'),
+        ]})
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        self.assertEqual(body['skipped'], ['notes.txt'])
+        self.assertEqual((body['total'], body['counts']['pending']), (1, 1))
+        self.assertEqual(self.server.requests, [])
+
+        run_task(claim_next_task('test'))
+        status = self.api.get(body['status_url']).json()
+        self.assertEqual(status['counts']['succeeded'], 1)
+        self.assertIsNotNone(status['tasks'][0]['resume_id'])
+
+
+@override_settings(SCORECARD_CACHE_ENABLED=False)
+class IngestResumesTests(StubGeminiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        for name in ('ada', 'bob', 'cy', 'dee'):
+            document = fitz.open()
+            document.new_page().insert_text((72, 72), f'{name.title()} Doe, Python developer')
+            document.save(os.path.join(self.directory, f'{name}.pdf'))
+        # The extraction workers are spawned processes and read their settings from the environment.
+        env = mock.patch.dict(os.environ, {'ARTIFACT_CACHE_DIR': tempfile.mkdtemp()})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def ingest(self):
+        call_command('ingest_resumes', self.directory, job=self.job.pk, processes=1, concurrency=1, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_rerun_skips_files_in_the_checkpoint(self):
+        record = ingest_resumes.Command.record
+        calls = []
+
+        def interrupt_after_two(command, *args):
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            calls.append(args[2])
+            record(command, *args)
+
+        with mock.patch.object(ingest_resumes.Command, 'record', autospec=True, side_effect=interrupt_after_two):
+            with self.assertRaises(KeyboardInterrupt):
+                self.ingest()
+        checkpoint = os.path.join(self.directory, f'.ingest-job-{self.job.pk}.jsonl')
+        with open(checkpoint, 'a') as f:
+            f.write('{"file": "cy.pdf", "sta')  # torn by the kill
+        self.assertEqual(Resume.objects.count(), 2)
+        # A file scored when the run was killed, but not yet recorded, is scored again.
+        interrupted_requests = len(self.server.requests)
+
+        self.ingest()
+        self.assertEqual(len(self.server.requests), interrupted_requests + 2)
+        with open(checkpoint) as f:
+            lines = f.read().splitlines()
+        entries = [json.loads(line) for line in lines[:2] + lines[3:]]
+        self.assertEqual([entry['file'] for entry in entries[:2]], [os.path.basename(path) for path in calls])
+        self.assertEqual(sorted(entry['file'] for entry in entries), ['ada.pdf', 'bob.pdf', 'cy.pdf', 'dee.pdf'])
+        self.assertEqual(
+            {entry['resume_id'] for entry in entries}, set(Resume.objects.filter(job_description=self.job).values_list('pk', flat=True)),
+        )
+        self.assertEqual(Resume.objects.count(), 4)
+
+        self.ingest()
+        self.assertEqual(len(self.server.requests), interrupted_requests + 2)
+        self.assertEqual(Resume.objects.count(), 4)
+
+
+class AsyncAnalysisTests(StubGeminiTestCase):
+    async def test_async_view_analyzes_and_caches(self):
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), 'Jane Doe, Python developer')
+        pdf = document.tobytes()
+
+        for expected_cache in ('miss', 'hit'):
+            upload = SimpleUploadedFile('jane.pdf', pdf, content_type='application/pdf')
+            response = await self.async_client.post('/api/analyze-resume/async/', {'file': upload, 'job_description_id': self.job.pk})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['extraction_report']['cache'], expected_cache)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(await Resume.objects.filter(job_description=self.job, name='Jane Doe').acount(), 2)
+
+
+class CandidateExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('recruiter')
+        self.job = JobDescription.objects.create(title='Dev', description='<p>Python engineer</p>', created_by=self.user)
+        for score, name in ((9, 'Jane Doe'), (4, '=HYPERLINK("x")')):
+            create_resume_from_scorecard({**DEFAULT_SCORECARD, 'match_score': score, 'basic_information': {'name': name}}, self.job, '')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_csv_and_ndjson_exports(self):
+        response = self.client.get(f'/api/jobs/{self.job.pk}/export/', {'columns': 'name,match_score,hard_skills'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows, [
+            ['name', 'match_score', 'hard_skills'],
+            ['Jane Doe', '9.0', 'Python; Django; PostgreSQL'],
+            ['\'=HYPERLINK("x")', '4.0', 'Python; Django; PostgreSQL'],
+        ])
+
+        response = self.client.get(f'/api/jobs/{self.job.pk}/export/', {'output': 'ndjson', 'columns': 'id,scorecard.experience_analysis.job_hopping_flag'})
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([set(line) for line in lines], [{'id', 'scorecard.experience_analysis.job_hopping_flag'}] * 2)
+        self.assertEqual(self.client.get(f'/api/jobs/{self.job.pk}/export/', {'columns': 'salary'}).status_code, 400)
+
+    def test_unscored_candidates_come_last(self):
+        unscored = create_resume_from_scorecard({**DEFAULT_SCORECARD, 'match_score': None}, self.job, '')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/jobs/{self.job.pk}/export/', {'output': 'ndjson', 'columns': 'id,match_score'})
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([line['match_score'] for line in lines], [9.0, 4.0, None])
+        self.assertEqual(lines[-1]['id'], unscored.pk)
+        # Explicit, so PostgreSQL (NULLs first in DESC) orders them the same way.
+        self.assertTrue([q for q in queries if 'NULLS LAST' in q['sql'] and 'api_resume' in q['sql']])
+
+
+class ListingCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('recruiter')
+        self.job = JobDescription.objects.create(title='Dev', description='<p>Python engineer</p>', created_by=self.user)
+        self.resume = create_resume_from_scorecard(DEFAULT_SCORECARD, self.job, '')
+
+    def test_job_list_revalidates_and_is_served_from_cache(self):
+        client = APIClient()
+        first = client.get('/api/jobs/')
+        etag = first['ETag']
+        self.assertEqual(client.get('/api/jobs/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get('/api/jobs/').json(), first.json())
+
+        JobDescription.objects.create(title='Go engineer', description='<p>Go</p>', created_by=self.user)
+        response = client.get('/api/jobs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_candidate_list_follows_status_changes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/resumes/').json()['results'][0]['status'], 'New')
+        bulk.set_status(Resume.objects.all(), 'Rejected')
+        self.assertEqual(client.get('/api/resumes/').json()['results'][0]['status'], 'Rejected')
+
+
+class SerializerFieldTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('recruiter')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = JobDescription.objects.create(title='Dev', description='<p>Python engineer</p>', created_by=self.user)
+        create_resume_from_scorecard(DEFAULT_SCORECARD, self.job, '')
+
+    def test_fields_parameter_trims_responses(self):
+        self.assertEqual(self.client.get('/api/jobs/', {'fields': 'id,title'}).json()['results'], [{'id': self.job.pk, 'title': 'Dev'}])
+        row = self.client.get('/api/resumes/', {'fields': 'id, match_score'}).json()['results'][0]
+        self.assertEqual(set(row), {'id', 'match_score'})
+
+    def test_fields_parameter_does_not_skip_validation(self):
+        response = self.client.post('/api/jobs/?fields=title', {'title': 'Go engineer'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('description', response.json())
+        response = self.client.post('/api/jobs/?fields=id', {'title': 'Go engineer', 'description': '<p>Go</p>'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['description'], '<p>Go</p>')
+
+    def test_list_rows_leave_out_the_scorecard(self):
+        row = self.client.get('/api/resumes/').json()['results'][0]
+        self.assertEqual(list(row), ResumeListSerializer.Meta.fields)
+        self.assertNotIn('scorecard_data', row)
+        detail = self.client.get(f"/api/resumes/{row['id']}/").json()
+        self.assertEqual(detail['scorecard_data']['summary'], DEFAULT_SCORECARD['summary'])
+
+
+class KeysetPaginationTests(TestCase):
+    """Walks every sort_by forward and back in pages of 3 over rows with NULLs and ties."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('recruiter')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        job = JobDescription.objects.create(title='Dev', description='<p>Python engineer</p>', created_by=self.user)
+        base = timezone.now()
+        rows = [
+            ('Ann', 8.0, 0), (None, 8.0, 0), ('Bob', None, 1), ('Ann', 5.5, 1), (None, None, 2), ('Cid', 9.0, 2),
+            ('Bob', 5.5, 3), ('Dee', None, 3), (None, 7.0, 4), ('Eve', 8.0, 4), ('Ann', None, 4),
+        ]
+        for name, score, minutes in rows:
+            resume = Resume.objects.create(
+                name=name, job_description=job, scorecard_data=None if score is None else {'match_score': score},
+            )
+            Resume.objects.filter(pk=resume.pk).update(uploaded_on=base - timedelta(minutes=minutes))
+        self.resumes = list(Resume.objects.all())
+        self.assertEqual(sum(resume.match_score is None for resume in self.resumes), 4)
+
+    def walk(self, sort_by):
+        response = self.client.get('/api/resumes/', {'pagination': 'cursor', 'sort_by': sort_by, 'page_size': 3})
+        forward = []
+        # Bounded, so a cursor that fails to advance fails the test instead of hanging it.
+        for _ in range(len(self.resumes)):
+            page = response.json()
+            forward.append([row['id'] for row in page['results']])
+            if not page['next']:
+                break
+            response = self.client.get(page['next'])
+        backward = [forward[-1]]
+        for _ in range(len(self.resumes)):
+            if not page['previous']:
+                break
+            page = self.client.get(page['previous']).json()
+            backward.insert(0, [row['id'] for row in page['results']])
+        return forward, backward
+
+    def assert_walk(self, sort_by, key):
+        expected = [resume.pk for resume in sorted(self.resumes, key=key)]
+        forward, backward = self.walk(sort_by)
+        self.assertEqual([pk for page in forward for pk in page], expected)
+        self.assertEqual(backward, forward)
+
+    def test_score_ordering(self):
+        self.assert_walk('-score', lambda r: (r.match_score is None, -(r.match_score or 0), -r.uploaded_on.timestamp(), -r.pk))
+
+    def test_name_ordering(self):
+        self.assert_walk('name', lambda r: (r.name is None, r.name or '', r.pk))
+
+    def test_uploaded_on_ordering(self):
+        self.assert_walk('-uploaded_on', lambda r: (-r.uploaded_on.timestamp(), -r.pk))
+
+    def test_garbage_cursor_is_rejected(self):
+        for cursor in ('not-base64!', base64.urlsafe_b64encode(b'{"d":"x","v":[]}').decode(), 'e30='):
+            self.assertEqual(self.client.get('/api/resumes/', {'cursor': cursor}).status_code, 404)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        authentication.clear()
+        self.user = User.objects.create_user('recruiter')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get('/api/resumes/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/resumes/').status_code, 200)
+        self.assertFalse([q for q in queries if 'authtoken_token' in q['sql']])
+
+    def test_deactivation_and_token_deletion_take_effect_at_once(self):
+        self.assertEqual(self.client.get('/api/resumes/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/resumes/').json()['detail'], 'User inactive or deleted.')
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/resumes/').status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/resumes/').json()['detail'], 'Invalid token.')
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+    def test_shared_cache_invalidation_reaches_every_process(self):
+        self.assertEqual(self.client.get('/api/resumes/').status_code, 200)
+        self.assertFalse(authentication._entries)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/resumes/')
+        self.assertFalse([q for q in queries if 'authtoken_token' in q['sql']])
+
+        # What another process's signal handler does when the token is deleted there.
+        caches['default'].delete(authentication._shared_key(self.token.key))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/resumes/')
+        self.assertTrue([q for q in queries if 'authtoken_token' in q['sql']])
+
+
+class MetricsTests(StubGeminiTestCase):
+    @override_settings(SERVER_TIMING_ENABLED=True, METRICS_TOKEN='scrape')
+    def test_analysis_stages_are_timed_and_exposed(self):
+        metrics.reset()
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), 'Jane Doe, Python developer')
+        upload = SimpleUploadedFile('jane.pdf', document.tobytes(), content_type='application/pdf')
+
+        response = self.client.post('/api/analyze-resume/', {'file': upload, 'job_description_id': self.job.pk})
+        self.assertEqual(response.status_code, 200)
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        for name in ('upload', 'pdf_open', 'render_page', 'encode', 'gemini', 'parse', 'db_insert', 'total'):
+            self.assertIn(name, stages)
+
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        exposition = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape').content.decode()
+        self.assertIn('resume_analysis_stage_seconds_count{stage="gemini"} 1\n', exposition)
+        self.assertIn('scorecard_json_parse_total{method="raw_decode"} 1\n', exposition)
+        self.assertIn('cache_lookups_total{cache="scorecard",result="miss"} 1\n', exposition)
+        self.assertGreater(metrics.GEMINI_TOKENS.value(kind='prompt'), 0)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_are_staff_only_without_a_token(self):
+        api = APIClient()
+        self.assertEqual(api.get('/api/metrics/').status_code, 401)
+        api.force_authenticate(self.user)
+        self.assertEqual(api.get('/api/metrics/').status_code, 403)
+        api.force_authenticate(User.objects.create_user('ops', is_staff=True))
+        response = api.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_worker_exporter_requires_the_token(self):
+        server = metrics.serve(0, host='127.0.0.1')
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url, timeout=5)
+        self.assertEqual(error.exception.code, 401)
+        error.exception.close()
+        request = urllib.request.Request(url, headers={'Authorization': 'Bearer scrape'})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            self.assertIn('# TYPE resume_analysis_stage_seconds histogram', response.read().decode())
+
+    @override_settings(METRICS_TOKEN='')
+    def test_worker_exporter_stays_on_loopback_without_a_token(self):
+        with self.assertRaises(ValueError):
+            metrics.serve(0, host='0.0.0.0')
+        server = metrics.serve(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.assertEqual(server.server_address[0], '127.0.0.1')
+
+
+class BenchmarkTests(StubGeminiTestCase):
+    @override_settings(ARTIFACT_CACHE_MAX_BYTES=0)
+    def test_synthetic_pdfs_take_the_text_and_image_paths(self):
+        rng = random.Random(0)
+        _, report = extract_document_parts(benchmarks.make_text_resume_pdf(rng))
+        self.assertEqual(report['text_pages'], [1])
+        _, report = extract_document_parts(benchmarks.make_scanned_resume_pdf(rng))
+        self.assertEqual(report['image_pages'], [1])
+
+    def test_stub_errors_are_retried_then_reported(self):
+        self.server.error_rate = 1.0
+        upload = SimpleUploadedFile('cv.pdf', benchmarks.make_text_resume_pdf(random.Random(0)), content_type='application/pdf')
+        response = self.client.post('/api/analyze-resume/', {'file': upload, 'job_description_id': self.job.pk})
+        self.assertNotEqual(response.status_code, 200)
+        self.assertGreater(len(self.server.requests), 1)
+
+    def test_bulk_loaded_resumes_are_listed_and_searchable(self):
+        benchmarks.bulk_load_resumes([self.job], 30, random.Random(0), batch_size=7)
+        self.assertEqual(Resume.objects.filter(job_description=self.job).count(), 30)
+        self.assertTrue(Resume.objects.filter(skills__isnull=False).exists())
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/search/', {'q': 'engineer', 'type': 'resumes'})
+        self.assertTrue(response.data['resumes'])
+
+    def test_listing_suite_runs_on_a_small_table(self):
+        command = run_benchmarks.Command(stdout=io.StringIO())
+        command.options = {'resumes': 25, 'samples': 1}
+        command.rng = random.Random(0)
+        command.jobs = [self.job]
+        command.client = Client(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        command.load_resumes()
+        results = command.run_listing()
+        self.assertEqual(set(results['deep_page']), {'uncached', 'cached', 'not_modified'})
+        self.assertEqual(results['export_csv']['rows'], 25)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class BulkOperationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('recruiter')
+        self.job = JobDescription.objects.create(title='Dev', description='<p>Python engineer</p>', created_by=user)
+        self.resumes = [
+            create_resume_from_scorecard({**DEFAULT_SCORECARD, 'match_score': score}, self.job, ContentFile(b'%PDF', name='cv.pdf'))
+            for score in (2, 5, 9)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_status_change_by_filter_is_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/resumes/bulk/', {
+                'action': 'set_status', 'status': 'Rejected', 'filter': {'job_id': self.job.pk, 'max_score': 5},
+            }, format='json')
+        self.assertEqual(response.json(), {'updated': 2})
+        resume_queries = [q['sql'] for q in queries if q['sql'].startswith(('SELECT "api_resume"', 'UPDATE "api_resume"'))]
+        self.assertEqual(len(resume_queries), 1)
+        self.assertEqual(sorted(Resume.objects.values_list('status', flat=True)), ['New', 'Rejected', 'Rejected'])
+
+        for invalid in ('Gone', ['Rejected']):
+            response = self.client.post('/api/resumes/bulk/', {'action': 'set_status', 'status': invalid, 'ids': [1]}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(Resume.objects.values_list('status', flat=True)), ['New', 'Rejected', 'Rejected'])
+
+    def test_delete_removes_cv_files(self):
+        storage = Resume._meta.get_field('original_cv').storage
+        names = [resume.original_cv.name for resume in self.resumes[:2]]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/resumes/delete/', {'ids': [r.pk for r in self.resumes[:2]]}, format='json')
+        self.assertEqual(response.json()['deleted'], 2)
+        bulk.cleanup_executor().submit(lambda: None).result()
+        self.assertFalse(any(storage.exists(name) for name in names))
+        self.assertTrue(storage.exists(self.resumes[2].original_cv.name))
+
+
+class JobAnalyticsTests(TestCase):
+    def test_analytics_are_cached_until_a_resume_changes(self):
+        user = User.objects.create_user('recruiter')
+        job = JobDescription.objects.create(title='Dev', description='<p>Python engineer</p>', created_by=user)
+        flags = (['Short tenures', 'No degree'], [' short  tenures', 'short tenures'], [])
+        for score, red_flags in zip((3, 7.5, 10), flags):
+            create_resume_from_scorecard({**DEFAULT_SCORECARD, 'match_score': score, 'red_flags': red_flags}, job, None)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/jobs/{job.pk}/analytics/'
+
+        data = client.get(url).json()
+        self.assertEqual(data['candidates'], 3)
+        self.assertEqual([bucket['count'] for bucket in data['score_histogram']], [0, 0, 0, 1, 0, 0, 0, 1, 0, 1])
+        self.assertEqual(data['top_skills'][0]['count'], 3)
+        self.assertEqual(data['with_red_flags'], 2)
+        self.assertEqual(data['red_flags'], [{'flag': 'Short tenures', 'count': 2}, {'flag': 'No degree', 'count': 1}])
+        with self.assertNumQueries(2):
+            self.assertEqual(client.get(url).json(), data)
+
+        resume = Resume.objects.filter(job_description=job).first()
+        resume.status = 'Hired'
+        resume.save(update_fields=['status'])
+        funnel = {row['status']: row['count'] for row in client.get(url).json()['status_funnel']}
+        self.assertEqual((funnel['New'], funnel['Hired']), (2, 1))
+
+    def test_concurrent_first_requests_share_one_row(self):
+        user = User.objects.create_user('recruiter')
+        job = JobDescription.objects.create(title='Dev', description='<p>Python engineer</p>', created_by=user)
+        get = QuerySet.get
+        misses = []
+
+        def lose_the_race(queryset, *args, **kwargs):
+            # The first lookup misses, and another request creates the row before this one can.
+            if queryset.model is JobAnalytics and not misses:
+                misses.append(JobAnalytics.objects.create(job_description=job))
+                raise JobAnalytics.DoesNotExist
+            return get(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'get', autospec=True, side_effect=lose_the_race):
+            data = analytics.job_analytics(job)
+        self.assertEqual(data['candidates'], 0)
+        self.assertEqual(JobAnalytics.objects.get(job_description=job).data, data)
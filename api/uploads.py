@@ -0,0 +1,78 @@
+# api/uploads.py
+#
+# Keeps uploaded and stored CVs out of memory. Every upload is spooled to a
+# temporary file and hashed as its chunks arrive, and the analysis pipeline
+# is handed the file's path rather than its bytes: fitz reads PDFs from disk
+# and page images are streamed into the Gemini request.
+
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Spools every upload, however small, to disk and sets `sha256` on the uploaded file."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.sha256 = self.sha256.hexdigest()
+        return uploaded_file
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pdf_sha256(pdf):
+    """SHA-256 of a PDF given as bytes or as a file path."""
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(pdf).hexdigest()
+    return file_sha256(pdf)
+
+
+def uploaded_pdf(uploaded_file):
+    """Return `(pdf, sha256)` for an upload, where `pdf` is its spooled path or, failing that, its bytes.
+
+    `sha256` is None when the upload handler didn't compute it.
+    """
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return uploaded_file.temporary_file_path(), getattr(uploaded_file, 'sha256', None)
+    uploaded_file.seek(0)
+    return uploaded_file.read(), None
+
+
+def stored_pdf(field_file):
+    """Return the local path of a stored file, or its bytes if the storage has no local paths."""
+    try:
+        return field_file.path
+    except NotImplementedError:
+        with field_file.open('rb') as f:
+            return f.read()
+
+
+def copy_of(uploaded_file):
+    """A File over the upload's data, for saving it more than once; close it after use.
+
+    Saving the upload itself moves its temporary file into storage.
+    """
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return File(open(uploaded_file.temporary_file_path(), 'rb'), name=os.path.basename(uploaded_file.name))
+    uploaded_file.seek(0)
+    return ContentFile(uploaded_file.read(), name=uploaded_file.name)
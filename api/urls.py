@@ -1,7 +1,7 @@
 # api/urls.py
 
 from django.urls import path, include
-from .views import AnalyzeResumeView, ResumeViewSet, BulkDeleteResumesView, JobDescriptionViewSet, UpdateResumeStatusView
+from .views import AnalyzeResumeView, AsyncAnalyzeResumeView, AnalysisTaskStatusView, BatchAnalyzeResumesView, AnalysisBatchStatusView, ResumeViewSet, BulkDeleteResumesView, BulkResumeOperationView, JobDescriptionViewSet, UpdateResumeStatusView, SearchView, MetricsView
 from rest_framework.authtoken.views import obtain_auth_token
 from rest_framework.routers import DefaultRouter
 
@@ -12,8 +12,15 @@ router.register(r'jobs', JobDescriptionViewSet, basename='job')
 
 urlpatterns = [
     path('analyze-resume/', AnalyzeResumeView.as_view(), name='analyze-resume'),
+    path('analyze-resume/async/', AsyncAnalyzeResumeView.as_view(), name='analyze-resume-async'),
+    path('analysis-tasks/<uuid:pk>/', AnalysisTaskStatusView.as_view(), name='analysis-task-status'),
+    path('analyze-resumes/batch/', BatchAnalyzeResumesView.as_view(), name='analyze-resumes-batch'),
+    path('analysis-batches/<uuid:pk>/', AnalysisBatchStatusView.as_view(), name='analysis-batch-status'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('api-token-auth/', obtain_auth_token, name='api_token_auth'),
     path('resumes/delete/', BulkDeleteResumesView.as_view(), name='resume-bulk-delete'),
+    path('resumes/bulk/', BulkResumeOperationView.as_view(), name='resume-bulk-operation'),
     
     # --- NEW: URL for updating status ---
     path('resumes/<int:pk>/update-status/', UpdateResumeStatusView.as_view(), name='update-resume-status'),
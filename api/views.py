@@ -3,36 +3,46 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, viewsets
-from rest_framework.pagination import PageNumberPagination
-from django.http import Http404
-import os
+from rest_framework.decorators import action
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 import json
-import urllib.request
-import urllib.error
-import fitz 
-import base64
-import re
+import uuid
 
 from django.db import models
-from django.db.models import Q
-from django.db.models.functions import Cast
-from django.db.models import FloatField
+from django.db.models import Count
 from django.conf import settings
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from .serializers import ResumeSerializer, JobDescriptionSerializer
-from .models import Resume, JobDescription
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from .pagination import StandardResultsSetPagination, KeysetPaginationMixin
+from .serializers import ResumeSerializer, ResumeListSerializer, JobDescriptionSerializer, AnalysisTaskSerializer
+from .models import Resume, JobDescription, AnalysisTask, ResumeSkill
+from .scorecard import get_gemini_api_key, build_resume_from_scorecard, create_resume_from_scorecard
+from .scorecard_cache import aget_or_generate_scorecard, get_or_generate_scorecard, get_or_generate_scorecards
+from .tasks import enqueue_analysis
+from .batch import BatchError, analyze_batch, collect_documents, is_pdf_name
+from . import bulk, listing_cache, metrics, search
+from .skills import filter_by_skills, parse_skill_names, skill_facets
+from .analytics import job_analytics
+from .export import ExportError, export_candidates, parse_columns
+from .rescore import enqueue_rescore, rescore_job, resumes_to_rescore
+from .uploads import copy_of, uploaded_pdf
 
-def get_gemini_api_key():
-    return os.environ.get("GEMINI_API_KEY")
+def request_wants_async(request):
+    # Plain Django requests come from AsyncAnalyzeResumeView.
+    query, data = (request.query_params, request.data) if hasattr(request, 'query_params') else (request.GET, request.POST)
+    requested = query.get('async', data.get('async'))
+    if requested is None:
+        return settings.ANALYSIS_MODE == 'async'
+    return str(requested).lower() in ('1', 'true', 'yes')
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-class JobDescriptionViewSet(viewsets.ModelViewSet):
+class JobDescriptionViewSet(listing_cache.CachedListingMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
     serializer_class = JobDescriptionSerializer
     pagination_class = StandardResultsSetPagination
+    listing_dependencies = (listing_cache.JOBS,)
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -42,14 +52,11 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
-        queryset = JobDescription.objects.all().order_by('-created_at')
+        queryset = JobDescription.objects.all().order_by('-created_at', '-id')
         
         search_term = self.request.query_params.get('search', None)
         if search_term:
-            queryset = queryset.filter(
-                Q(title__icontains=search_term) |
-                Q(description__icontains=search_term)
-            )
+            queryset = search.get_backend().filter_queryset(queryset, search.JOB, search_term)
 
         if self.action not in ['list', 'retrieve']:
             user = self.request.user
@@ -59,9 +66,75 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def get_keyset_ordering(self):
+        return ['-created_at', '-id']
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def skills(self, request, pk=None):
+        """Skill frequency facets over this job's candidates (`?category=hard|soft|certification`)."""
+        job = self.get_object()
+        category = request.query_params.get('category')
+        if category and category not in dict(ResumeSkill.CATEGORY_CHOICES):
+            return Response({"error": "Invalid category provided."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 50)), 500))
+        except ValueError:
+            return Response({"error": "'limit' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "job_id": job.pk,
+            "candidates": job.resumes.count(),
+            "skills": skill_facets(job, category=category, limit=limit),
+        })
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Score histogram, status funnel, top skills and red-flag counts of this job's candidates.
+
+        Served from JobAnalytics until one of the job's resumes changes.
+        """
+        return Response(job_analytics(self.get_object()))
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """Stream every candidate of this job as CSV or NDJSON.
+
+        `output` picks the format (csv by default) and `columns` the fields,
+        including ones flattened out of the scorecard (see api/export.py).
+        """
+        job = self.get_object()
+        output = request.query_params.get('output', 'csv')
+        try:
+            chunks, content_type = export_candidates(job, output, parse_columns(request.query_params.get('columns')))
+        except ExportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="job-{job.pk}-candidates.{output}"'
+        return response
+
+    @action(detail=True, methods=['post'])
+    def rescore(self, request, pk=None):
+        """Re-score the candidates scored against an older version of this job (`all=1` for every candidate).
+
+        Streams NDJSON like the batch endpoint, or with `async=1` queues the
+        resumes for the worker pool and returns a batch id.
+        """
+        job = self.get_object()
+        if not get_gemini_api_key():
+            return Response({"error": "Gemini API key is not configured. Please check your .env file."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        include_current = str(request.query_params.get('all', request.data.get('all', ''))).lower() in ('1', 'true', 'yes')
+        resumes = resumes_to_rescore(job, include_current=include_current)
+
+        if request_wants_async(request):
+            batch_id = uuid.uuid4()
+            enqueue_rescore(job, resumes, batch_id)
+            return Response(BatchAnalyzeResumesView.batch_status(request, batch_id), status=status.HTTP_202_ACCEPTED)
+
+        lines = (json.dumps(result) + "\n" for result in rescore_job(job, resumes))
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
 
 class AnalyzeResumeView(APIView):
     permission_classes = [AllowAny] 
@@ -71,11 +144,16 @@ class AnalyzeResumeView(APIView):
         if not api_key:
             return Response({"error": "Gemini API key is not configured. Please check your .env file."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        pdf_file = request.FILES.get('file')
+        with metrics.stage('upload'):
+            pdf_file = request.FILES.get('file')
         job_id = request.data.get('job_description_id')
         
         if not pdf_file:
             return Response({"error": "No resume file provided."}, status=status.HTTP_400_BAD_REQUEST)
+        metrics.UPLOAD_BYTES.observe(pdf_file.size)
+
+        if 'job_description_ids' in request.data:
+            return self.analyze_for_jobs(request, pdf_file)
 
         job_description_instance = None
         job_text = ''
@@ -89,133 +167,323 @@ class AnalyzeResumeView(APIView):
         if not job_text:
              return Response({"error": "No Job Description provided."}, status=status.HTTP_400_BAD_REQUEST)
 
+        if request_wants_async(request):
+            task = enqueue_analysis(pdf_file, job_description_instance)
+            serializer = AnalysisTaskSerializer(task, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
         try:
-            pdf_content = pdf_file.read()
-            scorecard = self.generate_comparative_scorecard(pdf_content, job_text)
+            pdf, pdf_hash = uploaded_pdf(pdf_file)
+            extraction_report = {}
+            scorecard = get_or_generate_scorecard(pdf, job_text, report=extraction_report, pdf_hash=pdf_hash)
 
             if "error" in scorecard:
                 return Response({"error": scorecard["error"]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            resume = Resume.objects.create(
-                name=scorecard.get('basic_information', {}).get('name'),
-                email=scorecard.get('basic_information', {}).get('email'),
-                scorecard_data=scorecard,
-                job_description=job_description_instance, 
-                original_cv=pdf_file
-            )
+            resume = create_resume_from_scorecard(scorecard, job_description_instance, pdf_file)
             
             serializer = ResumeSerializer(resume)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response({**serializer.data, "extraction_report": extraction_report}, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({"error": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def generate_comparative_scorecard(self, pdf_content, job_description_text):
-        api_key = get_gemini_api_key()
-        api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-flash-latest:generateContent?key={api_key}"
-        
-        prompt = f"""
-        Analyze the following resume against the provided job description. Your only output must be a single, valid JSON object that strictly follows the requested structure. Do not include any text, explanations, or markdown formatting outside of the JSON object.
-
-        **Job Description:**
-        ---
-        {job_description_text}
-        ---
-
-        **Required JSON Output Structure:**
-        {{
-          "match_score": "number", "summary": "string", "skill_gap_analysis": ["string"],
-          "basic_information": {{ "name": "string", "email": "string", "phone": "string", "linkedin": "string" }},
-          "experience_analysis": {{ "seniority_progression": ["string"], "tenure_summary": "string", "job_hopping_flag": "boolean", "relevant_domains": ["string"] }},
-          "skillset_evaluation": {{ "hard_skills": ["string"], "soft_skills": ["string"], "certifications": ["string"] }},
-          "positive_indicators": ["string"], "red_flags": ["string"], "cultural_fit_summary": "string", "personality_signals": ["string"]
-        }}
+    def analyze_for_jobs(self, request, pdf_file):
+        """Score one CV against every job in `job_description_ids`, creating a Resume per job.
+
+        The PDF is extracted once and the jobs share combined Gemini requests.
+        The response lists a result per job, in the order given.
         """
-        
-        payload_parts = [{"text": prompt}]
-        
+        values = request.data.getlist('job_description_ids') if hasattr(request.data, 'getlist') else request.data['job_description_ids']
+        if not isinstance(values, list):
+            values = [values]
         try:
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
-            for page in doc:
-                pix = page.get_pixmap(dpi=200)
-                base64_image = base64.b64encode(pix.tobytes("png")).decode('utf-8')
-                payload_parts.append({"inline_data": { "mime_type": "image/png", "data": base64_image }})
-
-            payload = { "contents": [{"parts": payload_parts}], "generationConfig": {"response_mime_type": "application/json"} }
-            data = json.dumps(payload).encode("utf-8")
-            req = urllib.request.Request(api_url, data=data, headers={"Content-Type": "application/json"})
-            
-            try:
-                with urllib.request.urlopen(req) as response:
-                    if response.status != 200:
-                        return {"error": f"Gemini API Error {response.status}: {response.read().decode('utf-8')}"}
-                    
-                    response_data = response.read().decode("utf-8")
-                    result = json.loads(response_data)
-                    raw_text = result['candidates'][0]['content']['parts'][0]['text']
-            except urllib.error.HTTPError as e:
-                error_body = e.read().decode('utf-8')
-                return {"error": f"Gemini API HTTP Error {e.code}: {error_body}"}
-            except urllib.error.URLError as e:
-                return {"error": f"Gemini API URL Error: {str(e.reason)}"}
-
-            # Robust JSON extraction:
-            # The AI is instructed to return only a JSON object, but sometimes
-            # it might include extra text or wrap the JSON in markdown.
+            job_ids = list(dict.fromkeys(int(job_id) for value in values for job_id in str(value).split(',') if job_id.strip()))
+        except ValueError:
+            return Response({"error": "'job_description_ids' must be a list of job ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if not job_ids:
+            return Response({"error": "No Job Description provided."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(job_ids) > settings.MULTI_JOB_MAX_JOBS:
+            return Response({"error": f"At most {settings.MULTI_JOB_MAX_JOBS} job descriptions can be analyzed at once."}, status=status.HTTP_400_BAD_REQUEST)
+
+        jobs = JobDescription.objects.in_bulk(job_ids)
+        if len(jobs) < len(job_ids):
+            return Response({"error": "Job Description not found."}, status=status.HTTP_404_NOT_FOUND)
+        jobs = [jobs[job_id] for job_id in job_ids]
+        if not all(job.description for job in jobs):
+            return Response({"error": "No Job Description provided."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request_wants_async(request):
+            tasks = []
+            for job in jobs:
+                with copy_of(pdf_file) as upload:
+                    tasks.append(enqueue_analysis(upload, job))
+            serializer = AnalysisTaskSerializer(tasks, many=True, context={'request': request})
+            return Response({"tasks": serializer.data}, status=status.HTTP_202_ACCEPTED)
+
+        try:
+            pdf, pdf_hash = uploaded_pdf(pdf_file)
+            extraction_report = {}
+            scorecards = get_or_generate_scorecards(pdf, [job.description for job in jobs], report=extraction_report, pdf_hash=pdf_hash)
+            results = []
+            for job, scorecard in zip(jobs, scorecards):
+                if "error" in scorecard:
+                    results.append({"job_description_id": job.pk, "error": scorecard["error"]})
+                    continue
+                with copy_of(pdf_file) as original_cv:
+                    resume = create_resume_from_scorecard(scorecard, job, original_cv)
+                results.append({"job_description_id": job.pk, "resume": ResumeSerializer(resume).data})
+        except Exception as e:
+            return Response({"error": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if all("error" in result for result in results):
+            return Response({"error": results[0]["error"], "results": results}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({"results": results, "extraction_report": extraction_report}, status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAnalyzeResumeView(View):
+    """`AnalyzeResumeView` for ASGI servers: the Gemini round trip is awaited rather than holding a thread.
+
+    Extraction and rendering run on worker threads and the database is
+    reached through the async ORM, so one process can keep hundreds of
+    analyses in flight. Queued (`async=1`) and multi-job requests are handed
+    to `AnalyzeResumeView`.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        if not get_gemini_api_key():
+            return JsonResponse({"error": "Gemini API key is not configured. Please check your .env file."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # Parsing the multipart body spools the upload to disk.
+        with metrics.stage('upload'):
+            files = await sync_to_async(lambda: request.FILES, thread_sensitive=False)()
+        pdf_file = files.get('file')
+        if not pdf_file:
+            return JsonResponse({"error": "No resume file provided."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if 'job_description_ids' in request.POST or request_wants_async(request):
+            return await sync_to_async(AnalyzeResumeView.as_view())(request)
+        metrics.UPLOAD_BYTES.observe(pdf_file.size)
+
+        job_description = None
+        job_id = request.POST.get('job_description_id')
+        if job_id:
             try:
-                # Attempt to parse the first valid JSON object from the raw text
-                decoder = json.JSONDecoder()
-                scorecard, end_index = decoder.raw_decode(raw_text.strip())
-                
-                # Optional: Log or handle if there's extra data after the first JSON object
-                remaining_text = raw_text.strip()[end_index:].strip()
-                if remaining_text:
-                    print(f"Warning: Gemini API response contained extra data after JSON: '{remaining_text}'")
-
-            except json.JSONDecodeError as e:
-                # If raw_decode fails, it means the text doesn't start with a valid JSON object
-                # or is malformed. Try to find a JSON block wrapped in markdown,
-                # which is a common LLM output format.
-                markdown_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', raw_text, re.DOTALL)
-                if markdown_match:
-                    scorecard = json.loads(markdown_match.group(1))
-                else:
-                    # If no markdown block found, or markdown parsing failed,
-                    # and raw_decode also failed, then the response is genuinely problematic.
-                    return {"error": f"Failed to decode JSON from AI response: {e}. Raw text was: '{raw_text}'"}
-
-            if 'match_score' in scorecard and isinstance(scorecard['match_score'], (int, float)) and scorecard['match_score'] > 10:
-                scorecard['match_score'] /= 10.0
-            
-            return scorecard
+                job_description = await JobDescription.objects.aget(id=job_id)
+            except (JobDescription.DoesNotExist, ValueError):
+                return JsonResponse({"error": "Job Description not found."}, status=status.HTTP_404_NOT_FOUND)
+        if job_description is None or not job_description.description:
+            return JsonResponse({"error": "No Job Description provided."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            pdf, pdf_hash = uploaded_pdf(pdf_file)
+            extraction_report = {}
+            scorecard = await aget_or_generate_scorecard(pdf, job_description.description, report=extraction_report, pdf_hash=pdf_hash)
+
+            if "error" in scorecard:
+                return JsonResponse({"error": scorecard["error"]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            resume = build_resume_from_scorecard(scorecard, job_description, pdf_file)
+            with metrics.stage('db_insert'):
+                await resume.asave()
+            data = await sync_to_async(lambda: ResumeSerializer(resume).data)()
+            return JsonResponse({**data, "extraction_report": extraction_report}, status=status.HTTP_200_OK)
 
         except Exception as e:
-            return {"error": str(e)}
+            return JsonResponse({"error": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MetricsView(APIView):
+    """This process's metrics in the Prometheus text format, for scraping.
 
-class ResumeViewSet(viewsets.ReadOnlyModelViewSet):
+    With METRICS_TOKEN set, the scraper must send it as a bearer token;
+    without one, only staff users may read them.
+    """
+
+    def get_permissions(self):
+        if settings.METRICS_TOKEN:
+            return [AllowAny()]
+        return [IsAdminUser()]
+
+    def get(self, request, *args, **kwargs):
+        if settings.METRICS_TOKEN and not metrics.has_scrape_token(request.headers.get('Authorization')):
+            return JsonResponse({"error": "A valid metrics token is required."}, status=status.HTTP_401_UNAUTHORIZED)
+        return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+class AnalysisTaskStatusView(APIView):
+    # The task id is an unguessable UUID handed back to the uploader, so polling
+    # is open to the same clients that may upload.
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk, *args, **kwargs):
+        try:
+            task = AnalysisTask.objects.select_related('resume__job_description').get(pk=pk)
+        except AnalysisTask.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        serializer = AnalysisTaskSerializer(task, context={'request': request})
+        return Response(serializer.data)
+
+
+class BatchAnalyzeResumesView(APIView):
+    """Analyze many CVs (multiple `files` and/or one ZIP `archive`) against one job.
+
+    By default the results stream back as NDJSON, one line per file as it
+    finishes plus a final summary line. With `async=1` the files are queued
+    for the worker pool instead and a batch id is returned for polling.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if not get_gemini_api_key():
+            return Response({"error": "Gemini API key is not configured. Please check your .env file."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        job_id = request.data.get('job_description_id')
+        if not job_id:
+            return Response({"error": "No Job Description provided."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            job_description = JobDescription.objects.get(id=job_id, created_by=request.user)
+        except (JobDescription.DoesNotExist, ValueError):
+            return Response({"error": "Job Description not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            documents = collect_documents(request.FILES.getlist('files'), request.FILES.get('archive'))
+        except BatchError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request_wants_async(request):
+            batch_id = uuid.uuid4()
+            skipped = []
+            for document in documents:
+                if not is_pdf_name(document.name):
+                    skipped.append(document.name)
+                    continue
+                with document.as_file() as upload:
+                    enqueue_analysis(upload, job_description, batch_id=batch_id)
+            return Response({**self.batch_status(request, batch_id), "skipped": skipped}, status=status.HTTP_202_ACCEPTED)
+
+        lines = (json.dumps(result) + "\n" for result in analyze_batch(documents, job_description))
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+    @staticmethod
+    def batch_status(request, batch_id):
+        tasks = AnalysisTask.objects.filter(batch_id=batch_id)
+        counts = {row['status']: row['count'] for row in tasks.values('status').annotate(count=Count('id'))}
+        return {
+            "batch_id": str(batch_id),
+            "status_url": request.build_absolute_uri(reverse('analysis-batch-status', kwargs={'pk': batch_id})),
+            "total": sum(counts.values()),
+            "counts": {choice: counts.get(choice, 0) for choice, _ in AnalysisTask.STATUS_CHOICES},
+            "tasks": [
+                {"task_id": str(task_id), "status": task_status, "resume_id": resume_id, "error": error}
+                for task_id, task_status, resume_id, error in tasks.order_by('created_at').values_list('id', 'status', 'resume_id', 'error')
+            ],
+        }
+
+
+class AnalysisBatchStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        if not AnalysisTask.objects.filter(batch_id=pk, job_description__created_by=request.user).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(BatchAnalyzeResumesView.batch_status(request, pk))
+
+
+class ResumeViewSet(listing_cache.CachedListingMixin, KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ResumeSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    # Rows show the job title and whether the job changed since scoring.
+    listing_dependencies = (listing_cache.JOBS, listing_cache.RESUMES)
+    listing_cache_control = 'private, no-cache'
+
+    # Each supported sort_by, ending in a unique tiebreaker so keyset cursors are exact.
+    ORDERINGS = {
+        '-score': ['-match_score', '-uploaded_on', '-id'],
+        'name': ['name', 'id'],
+        '-uploaded_on': ['-uploaded_on', '-id'],
+    }
+
+    def get_keyset_ordering(self):
+        return self.ORDERINGS.get(self.request.query_params.get('sort_by', '-score'), self.ORDERINGS['-uploaded_on'])
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ResumeListSerializer
+        return ResumeSerializer
 
     def get_queryset(self):
-        queryset = Resume.objects.all()
+        queryset = Resume.objects.select_related('job_description')
+        if self.action == 'list':
+            queryset = queryset.only(*ResumeListSerializer.QUERYSET_FIELDS)
         job_id = self.request.query_params.get('job_id')
         if job_id:
             queryset = queryset.filter(job_description__id=job_id)
+
+        # ?skills=python,django matches candidates with every skill; add skills_match=any for either.
+        skill_names = parse_skill_names(self.request.query_params.get('skills'))
+        if skill_names:
+            match_all = self.request.query_params.get('skills_match', 'all') != 'any'
+            queryset = filter_by_skills(queryset, skill_names, match_all=match_all)
         
         sort_by = self.request.query_params.get('sort_by', '-score')
         
         if sort_by == '-score':
-            queryset = queryset.annotate(
-                score=Cast(models.F('scorecard_data__match_score'), FloatField())
-            ).order_by('-score', '-uploaded_on')
+            queryset = queryset.order_by(models.F('match_score').desc(nulls_last=True), '-uploaded_on', '-id')
         elif sort_by == 'name':
-            queryset = queryset.order_by('name')
+            queryset = queryset.order_by(models.F('name').asc(nulls_last=True), 'id')
         elif sort_by == '-uploaded_on':
-            queryset = queryset.order_by('-uploaded_on')
+            queryset = queryset.order_by('-uploaded_on', '-id')
         
         return queryset
 
+class SearchView(APIView):
+    """Ranked full-text search: `?q=` with optional `type` (jobs, resumes), `job_id` and `limit`.
+
+    Jobs are searchable by anyone, like the public job list; resumes only by
+    signed-in users.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "A search query 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', settings.SEARCH_MAX_RESULTS)), settings.SEARCH_MAX_RESULTS))
+            job_id = request.query_params.get('job_id')
+            job_id = int(job_id) if job_id else None
+        except ValueError:
+            return Response({"error": "'limit' and 'job_id' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = request.query_params.get('type', 'jobs,resumes').split(',')
+
+        backend = search.get_backend()
+        results = {"query": query}
+        if 'jobs' in kinds:
+            jobs = JobDescription.objects.all()
+            if job_id is not None:
+                jobs = jobs.filter(pk=job_id)
+            hits = backend.search(jobs, search.JOB, query, limit)
+            by_id = JobDescription.objects.in_bulk([pk for pk, _ in hits])
+            results["jobs"] = [
+                {**JobDescriptionSerializer(by_id[pk], context={'request': request}).data, "score": score}
+                for pk, score in hits if pk in by_id
+            ]
+        if 'resumes' in kinds and request.user and request.user.is_authenticated:
+            resumes = Resume.objects.all()
+            if job_id is not None:
+                resumes = resumes.filter(job_description_id=job_id)
+            hits = backend.search(resumes, search.RESUME, query, limit, job_id=job_id)
+            by_id = Resume.objects.select_related('job_description').only(*ResumeListSerializer.QUERYSET_FIELDS).in_bulk([pk for pk, _ in hits])
+            results["resumes"] = [
+                {**ResumeListSerializer(by_id[pk], context={'request': request}).data, "score": score}
+                for pk, score in hits if pk in by_id
+            ]
+        return Response(results)
+
+
 # --- RESTORED: View for updating resume status ---
 class UpdateResumeStatusView(APIView):
     permission_classes = [IsAuthenticated]
@@ -235,15 +503,43 @@ class UpdateResumeStatusView(APIView):
             return Response({'error': 'Invalid status provided.'}, status=status.HTTP_400_BAD_REQUEST)
             
         resume.status = new_status
-        resume.save()
+        resume.save(update_fields=['status'])
         serializer = ResumeSerializer(resume)
         return Response(serializer.data)
 
 
+class BulkResumeOperationView(APIView):
+    """Apply a pipeline operation to many resumes, selected by `ids` or by a `filter`.
+
+    `{"action": "set_status", "status": "Rejected", "filter": {"job_id": 3, "max_score": 4}}`
+    is a single UPDATE; `"action": "delete"` deletes the selection in batches
+    and removes the CV files in the background. The filter takes `job_id`,
+    `min_score`, `max_score` and `status`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        operation = request.data.get('action')
+        if operation not in ('set_status', 'delete'):
+            return Response({"error": "'action' must be 'set_status' or 'delete'."}, status=status.HTTP_400_BAD_REQUEST)
+        if operation == 'set_status' and not request.data.get('status'):
+            return Response({'error': 'Status field is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            resumes = bulk.select_resumes(request.data)
+            if operation == 'set_status':
+                return Response({"updated": bulk.set_status(resumes, request.data['status'])})
+        except bulk.BulkError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"deleted": bulk.delete_resumes(resumes)})
+
+
 class BulkDeleteResumesView(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request, *args, **kwargs):
         ids_to_delete = request.data.get('ids', [])
         if not ids_to_delete: return Response({"error": "A list of 'ids' is required."}, status=status.HTTP_400_BAD_REQUEST)
-        Resume.objects.filter(pk__in=ids_to_delete).delete()
-        return Response({"message": f"Resumes deleted successfully."}, status=status.HTTP_200_OK)
+        try:
+            deleted = bulk.delete_resumes(bulk.select_resumes({'ids': ids_to_delete}))
+        except bulk.BulkError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": f"Resumes deleted successfully.", "deleted": deleted}, status=status.HTTP_200_OK)
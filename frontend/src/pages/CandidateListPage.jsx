@@ -132,6 +132,17 @@ function CandidateListPage({ auth }) {
         }
     };
 
+    // The list only carries summary fields; the full scorecard comes from the detail endpoint.
+    const handleViewScorecard = async (resumeId) => {
+        try {
+            const response = await fetch(`http://localhost:8000/api/resumes/${resumeId}/`, { headers: { 'Authorization': `Token ${auth.token}` } });
+            if (!response.ok) throw new Error('Failed to load scorecard.');
+            setViewingScorecardFor(await response.json());
+        } catch (err) {
+            setError(err.message);
+        }
+    };
+
     // --- ADDED: handleDownload function ---
     const handleDownload = async (cvUrl) => {
         try {
@@ -206,14 +217,14 @@ function CandidateListPage({ auth }) {
                                             <p className="text-sm text-slate-500">{resume.email}</p>
                                         </div>
                                         <div className="col-span-2 text-center">
-                                            <span className="font-bold text-lg text-slate-700">{resume.scorecard_data?.match_score?.toFixed(1) || 'N/A'}</span>
+                                            <span className="font-bold text-lg text-slate-700">{resume.match_score?.toFixed(1) || 'N/A'}</span>
                                             <span className="text-sm text-slate-500"> / 10</span>
                                         </div>
                                         <div className="col-span-2">
                                             <StatusSelector currentStatus={resume.status} resumeId={resume.id} onStatusChange={handleStatusChange} />
                                         </div>
                                         <div className="col-span-3 flex justify-end space-x-2">
-                                            <button onClick={() => setViewingScorecardFor(resume)} className="px-3 py-1.5 text-sm font-semibold bg-indigo-600 text-white hover:bg-indigo-700 rounded-md transition-colors">Scorecard</button>
+                                            <button onClick={() => handleViewScorecard(resume.id)} className="px-3 py-1.5 text-sm font-semibold bg-indigo-600 text-white hover:bg-indigo-700 rounded-md transition-colors">Scorecard</button>
                                             {/* --- ADDED: Download CV Button --- */}
                                             {resume.original_cv && <button onClick={() => handleDownload(resume.original_cv)} className="px-3 py-1.5 bg-green-600 text-white text-xs hover:bg-green-700 rounded-md">CV</button>}
                                         </div>
@@ -57,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.metrics.ServerTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'resume_backend.urls'
@@ -150,14 +151,147 @@ MEDIA_URL = '/media/'
 # Directory where media files will be stored
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are always spooled to a temporary file (never held in memory) and
+# hashed while they arrive; see api/uploads.py.
+FILE_UPLOAD_HANDLERS = ['api.uploads.HashingTemporaryFileUploadHandler']
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # This line tells Django to look for "Authorization: Token ..." headers
-        'rest_framework.authentication.TokenAuthentication',
+        # (TokenAuthentication with the token lookup cached; see below)
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ]
 }
 
-# ALLOWED_HOSTS = ['your-app-name.onrender.com']
\ No newline at end of file
+# Token authentication cache (api/authentication.py). Resolved tokens are kept for
+# AUTH_TOKEN_CACHE_TTL seconds in the Django cache AUTH_TOKEN_CACHE_ALIAS if set (e.g.
+# 'default' with a shared backend), where a deleted token or deactivated user is
+# dropped for every process at once. Otherwise they are kept in a per-process LRU
+# of AUTH_TOKEN_CACHE_SIZE entries, and other processes keep accepting such a token
+# for up to the TTL. A TTL of 0 disables it.
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 60))
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 1024))
+AUTH_TOKEN_CACHE_ALIAS = os.environ.get('AUTH_TOKEN_CACHE_ALIAS', '')
+
+# Job and candidate listings (api/listing_cache.py) answer conditional GETs with 304
+# and keep response data for LISTING_CACHE_TIMEOUT seconds in the Django cache
+# LISTING_CACHE_ALIAS; entries are keyed on data versions, so writes take effect at
+# once. A timeout of 0 keeps the ETags but disables the response cache.
+LISTING_CACHE_ALIAS = os.environ.get('LISTING_CACHE_ALIAS', 'default')
+LISTING_CACHE_TIMEOUT = int(os.environ.get('LISTING_CACHE_TIMEOUT', 300))
+
+# ALLOWED_HOSTS = ['your-app-name.onrender.com']
+
+# Resume analysis pipeline
+# 'sync' analyzes inside the request; 'async' queues an AnalysisTask and returns 202.
+# Clients can override per request with the `async` form field / query parameter.
+ANALYSIS_MODE = os.environ.get('ANALYSIS_MODE', 'sync')
+ANALYSIS_WORKER_CONCURRENCY = int(os.environ.get('ANALYSIS_WORKER_CONCURRENCY', 4))
+ANALYSIS_WORKER_POLL_INTERVAL = float(os.environ.get('ANALYSIS_WORKER_POLL_INTERVAL', 1.0))
+ANALYSIS_TASK_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_TASK_MAX_ATTEMPTS', 3))
+# A running task whose worker has not heartbeated for this long is re-queued.
+ANALYSIS_TASK_LEASE_SECONDS = int(os.environ.get('ANALYSIS_TASK_LEASE_SECONDS', 300))
+ANALYSIS_TASK_RETRY_BACKOFF_SECONDS = int(os.environ.get('ANALYSIS_TASK_RETRY_BACKOFF_SECONDS', 30))
+
+# Scorecard cache (api/scorecard_cache.py): re-uploads of the same PDF against the
+# same job text are served from the database instead of calling Gemini again.
+SCORECARD_CACHE_ENABLED = os.environ.get('SCORECARD_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SCORECARD_CACHE_MAX_ENTRIES = int(os.environ.get('SCORECARD_CACHE_MAX_ENTRIES', 50000))
+SCORECARD_CACHE_MAX_BYTES = int(os.environ.get('SCORECARD_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+SCORECARD_CACHE_MAX_AGE_DAYS = int(os.environ.get('SCORECARD_CACHE_MAX_AGE_DAYS', 90))
+
+# PDF extraction (api/extraction.py): pages whose text layer has at least this many
+# non-whitespace characters, mostly readable, are sent as text instead of images.
+EXTRACTION_MIN_PAGE_CHARS = int(os.environ.get('EXTRACTION_MIN_PAGE_CHARS', 200))
+EXTRACTION_MIN_READABLE_RATIO = float(os.environ.get('EXTRACTION_MIN_READABLE_RATIO', 0.9))
+
+# Page rendering (api/rendering.py) for pages that must be sent as images. The
+# defaults send every page as a 200 DPI colour PNG, as before rendering became
+# configurable. Lower DPI, grayscale, JPEG/WebP, a payload budget and a page cap
+# all make requests smaller and faster, but the model sees less detail (or
+# fewer pages), which can lower scoring quality; opt in per deployment.
+RENDER_DPI = int(os.environ.get('RENDER_DPI', 200))
+# Adaptive downscaling never goes below this DPI, even if the budget is exceeded.
+RENDER_MIN_DPI = int(os.environ.get('RENDER_MIN_DPI', 72))
+RENDER_GRAYSCALE = os.environ.get('RENDER_GRAYSCALE', 'false').lower() in ('1', 'true', 'yes')
+RENDER_IMAGE_FORMAT = os.environ.get('RENDER_IMAGE_FORMAT', 'png')  # png, jpeg or webp
+RENDER_IMAGE_QUALITY = int(os.environ.get('RENDER_IMAGE_QUALITY', 80))  # jpeg and webp only
+# Byte budget for a document's encoded page images; 0 disables downscaling.
+RENDER_MAX_PAYLOAD_BYTES = int(os.environ.get('RENDER_MAX_PAYLOAD_BYTES', 0))
+# Pages past this are not sent (and are listed in the extraction report); 0 sends every page.
+RENDER_MAX_PAGES = int(os.environ.get('RENDER_MAX_PAGES', 0))
+# Size of the rendering process pool; 0 or 1 renders on the calling thread.
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Extracted page text and rendered pages (api/artifact_cache.py), kept on disk by PDF
+# hash so stored CVs are not reprocessed when analyzed again. An empty directory
+# or a budget of 0 disables the cache.
+ARTIFACT_CACHE_DIR = os.environ.get('ARTIFACT_CACHE_DIR', str(BASE_DIR / 'artifact_cache'))
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+# Gemini API client (api/gemini.py)
+GEMINI_API_BASE_URL = os.environ.get('GEMINI_API_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta')
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-flash-latest')
+GEMINI_CONNECT_TIMEOUT = float(os.environ.get('GEMINI_CONNECT_TIMEOUT', 5))
+GEMINI_READ_TIMEOUT = float(os.environ.get('GEMINI_READ_TIMEOUT', 120))
+GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', 3))
+GEMINI_BACKOFF_BASE = float(os.environ.get('GEMINI_BACKOFF_BASE', 1))
+GEMINI_BACKOFF_MAX = float(os.environ.get('GEMINI_BACKOFF_MAX', 30))
+GEMINI_POOL_SIZE = int(os.environ.get('GEMINI_POOL_SIZE', 10))
+# The circuit opens after this many consecutive failed calls and allows a trial call after the timeout.
+GEMINI_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('GEMINI_CIRCUIT_FAILURE_THRESHOLD', 5))
+GEMINI_CIRCUIT_RESET_TIMEOUT = float(os.environ.get('GEMINI_CIRCUIT_RESET_TIMEOUT', 30))
+# Client-side token bucket matching the Gemini quota (per process). 0 disables it.
+GEMINI_REQUESTS_PER_MINUTE = int(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', 60))
+GEMINI_RATE_LIMIT_BURST = int(os.environ.get('GEMINI_RATE_LIMIT_BURST', 5))
+# Request bodies are encoded and sent in chunks of this many bytes.
+GEMINI_REQUEST_CHUNK_BYTES = int(os.environ.get('GEMINI_REQUEST_CHUNK_BYTES', 64 * 1024))
+
+# Batch ingestion (api/batch.py)
+BATCH_ANALYSIS_CONCURRENCY = int(os.environ.get('BATCH_ANALYSIS_CONCURRENCY', 8))
+BATCH_ANALYSIS_MAX_FILES = int(os.environ.get('BATCH_ANALYSIS_MAX_FILES', 500))
+BATCH_ANALYSIS_MAX_FILE_BYTES = int(os.environ.get('BATCH_ANALYSIS_MAX_FILE_BYTES', 20 * 1024 * 1024))
+# Resume rows are inserted with one bulk INSERT per this many finished files.
+BATCH_ANALYSIS_INSERT_BATCH_SIZE = int(os.environ.get('BATCH_ANALYSIS_INSERT_BATCH_SIZE', 25))
+
+# Bulk pipeline operations (api/bulk.py): resumes are deleted this many per
+# transaction, and at most BULK_MAX_IDS ids can be listed in one request.
+BULK_DELETE_BATCH_SIZE = int(os.environ.get('BULK_DELETE_BATCH_SIZE', 500))
+BULK_MAX_IDS = int(os.environ.get('BULK_MAX_IDS', 10000))
+
+# Candidate exports (api/export.py): rows are read EXPORT_CHUNK_SIZE at a time and
+# sent in blocks of about EXPORT_BUFFER_BYTES.
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+EXPORT_BUFFER_BYTES = int(os.environ.get('EXPORT_BUFFER_BYTES', 64 * 1024))
+
+# Full-text search (api/search.py). Empty picks the FTS5 index on SQLite and
+# plain icontains filters elsewhere; set a dotted path to use another backend.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', '')
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 50))
+
+# Local prescreening (api/prescreen.py). Text-layer resumes whose TF-IDF score
+# against the job is below PRESCREEN_MIN_SCORE (0-1) are stored with a
+# placeholder scorecard instead of being sent to Gemini. 0 disables the cut-off;
+# the score is still recorded.
+PRESCREEN_MIN_SCORE = float(os.environ.get('PRESCREEN_MIN_SCORE', 0))
+PRESCREEN_BATCH_SIZE = int(os.environ.get('PRESCREEN_BATCH_SIZE', 1000))
+# Seconds before the job vocabulary (and IDF) is rebuilt, in the background, to take in
+# new and edited jobs; until then those jobs are scored against the current vocabulary.
+PRESCREEN_MODEL_TTL = int(os.environ.get('PRESCREEN_MODEL_TTL', 300))
+
+# Multi-job analysis (job_description_ids on analyze-resume/): one CV scored against
+# several jobs. Up to MULTI_JOB_COMBINE_MAX jobs share one Gemini request; 1 sends
+# a request per job. The requests run concurrently, up to BATCH_ANALYSIS_CONCURRENCY.
+MULTI_JOB_COMBINE_MAX = int(os.environ.get('MULTI_JOB_COMBINE_MAX', 4))
+MULTI_JOB_MAX_JOBS = int(os.environ.get('MULTI_JOB_MAX_JOBS', 20))
+
+# Metrics (api/metrics.py). /api/metrics/ serves this process's stage timings,
+# payload sizes, Gemini token usage and cache hit rates in the Prometheus text
+# format. Scrapers send METRICS_TOKEN as "Authorization: Bearer <token>";
+# without a token, only staff users can read it.
+# SERVER_TIMING_ENABLED adds a Server-Timing header with each request's stages.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() in ('1', 'true', 'yes')